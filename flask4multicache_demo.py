@@ -42,7 +42,10 @@ clip2vec = Clip2Vec()
 data_manager = get_data_manager(CacheBase("sqlite"), VectorBase("faiss",
                                                                 mm_dimension=image_dimension+text_dimension,
                                                                 i_dimension=image_dimension,
-                                                                t_dimension=text_dimension))
+                                                                t_dimension=text_dimension),
+                                # The faiss index only persists on flush, snapshot it in the background
+                                snapshot_interval_ms=60000,
+                                snapshot_dirty_threshold=10000)
 
 
 cache.init(
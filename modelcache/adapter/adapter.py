@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import logging
 from modelcache.adapter.adapter_query import adapt_query
+from modelcache.adapter.adapter_batch_query import adapt_batch_query
 from modelcache.adapter.adapter_insert import adapt_insert
 from modelcache.adapter.adapter_remove import adapt_remove
 from modelcache.adapter.adapter_register import adapt_register
@@ -23,6 +24,20 @@ class ChatCompletion(object):
             print(e)
             return str(e)
 
+    @classmethod
+    async def create_batch_query(cls, *args, **kwargs):
+        def cache_data_convert(cache_data, cache_query):
+            return construct_resp_from_cache(cache_data, cache_query)
+        try:
+            return await adapt_batch_query(
+                cache_data_convert,
+                *args,
+                **kwargs
+            )
+        except Exception as e:
+            print(e)
+            return str(e)
+
     @classmethod
     async def create_insert(cls, *args, **kwargs):
         try:
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import numpy as np
+from modelcache.adapter.adapter_query import (
+    USE_RERANKER,
+    adapt_query,
+    evaluate_top_result,
+    score_candidate,
+    select_hit,
+    register_hit,
+)
+from modelcache.utils.time import time_cal
+
+
+async def adapt_batch_query(cache_data_convert, *args, **kwargs):
+    """
+    Answer many queries, possibly for several models, in one pass.
+
+    Queries are embedded together, searched with one multi-vector call per
+    model and their candidates fetched from scalar storage in one round-trip
+    per model. Returns one adapt_query style result per query, in order.
+    """
+    chat_cache = kwargs.pop("cache_obj")
+    batch = kwargs.pop("batch")  # [(model, query), ...]
+    context = kwargs.pop("cache_context", {})
+    cache_factor = kwargs.pop("cache_factor", 1.0)
+    top_k = kwargs.pop("top_k", -1)
+
+    if USE_RERANKER:
+        # The reranker scores candidates one by one, keep the single query path
+        return await asyncio.gather(*[
+            adapt_query(cache_data_convert, scope={"model": model}, query=query,
+                        cache_obj=chat_cache, cache_context=context, cache_factor=cache_factor)
+            for model, query in batch
+        ])
+
+    results = [None] * len(batch)
+
+    # Preprocess queries for embedding generation
+    pre_embedding_datas = [
+        chat_cache.query_pre_embedding_func(
+            {"query": query},
+            extra_param=context.get("pre_embedding_func", None),
+            prompts=chat_cache.prompts,
+        )
+        for _, query in batch
+    ]
+
+    # Exact-match fast path for byte-identical prompts: ids are looked up in
+    # memory, only the hits go to a worker thread for their rows
+    exact_ids = [
+        chat_cache.data_manager.exact_match_id(pre_embedding_data, model=model)
+        for pre_embedding_data, (model, _) in zip(pre_embedding_datas, batch)
+    ]
+    exact_indexes = [i for i, _id in enumerate(exact_ids) if _id is not None]
+
+    def exact_match_data_all():
+        return [
+            chat_cache.data_manager.exact_match_data(pre_embedding_datas[i], exact_ids[i], model=batch[i][0])
+            for i in exact_indexes
+        ]
+
+    exact_hits = dict(zip(exact_indexes, await asyncio.to_thread(exact_match_data_all))) if exact_indexes else {}
+    pending = []
+    for i in range(len(batch)):
+        ret = exact_hits.get(i)
+        if ret is None:
+            pending.append(i)
+            continue
+        return_id = exact_ids[i]
+        register_hit(chat_cache, pre_embedding_datas[i], return_id, batch[i][0])
+        results[i] = cache_data_convert(
+            chat_cache.post_process_messages_func([ret[0]]),
+            chat_cache.post_process_messages_func([ret[1]])
+        )
+    if not pending:
+        return results
+
+    # Submit all embeddings at once so the workers can batch them
+    embedding_datas = await asyncio.gather(*[
+        time_cal(
+            chat_cache.embedding_func,
+            func_name="embedding",
+            report_func=chat_cache.report.embedding,
+            cache_obj=chat_cache
+        )(pre_embedding_datas[i])
+        for i in pending
+    ])
+    embedding_by_index = dict(zip(pending, embedding_datas))
+
+    model_to_indexes = {}
+    for i in pending:
+        model_to_indexes.setdefault(batch[i][0], []).append(i)
+
+    # One multi-vector search per model
+    search_time_cal = time_cal(
+        chat_cache.data_manager.search_batch,
+        func_name="vector_search",
+        report_func=chat_cache.report.search,
+        cache_obj=chat_cache
+    )
+
+    def search_all():
+        search_results = {}
+        for model, indexes in model_to_indexes.items():
+            matrix = np.stack([np.asarray(embedding_by_index[i]).reshape(-1) for i in indexes])
+            rows = search_time_cal(
+                matrix,
+                extra_param=context.get("search_func", None),
+                top_k=top_k,
+                model=model
+            )
+            search_results.update(zip(indexes, rows))
+        return search_results
+
+    search_results = await asyncio.to_thread(search_all)
+
+    # Gate on the best result, then fetch every surviving candidate per model in one go
+    evaluations = {}
+    model_to_ids = {}
+    for i in pending:
+        cache_data_list = search_results.get(i)
+        evaluation = evaluate_top_result(chat_cache, cache_data_list, context, cache_factor)
+        if not evaluation[0]:
+            continue
+        evaluations[i] = evaluation
+        ids = model_to_ids.setdefault(batch[i][0], [])
+        ids.extend(cache_data[1] for cache_data in cache_data_list)
+
+    def get_scalar_data_all():
+        return {
+            model: chat_cache.data_manager.get_scalar_data_batch(
+                ids, extra_param=context.get("get_scalar_data", None), model=model
+            )
+            for model, ids in model_to_ids.items()
+        }
+
+    scalar_datas = await asyncio.to_thread(get_scalar_data_all)
+
+    for i, (_, cosine_similarity, rank_threshold, rank_threshold_long) in evaluations.items():
+        model = batch[i][0]
+        cache_answers = []
+        cache_questions = []
+        cache_ids = []
+        for cache_data in search_results[i]:
+            primary_id = cache_data[1]
+            ret = scalar_datas[model].get(primary_id)
+            if ret is None:
+                continue
+            rank = score_candidate(
+                chat_cache, pre_embedding_datas[i], embedding_by_index[i], cache_data, ret,
+                cosine_similarity, rank_threshold, rank_threshold_long, context
+            )
+            if rank is not None:
+                cache_answers.append((rank, ret[0]))
+                cache_questions.append((rank, ret[1]))
+                cache_ids.append((rank, primary_id))
+
+        hit = select_hit(chat_cache, cache_answers, cache_questions, cache_ids)
+        if hit is not None:
+            return_message, return_query, return_id = hit
+            register_hit(chat_cache, pre_embedding_datas[i], return_id, model)
+            results[i] = cache_data_convert(return_message, return_query)
+    return results
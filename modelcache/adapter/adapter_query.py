@@ -2,7 +2,7 @@
 import asyncio
 import logging
 from modelcache.embedding import MetricType
-from modelcache.utils.time import time_cal
+from modelcache.utils.time import time_cal, async_time_cal
 from FlagEmbedding import FlagReranker
 
 USE_RERANKER = False  # 如果为 True 则启用 reranker，否则使用原有逻辑
@@ -22,6 +22,21 @@ async def adapt_query(cache_data_convert, *args, **kwargs):
         prompts=chat_cache.prompts,
     )
 
+    # Exact-match fast path: byte-identical prompts skip embedding and vector search.
+    # The id lookup is in memory, only a hit goes to a worker thread for its row
+    return_id = chat_cache.data_manager.exact_match_id(pre_embedding_data, model=model)
+    if return_id is not None:
+        ret = await asyncio.to_thread(
+            chat_cache.data_manager.exact_match_data,
+            pre_embedding_data, return_id, model=model
+        )
+        if ret is not None:
+            register_hit(chat_cache, pre_embedding_data, return_id, model)
+            return cache_data_convert(
+                chat_cache.post_process_messages_func([ret[0]]),
+                chat_cache.post_process_messages_func([ret[1]])
+            )
+
     # Generate embedding with performance monitoring
     embedding_data = await time_cal(
         chat_cache.embedding_func,
@@ -30,14 +45,13 @@ async def adapt_query(cache_data_convert, *args, **kwargs):
         cache_obj=chat_cache
     )(pre_embedding_data)
 
-    search_time_cal = time_cal(
-        chat_cache.data_manager.search,
+    search_time_cal = async_time_cal(
+        chat_cache.data_manager.search_async,
         func_name="vector_search",
         report_func=chat_cache.report.search,
         cache_obj=chat_cache
     )
-    cache_data_list = await asyncio.to_thread(
-        search_time_cal,
+    cache_data_list = await search_time_cal(
         embedding_data,
         extra_param=context.get("search_func", None),
         top_k=kwargs.pop("top_k", -1),
@@ -48,66 +62,27 @@ async def adapt_query(cache_data_convert, *args, **kwargs):
     cache_answers = []
     cache_questions = []
     cache_ids = []
-    cosine_similarity = None
-
-    # Similarity evaluation based on metric type
-    if chat_cache.similarity_metric_type == MetricType.COSINE:
-        cosine_similarity = cache_data_list[0][0]
-        # This code uses the built-in cosine similarity evaluation in milvus
-        if cosine_similarity < chat_cache.similarity_threshold:
-            return None  # No suitable match found
-
-    elif chat_cache.similarity_metric_type == MetricType.L2:
-        # this is the code that uses L2 for similarity evaluation
-        similarity_threshold = chat_cache.similarity_threshold
-        similarity_threshold_long = chat_cache.similarity_threshold_long
-
-        min_rank, max_rank = chat_cache.similarity_evaluation.range()
-        rank_threshold = (max_rank - min_rank) * similarity_threshold * cache_factor
-        rank_threshold_long = (max_rank - min_rank) * similarity_threshold_long * cache_factor
 
-        # Clamp thresholds to valid range
-        rank_threshold = (
-            max_rank
-            if rank_threshold > max_rank
-            else min_rank
-            if rank_threshold < min_rank
-            else rank_threshold
-        )
-        rank_threshold_long = (
-            max_rank
-            if rank_threshold_long > max_rank
-            else min_rank
-            if rank_threshold_long < min_rank
-            else rank_threshold_long
-        )
+    # Similarity evaluation of the top search result based on metric type
+    passed, cosine_similarity, rank_threshold, rank_threshold_long = evaluate_top_result(
+        chat_cache, cache_data_list, context, cache_factor
+    )
+    if not passed:
+        return None  # No suitable match found
 
-        # Evaluate similarity score
-        if cache_data_list is None or len(cache_data_list) == 0:
-            rank_pre = -1.0
-        else:
-            cache_data_dict = {'search_result': cache_data_list[0]}
-            rank_pre = chat_cache.similarity_evaluation.evaluation(
-                None,
-                cache_data_dict,
-                extra_param=context.get("evaluation_func", None),
-            )
-        if rank_pre < rank_threshold:
-            return None  # Similarity too low
-    else:
-        raise ValueError(
-            f"Unsupported similarity metric type: {chat_cache.similarity_metric_type}"
-        )
+    # Fetch every candidate in one round-trip (memory cache first, then scalar storage)
+    scalar_datas = await asyncio.to_thread(
+        chat_cache.data_manager.get_scalar_data_batch,
+        [cache_data[1] for cache_data in cache_data_list],
+        extra_param=context.get("get_scalar_data", None), model=model
+    )
 
     # Process search results with optional reranking
     if USE_RERANKER:
         reranker = FlagReranker('BAAI/bge-reranker-v2-m3', use_fp16=False)
         for cache_data in cache_data_list:
             primary_id = cache_data[1]
-            ret = await asyncio.to_thread(
-                chat_cache.data_manager.get_scalar_data,
-                cache_data, extra_param=context.get("get_scalar_data", None), model=model
-            )
+            ret = scalar_datas.get(primary_id)
             if ret is None:
                 continue
 
@@ -150,88 +125,162 @@ async def adapt_query(cache_data_convert, *args, **kwargs):
         # Original logic without reranking
         for cache_data in cache_data_list:
             primary_id = cache_data[1]
-            # Retrieve full cache entry data
-            ret = await asyncio.to_thread(
-                chat_cache.data_manager.get_scalar_data,
-                cache_data, extra_param=context.get("get_scalar_data", None), model=model
-            )
+            ret = scalar_datas.get(primary_id)
             if ret is None:
                 continue
 
-            if chat_cache.similarity_metric_type == MetricType.COSINE:
-                assert cosine_similarity is not None, "cosine_similarity should not be None"
-                cache_answers.append((cosine_similarity, ret[0]))
-                cache_questions.append((cosine_similarity, ret[1]))
-                cache_ids.append((cosine_similarity, primary_id))
-
-            elif chat_cache.similarity_metric_type == MetricType.L2:
-                if "deps" in context and hasattr(ret.question, "deps"):
-                    eval_query_data = {
-                        "question": context["deps"][0]["data"],
-                        "embedding": None
-                    }
-                    eval_cache_data = {
-                        "question": ret.question.deps[0].data,
-                        "answer": ret.answers[0].answer,
-                        "search_result": cache_data,
-                        "embedding": None,
-                    }
-                else:
-                    eval_query_data = {
-                        "question": pre_embedding_data,
-                        "embedding": embedding_data,
-                    }
-                    eval_cache_data = {
-                        "question": ret[0],
-                        "answer": ret[1],
-                        "search_result": cache_data,
-                        "embedding": None
-                    }
-
-                # Evaluate similarity for this specific result
-                rank = chat_cache.similarity_evaluation.evaluation(
-                    eval_query_data,
-                    eval_cache_data,
-                    extra_param=context.get("evaluation_func", None),
-                )
-
-                if len(pre_embedding_data) <= 256:
-                    if rank_threshold <= rank:
-                        cache_answers.append((rank, ret[0]))
-                        cache_questions.append((rank, ret[1]))
-                        cache_ids.append((rank, primary_id))
-                else:
-                    if rank_threshold_long <= rank:
-                        cache_answers.append((rank, ret[0]))
-                        cache_questions.append((rank, ret[1]))
-                        cache_ids.append((rank, primary_id))
-            else:
-                raise ValueError(
-                    f"Unsupported similarity metric type: {chat_cache.similarity_metric_type}"
-                )
+            # Evaluate similarity for this specific result
+            rank = score_candidate(
+                chat_cache, pre_embedding_data, embedding_data, cache_data, ret,
+                cosine_similarity, rank_threshold, rank_threshold_long, context
+            )
+            if rank is not None:
+                cache_answers.append((rank, ret[0]))
+                cache_questions.append((rank, ret[1]))
+                cache_ids.append((rank, primary_id))
+
+    hit = select_hit(chat_cache, cache_answers, cache_questions, cache_ids)
+    if hit is not None:
+        return_message, return_query, return_id = hit
+        register_hit(chat_cache, pre_embedding_data, return_id, model)
+        return cache_data_convert(return_message, return_query)
+    return None
+
+
+def evaluate_top_result(chat_cache, cache_data_list, context, cache_factor):
+    """
+    Check the best search result against the similarity threshold.
+
+    Returns (passed, cosine_similarity, rank_threshold, rank_threshold_long).
+    """
+    if chat_cache.similarity_metric_type == MetricType.COSINE:
+        if cache_data_list is None or len(cache_data_list) == 0:
+            return False, None, None, None
+        cosine_similarity = cache_data_list[0][0]
+        # This code uses the built-in cosine similarity evaluation in milvus
+        return cosine_similarity >= chat_cache.similarity_threshold, cosine_similarity, None, None
+
+    elif chat_cache.similarity_metric_type == MetricType.L2:
+        # this is the code that uses L2 for similarity evaluation
+        similarity_threshold = chat_cache.similarity_threshold
+        similarity_threshold_long = chat_cache.similarity_threshold_long
+
+        min_rank, max_rank = chat_cache.similarity_evaluation.range()
+        rank_threshold = (max_rank - min_rank) * similarity_threshold * cache_factor
+        rank_threshold_long = (max_rank - min_rank) * similarity_threshold_long * cache_factor
+
+        # Clamp thresholds to valid range
+        rank_threshold = (
+            max_rank
+            if rank_threshold > max_rank
+            else min_rank
+            if rank_threshold < min_rank
+            else rank_threshold
+        )
+        rank_threshold_long = (
+            max_rank
+            if rank_threshold_long > max_rank
+            else min_rank
+            if rank_threshold_long < min_rank
+            else rank_threshold_long
+        )
+
+        # Evaluate similarity score
+        if cache_data_list is None or len(cache_data_list) == 0:
+            rank_pre = -1.0
+        else:
+            cache_data_dict = {'search_result': cache_data_list[0]}
+            rank_pre = chat_cache.similarity_evaluation.evaluation(
+                None,
+                cache_data_dict,
+                extra_param=context.get("evaluation_func", None),
+            )
+        return rank_pre >= rank_threshold, None, rank_threshold, rank_threshold_long
+    else:
+        raise ValueError(
+            f"Unsupported similarity metric type: {chat_cache.similarity_metric_type}"
+        )
+
 
+def score_candidate(chat_cache, pre_embedding_data, embedding_data, cache_data, ret,
+                    cosine_similarity, rank_threshold, rank_threshold_long, context):
+    """Rank one search candidate, or return None if it falls below the threshold."""
+    if chat_cache.similarity_metric_type == MetricType.COSINE:
+        assert cosine_similarity is not None, "cosine_similarity should not be None"
+        return cosine_similarity
+
+    elif chat_cache.similarity_metric_type == MetricType.L2:
+        if "deps" in context and hasattr(ret.question, "deps"):
+            eval_query_data = {
+                "question": context["deps"][0]["data"],
+                "embedding": None
+            }
+            eval_cache_data = {
+                "question": ret.question.deps[0].data,
+                "answer": ret.answers[0].answer,
+                "search_result": cache_data,
+                "embedding": None,
+            }
+        else:
+            eval_query_data = {
+                "question": pre_embedding_data,
+                "embedding": embedding_data,
+            }
+            eval_cache_data = {
+                "question": ret[0],
+                "answer": ret[1],
+                "search_result": cache_data,
+                "embedding": None
+            }
+
+        rank = chat_cache.similarity_evaluation.evaluation(
+            eval_query_data,
+            eval_cache_data,
+            extra_param=context.get("evaluation_func", None),
+        )
+
+        if len(pre_embedding_data) <= 256:
+            return rank if rank_threshold <= rank else None
+        return rank if rank_threshold_long <= rank else None
+    else:
+        raise ValueError(
+            f"Unsupported similarity metric type: {chat_cache.similarity_metric_type}"
+        )
+
+
+def select_hit(chat_cache, cache_answers, cache_questions, cache_ids):
+    """Pick the answer to return from the ranked candidates, or None if there is none."""
     # Sort results by similarity score (highest first)
     cache_answers = sorted(cache_answers, key=lambda x: x[0], reverse=True)
     cache_questions = sorted(cache_questions, key=lambda x: x[0], reverse=True)
     cache_ids = sorted(cache_ids, key=lambda x: x[0], reverse=True)
-    if len(cache_answers) != 0:
-        return_message = chat_cache.post_process_messages_func(
-            [t[1] for t in cache_answers]
-        )
-        return_query = chat_cache.post_process_messages_func(
-            [t[1] for t in cache_questions]
-        )
-        return_id = chat_cache.post_process_messages_func(
-            [t[1] for t in cache_ids]
-        )
+    if len(cache_answers) == 0:
+        return None
+    return_message = chat_cache.post_process_messages_func(
+        [t[1] for t in cache_answers]
+    )
+    return_query = chat_cache.post_process_messages_func(
+        [t[1] for t in cache_questions]
+    )
+    return_id = chat_cache.post_process_messages_func(
+        [t[1] for t in cache_ids]
+    )
+    return return_message, return_query, return_id
 
-        # Update hit count for analytics (async to avoid blocking)
-        try:
-            asyncio.create_task(asyncio.to_thread(chat_cache.data_manager.update_hit_count,return_id))
-        except Exception:
-            logging.info('update_hit_count except, please check!')
 
-        # Record cache hit for reporting
-        chat_cache.report.hint_cache()
-        return cache_data_convert(return_message, return_query)
-    return None
\ No newline at end of file
+def register_hit(chat_cache, pre_embedding_data, return_id, model):
+    """Book-keeping shared by every kind of cache hit."""
+    # Update hit count for analytics (buffered in memory, or async to avoid blocking)
+    try:
+        if chat_cache.data_manager.buffers_hit_count:
+            chat_cache.data_manager.update_hit_count(return_id, model=model)
+        else:
+            asyncio.create_task(asyncio.to_thread(chat_cache.data_manager.update_hit_count, return_id, model=model))
+    except Exception:
+        logging.info('update_hit_count except, please check!')
+
+    # Let repeats of this exact prompt take the fast path next time
+    chat_cache.data_manager.record_exact_match(pre_embedding_data, return_id, model=model)
+
+    # Record cache hit for reporting
+    chat_cache.report.hint_cache()
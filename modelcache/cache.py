@@ -8,6 +8,7 @@ from asyncio import AbstractEventLoop
 from typing import Callable, Optional, List, Any, Coroutine
 from modelcache.adapter import adapter
 from modelcache.embedding.embedding_dispatcher import EmbeddingDispatcher
+from modelcache.embedding.embedding_cache import EmbeddingCache
 from modelcache.utils.model_filter import model_blacklist_filter
 from concurrent.futures import ThreadPoolExecutor, Future
 import configparser
@@ -23,6 +24,13 @@ from modelcache.utils.error import CacheError
 from modelcache.utils.log import modelcache_log
 from modelcache.manager.data_manager import DataManager
 
+def normalize_model_name(model: str) -> str:
+    """Normalize model name for consistent storage (replace special chars)."""
+    model = model.replace('-', '_')
+    model = model.replace('.', '_')
+    return model
+
+
             #=====================================================================#
             #==================== Cache class definition =========================#
             #=====================================================================#
@@ -77,6 +85,11 @@ class Cache:
         Save query response asynchronously to avoid blocking main thread.
         Used for logging and analytics purposes.
         """
+        if self.data_manager.buffers_query_log:
+            # Enqueue for the batched background writer (non-blocking "drop" policy only,
+            # a blocking enqueue goes through a worker thread below)
+            self.data_manager.save_query_resp(query_resp_dict, **kwargs)
+            return
         # Execute save operation in a separate thread to maintain async performance
         asyncio.create_task(asyncio.to_thread(
             self.data_manager.save_query_resp,
@@ -89,17 +102,16 @@ class Cache:
         Serializes query data to JSON for storage.
         """
         # Convert query to JSON and save asynchronously
-        asyncio.create_task(asyncio.to_thread(
-            self.data_manager.save_query_resp,
+        self.save_query_resp(
             result, model=model, query=json.dumps(query, ensure_ascii=False), delta_time=delta_time_log
-        ))
+        )
 
     async def handle_request(self, param_dict: dict):
         """
         Main entry point for processing cache requests.
 
         Routes requests to appropriate handlers based on request type.
-        Supports: query, insert, remove, register operations.
+        Supports: query, batch_query, insert, remove, register operations.
 
         Args:
             param_dict: Request parameters containing type, scope, query, etc.
@@ -115,17 +127,14 @@ class Cache:
             scope = param_dict.get("scope")
             model = None
             if scope is not None:
-                model = scope.get('model')
-                # Normalize model name for consistent storage (replace special chars)
-                model = model.replace('-', '_')
-                model = model.replace('.', '_')
+                model = normalize_model_name(scope.get('model'))
             query = param_dict.get("query")
             chat_info = param_dict.get("chat_info")
 
             # Validate request type against supported operations
-            if request_type is None or request_type not in ['query', 'insert', 'remove', 'register']:
+            if request_type is None or request_type not in ['query', 'batch_query', 'insert', 'remove', 'register']:
                 result = {"errorCode": 102,
-                          "errorDesc": "type exception, should one of ['query', 'insert', 'remove', 'register']",
+                          "errorDesc": "type exception, should one of ['query', 'batch_query', 'insert', 'remove', 'register']",
                           "cacheHit": False, "delta_time": 0, "hit_query": '', "answer": ''}
                 self.save_query_resp(result, model=model, query='', delta_time=0)
                 return result
@@ -142,6 +151,8 @@ class Cache:
         # Route to appropriate handler based on request type
         if request_type == 'query':
             return await self.handle_query(model, query)
+        elif request_type == 'batch_query':
+            return await self.handle_batch_query(model, param_dict)
         elif request_type == 'insert':
             return await self.handle_insert(chat_info, model)
         elif request_type == 'remove':
@@ -245,16 +256,84 @@ class Cache:
             logging.info('result: {}'.format(result))
         return result
 
+    async def handle_batch_query(self, model, param_dict):
+        """
+        Answer a list of queries in one request.
+
+        Each entry of query_list is either a query (using the request scope) or
+        a dict with its own "scope" and "query". Returns one handle_query style
+        result per entry, in order; an entry without a model gets an error
+        result in its slot and the other entries still run.
+        """
+        try:
+            start_time = time.time()  # Start performance timer
+
+            batch = []
+            results = []
+            for item in param_dict.get("query_list", []):
+                item_model, query = model, item
+                if isinstance(item, dict) and "query" in item:
+                    query = item["query"]
+                    item_scope = item.get("scope")
+                    if item_scope is not None:
+                        item_model = item_scope.get('model') if isinstance(item_scope, dict) else None
+                        item_model = normalize_model_name(item_model) if isinstance(item_model, str) else None
+                batch.append((item_model, query))
+                if not item_model:
+                    results.append({"errorCode": 104, "errorDesc": "scope exception, the entry has no model",
+                                    "cacheHit": False, "delta_time": 0, "hit_query": '', "answer": ''})
+                else:
+                    # Apply model-based filtering per entry
+                    results.append(model_blacklist_filter(item_model, 'query'))
+            to_run = [i for i, result in enumerate(results) if not isinstance(result, dict)]
+
+            response = await adapter.ChatCompletion.create_batch_query(
+                batch=[batch[i] for i in to_run],
+                cache_obj=self
+            )
+
+            # Calculate query execution time
+            delta_time = '{}s'.format(round(time.time() - start_time, 2))
+            if isinstance(response, str):
+                # Error occurred during query processing
+                return {"errorCode": 201, "errorDesc": response, "delta_time": delta_time, "results": []}
+
+            delta_time_log = round(time.time() - start_time, 2)
+            for i, item_response in zip(to_run, response):
+                if item_response is None:
+                    result = {"errorCode": 0, "errorDesc": '', "cacheHit": False, "delta_time": delta_time,
+                              "hit_query": '', "answer": ''}
+                else:
+                    result = {"errorCode": 0, "errorDesc": '', "cacheHit": True, "delta_time": delta_time,
+                              "hit_query": item_response['hitQuery'], "answer": item_response['data']}
+                results[i] = result
+                self.save_query_info(result, batch[i][0], batch[i][1], delta_time_log)
+            result = {"errorCode": 0, "errorDesc": '', "delta_time": delta_time, "results": results}
+        except Exception as e:
+            result = {"errorCode": 202, "errorDesc": str(e), "delta_time": 0, "results": []}
+            logging.info('result: {}'.format(result))
+        return result
+
     def flush(self):
         """Flush all cached data to persistent storage backends."""
         self.data_manager.flush()
 
+    def rebuild_vectors(self, model=None, batch_size: int = 10000, progress=None):
+        """Rebuild the vector index of model, or of every model, from the embeddings kept in SQL storage."""
+        return self.data_manager.rebuild_vectors(model=model, batch_size=batch_size, progress=progress)
+
     @staticmethod
     async def init(
             sql_storage: str,
             vector_storage: str,
             embedding_model: EmbeddingModel,
-            embedding_workers_num: int
+            embedding_workers_num: int,
+            embedding_batch_size: int = 1,
+            embedding_batch_wait_ms: float = 0,
+            embedding_shm_slots: int = 0,
+            embedding_cache_size: int = 0,
+            embedding_cache_path: Optional[str] = None,
+            memory_cache_policy: str = 'ARC',
     ) -> tuple['Cache' , AbstractEventLoop]:
         """
         Initialize a complete Cache system with all required components.
@@ -264,6 +343,13 @@ class Cache:
             vector_storage: Vector backend type ("milvus", "faiss", "chromadb", "redis")
             embedding_model: Embedding model enum value
             embedding_workers_num: Number of parallel embedding worker processes
+            embedding_batch_size: Max jobs a worker embeds in one batched call (1 disables batching)
+            embedding_batch_wait_ms: Max time a worker waits to fill a batch
+            embedding_shm_slots: Shared memory slots for returning embeddings (0 uses the result queue)
+            embedding_cache_size: Embeddings memoized in memory per text (0 disables the embedding cache)
+            embedding_cache_path: Optional memory-mapped file persisting memoized embeddings across restarts
+            memory_cache_policy: Eviction policy of the memory cache; SHARDED_ARC (16 shards, hits promoted
+                in batches of 64) spreads lock contention when many threads read the same model
 
         Returns:
             tuple: (Cache instance, event loop) ready for async operations
@@ -321,7 +407,30 @@ class Cache:
             raise CacheError(f"Please set the model_path and dimension for {embedding_model} in modelcache/embedding/base.py.")
 
         # Initialize parallel embedding generation system
-        embedding_dispatcher = EmbeddingDispatcher(embedding_model, model_path, event_loop, embedding_workers_num)
+        report = Report()
+        embedding_dispatcher = EmbeddingDispatcher(
+            embedding_model,
+            model_path,
+            event_loop,
+            embedding_workers_num,
+            max_batch_size=embedding_batch_size,
+            max_wait_ms=embedding_batch_wait_ms,
+            report=report,
+            shm_slots=embedding_shm_slots,
+            dimension=dimension,
+        )
+        embedding_func = embedding_dispatcher.embed
+        if embedding_cache_size > 0:
+            embedding_cache = EmbeddingCache(
+                embedding_dispatcher.embed,
+                namespace=embedding_model.name,
+                maxsize=embedding_cache_size,
+                policy='ARC',
+                persist_path=embedding_cache_path,
+                dimension=dimension,
+                report=report,
+            )
+            embedding_func = embedding_cache.embed
 
         #=== These will be used to initialize the cache ===#
         query_pre_embedding_func: Callable = None
@@ -366,16 +475,33 @@ class Cache:
 
         # Create coordinated data manager with all storage backends
         data_manager = DataManager.get(
-            SQLStorage.get(sql_storage, config=sql_config),
+            SQLStorage.get(sql_storage, config=sql_config, dimension=dimension),
             VectorStorage.get(
                 name=vector_storage,
                 dimension=dimension,
                 config=vector_config,
                 metric_type=similarity_metric_type,
             ),
-            memory_cache_policy='ARC',
+            # The shard and promotion options only apply to SHARDED_ARC
+            memory_cache_policy=memory_cache_policy,
+            memory_cache_shards=16,
+            memory_cache_promotion_buffer=64,
             max_size=10000,
             normalize=normalize,
+            exact_match_size=10000,
+            hit_count_flush_ms=1000,
+            hit_count_flush_size=1000,
+            query_log_queue_size=10000,
+            query_log_batch_size=500,
+            query_log_flush_ms=1000,
+            query_log_full_policy='drop',
+            # In-process vector stores only persist on flush, snapshot them in the background
+            snapshot_interval_ms=60000 if vector_storage == "faiss" else 0,
+            snapshot_dirty_threshold=10000 if vector_storage == "faiss" else 0,
+            report=report,
+            # Preload the memory tier in the background so restarts do not start cold
+            warmup_rows_per_model=10000,
+            warmup_order_by='hit_count',
         )
 
         #================== Cache Initialization ====================#
@@ -385,8 +511,8 @@ class Cache:
             embedding_model = embedding_model,
             similarity_metric_type = similarity_metric_type,
             data_manager = data_manager,
-            report = Report(),
-            embedding_func = embedding_dispatcher.embed,
+            report = report,
+            embedding_func = embedding_func,
             query_pre_embedding_func = query_pre_embedding_func,
             insert_pre_embedding_func = insert_pre_embedding_func,
             similarity_evaluation = similarity_evaluation,
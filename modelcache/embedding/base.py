@@ -52,6 +52,13 @@ class BaseEmbedding(metaclass=ABCMeta):
     def to_embeddings(self, data, **kwargs):
         pass
 
+    def to_embeddings_batch(self, data_list, **kwargs):
+        """
+        Generate embeddings for a list of inputs.
+        Models that support a batched forward pass should override this.
+        """
+        return [self.to_embeddings(data, **kwargs) for data in data_list]
+
     @property
     @abstractmethod
     def dimension(self) -> int:
@@ -23,6 +23,10 @@ class BgeM3Embedding(BaseEmbedding):
         embeddings = self.bge_model.encode(data, batch_size=12, max_length=8192)['dense_vecs']
         return np.array(embeddings).astype("float32")
 
+    def to_embeddings_batch(self, data_list, **_):
+        embeddings = self.bge_model.encode(list(data_list), batch_size=12, max_length=8192)['dense_vecs']
+        return np.array(embeddings).astype("float32")
+
     @property
     def dimension(self):
         return self.__dimension
\ No newline at end of file
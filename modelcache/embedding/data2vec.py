@@ -88,6 +88,18 @@ class Data2VecAudio(BaseEmbedding):
             embedding_array = np.mean(embedding_array_list, axis=0)
             return embedding_array
 
+    def to_embeddings_batch(self, data_list, **kwargs):
+        encoded_input = self.tokenizer(list(data_list), padding=True, truncation=True, return_tensors='pt')
+        # Inputs needing the sliding window are embedded one by one
+        if int(encoded_input['attention_mask'].sum(1).max()) > 512:
+            return [self.to_embeddings(data, **kwargs) for data in data_list]
+
+        with torch.no_grad():
+            encoded_input = {k: v.to(self.device) for k, v in encoded_input.items()}
+            model_output = self.model(**encoded_input)
+        sentence_embeddings = mean_pooling(model_output, encoded_input['attention_mask'])
+        return sentence_embeddings.detach().cpu().numpy().astype("float32")
+
     def post_proc(self, token_embeddings, inputs):
         attention_mask = inputs["attention_mask"]
         input_mask_expanded = (
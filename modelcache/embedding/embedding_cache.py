@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import atexit
+import hashlib
+import os
+from asyncio import Future
+from typing import Callable, Optional
+
+import numpy as np
+
+from modelcache.manager.eviction.memory_cache import MemoryCacheEviction
+from modelcache.report import Report
+from modelcache.utils.log import modelcache_log
+
+
+class EmbeddingFileStore:
+    """
+    Memory-mapped float32 store of embeddings that survives restarts.
+
+    Slots are direct-mapped by key digest; a parallel key array tells whether
+    a slot still holds the requested key, so collisions simply overwrite.
+    """
+
+    def __init__(self, path: str, capacity: int, dimension: int):
+        self.path = path
+        self.keys_path = path + ".keys"
+        self.capacity = capacity
+        self.dimension = dimension
+        self._vectors, self._keys = self._open()
+
+    def _open(self):
+        if os.path.isfile(self.path) and os.path.isfile(self.keys_path):
+            try:
+                vectors = np.load(self.path, mmap_mode="r+")
+                keys = np.load(self.keys_path, mmap_mode="r+")
+                if vectors.shape == (self.capacity, self.dimension) and keys.shape == (self.capacity,):
+                    return vectors, keys
+                modelcache_log.warning("Embedding cache file %s does not match the configuration, recreating.",
+                                       self.path)
+            except ValueError as e:
+                modelcache_log.warning("Embedding cache file %s is unreadable, recreating: %s", self.path, e)
+        vectors = np.lib.format.open_memmap(
+            self.path, mode="w+", dtype=np.float32, shape=(self.capacity, self.dimension)
+        )
+        keys = np.lib.format.open_memmap(self.keys_path, mode="w+", dtype="S16", shape=(self.capacity,))
+        return vectors, keys
+
+    def _slot(self, key: bytes) -> int:
+        return int.from_bytes(key[:8], "little") % self.capacity
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        slot = self._slot(key)
+        if self._keys[slot] != key:
+            return None
+        return np.array(self._vectors[slot])
+
+    def put(self, key: bytes, vector: np.ndarray):
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if vector.size != self.dimension:
+            return
+        slot = self._slot(key)
+        self._vectors[slot] = vector
+        self._keys[slot] = key
+
+    def flush(self):
+        self._vectors.flush()
+        self._keys.flush()
+
+
+class EmbeddingCache:
+    """
+    Memoizes an embedding function by embedding model + text digest.
+
+    Sits in front of Cache.embedding_func and returns the same kind of
+    awaitable. Identical texts requested concurrently share one embedding job.
+    """
+
+    def __init__(
+        self,
+        embedding_func: Callable,
+        namespace: str,
+        maxsize: int,
+        policy: str = "ARC",
+        persist_path: Optional[str] = None,
+        persist_capacity: int = 0,
+        dimension: int = 0,
+        report: Optional[Report] = None,
+    ):
+        self.embedding_func = embedding_func
+        self.namespace = namespace
+        self.report = report
+        self.eviction_base = MemoryCacheEviction(policy=policy, maxsize=maxsize, clean_size=1)
+        self._pending: dict[bytes, Future] = {}
+        self.file_store = None
+        if persist_path:
+            self.file_store = EmbeddingFileStore(persist_path, persist_capacity or maxsize, dimension)
+            atexit.register(self.flush)
+
+    def _key(self, data: str) -> bytes:
+        return hashlib.blake2b(
+            f"{self.namespace}\0{data}".encode("utf-8"), digest_size=16
+        ).digest()
+
+    def _resolved(self, value) -> Future:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        return future
+
+    def _hit(self):
+        if self.report is not None:
+            self.report.embedding_cache_hit()
+
+    def _miss(self):
+        if self.report is not None:
+            self.report.embedding_cache_miss()
+
+    def embed(self, data) -> Future:
+        if not isinstance(data, str):
+            return self.embedding_func(data)
+
+        key = self._key(data)
+        value = self.eviction_base.get(key, model=self.namespace)
+        if value is not None:
+            self._hit()
+            return self._resolved(value)
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self._hit()
+            return pending
+
+        if self.file_store is not None:
+            value = self.file_store.get(key)
+            if value is not None:
+                self._hit()
+                self.eviction_base.put([(key, value)], model=self.namespace)
+                return self._resolved(value)
+
+        self._miss()
+        future = self.embedding_func(data)
+        self._pending[key] = future
+
+        def _store(done: Future):
+            self._pending.pop(key, None)
+            if done.cancelled() or done.exception() is not None:
+                return
+            result = done.result()
+            self.eviction_base.put([(key, result)], model=self.namespace)
+            if self.file_store is not None:
+                self.file_store.put(key, result)
+
+        future.add_done_callback(_store)
+        return future
+
+    def flush(self):
+        if self.file_store is not None:
+            try:
+                self.file_store.flush()
+            except Exception as e:
+                modelcache_log.error(e)
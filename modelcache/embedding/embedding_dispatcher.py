@@ -1,26 +1,78 @@
+import atexit
 import multiprocessing
+import queue
 import threading
+import time
 import uuid
 import asyncio
 import psutil
 from asyncio import Future, AbstractEventLoop
+from typing import Optional
 
 from modelcache.embedding import EmbeddingModel
 from modelcache.embedding.base import BaseEmbedding
+from modelcache.embedding.shm_ring import SharedMemoryRing
+from modelcache.report import Report
+from modelcache.utils.log import modelcache_log
 
+_IN_RING = None  # Result placeholder: the embedding was written to its shared memory slot
+_STOP = "stop"  # Result queue sentinel stopping the collector thread, batches are tuples
 
-def worker_func(embedding_model: EmbeddingModel, model_path, task_queue, result_queue, worker_id):
+
+def _next_batch(task_queue, max_batch_size, max_wait):
+    """Block for one job, then drain up to max_batch_size jobs or until max_wait elapses."""
+    batch = [task_queue.get()]
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_batch_size:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining > 0:
+                batch.append(task_queue.get(timeout=remaining))
+            else:
+                batch.append(task_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _embed_batch(base_embedding: BaseEmbedding, data_list):
+    """Embed a batch, falling back to one-by-one so a bad input only fails its own job."""
+    if len(data_list) == 1:
+        try:
+            return [base_embedding.to_embeddings(data_list[0])]
+        except Exception as e:
+            return [e]
+    try:
+        return base_embedding.to_embeddings_batch(data_list)
+    except Exception:
+        results = []
+        for data in data_list:
+            try:
+                results.append(base_embedding.to_embeddings(data))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+def worker_func(embedding_model: EmbeddingModel, model_path, task_queue, result_queue, worker_id,
+                max_batch_size=1, max_wait=0.0, shm_info=None):
     """Worker function that runs in separate processes to generate embeddings."""
     base_embedding = BaseEmbedding.get(embedding_model, model_path=model_path)
+    ring = SharedMemoryRing.attach(*shm_info) if shm_info is not None else None
     print(f"Embedding worker {worker_id} started.")
     try:
         while True:
-            job_id, data = task_queue.get()  # Get task from queue
-            try:
-                result = base_embedding.to_embeddings(data)  # Generate embedding
-            except Exception as e:
-                result = e
-            result_queue.put((job_id, result))  # Send result back
+            batch = _next_batch(task_queue, max_batch_size, max_wait)  # Get tasks from queue
+            job_ids = [job_id for job_id, _, _ in batch]
+            batch_start = time.time()
+            results = list(_embed_batch(base_embedding, [data for _, _, data in batch]))  # Generate embeddings
+            delta_time = time.time() - batch_start
+            if ring is not None:
+                # Write vectors into their reserved slots, only the placeholders go through the pipe
+                for i, (_, slot, _) in enumerate(batch):
+                    if slot >= 0 and not isinstance(results[i], Exception) and ring.write(slot, results[i]):
+                        results[i] = _IN_RING
+            result_queue.put((job_ids, results, delta_time))  # Send results back
     except KeyboardInterrupt:
         print(f"Embedding worker {worker_id} stopped.")
     except Exception as e:
@@ -35,16 +87,44 @@ class EmbeddingDispatcher:
         embedding_model: EmbeddingModel,
         model_path: str,
         event_loop: AbstractEventLoop,
-        num_workers: int
+        num_workers: int,
+        max_batch_size: int = 1,
+        max_wait_ms: float = 0,
+        report: Optional[Report] = None,
+        shm_slots: int = 0,
+        dimension: int = 0,
     ):
-        """Initialize the dispatcher with worker processes."""
+        """
+        Initialize the dispatcher with worker processes.
+
+        With max_batch_size > 1 each worker drains up to max_batch_size pending
+        jobs, waiting at most max_wait_ms after the first one, and embeds them
+        with a single batched call.
+
+        With shm_slots > 0 workers return vectors of the given dimension through
+        a shared memory ring instead of pickling them through the result queue.
+        """
         if num_workers <= 0:
             raise ValueError("Number of workers must be greater than 0.")
+        if max_batch_size <= 0:
+            raise ValueError("Max batch size must be greater than 0.")
+        if max_wait_ms < 0:
+            raise ValueError("Max wait must not be negative.")
 
         self.task_queue = multiprocessing.Queue()  # Tasks to workers
         self.result_queue = multiprocessing.Queue()  # Results from workers
         self.futures: dict[str, asyncio.Future] = {}  # Pending futures
         self.event_loop = event_loop
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.report = report
+        self.slots: dict[str, int] = {}  # Shared memory slot reserved per job
+        self.ring: Optional[SharedMemoryRing] = None
+        shm_info = None
+        if shm_slots > 0:
+            self.ring = SharedMemoryRing(shm_slots, dimension)
+            shm_info = (self.ring.name, shm_slots, dimension)
+            atexit.register(self.close)
         self._start_result_collector_thread()  # Start result collection thread
 
         # Start worker processes
@@ -52,7 +132,8 @@ class EmbeddingDispatcher:
         for i in range(num_workers):
             p = multiprocessing.Process(
                 target=worker_func,
-                args=(embedding_model, model_path, self.task_queue, self.result_queue, i)
+                args=(embedding_model, model_path, self.task_queue, self.result_queue, i,
+                      max_batch_size, max_wait_ms / 1000, shm_info)
             )
             p.daemon = True
             p.start()
@@ -63,22 +144,50 @@ class EmbeddingDispatcher:
         """Start a thread to collect results from worker processes."""
         def collect():
             while True:
-                job_id, result = self.result_queue.get()  # Get result from queue
-                future = self.futures.pop(job_id, None)  # Retrieve future
-                if future:
-                    self.event_loop.call_soon_threadsafe(
-                        future.set_exception if isinstance(result, Exception) else future.set_result,
-                        result
-                    )
+                item = self.result_queue.get()  # Get batch results from queue
+                if item == _STOP:
+                    return
+                job_ids, results, delta_time = item
+                if self.report is not None:
+                    self.report.embedding_batch(len(job_ids), delta_time)
+                for job_id, result in zip(job_ids, results):
+                    slot = self.slots.pop(job_id, -1)
+                    if slot >= 0:
+                        if result is _IN_RING:
+                            result = self.ring.read(slot)
+                        self.ring.release(slot)
+                    future = self.futures.pop(job_id, None)  # Retrieve future
+                    if future:
+                        self.event_loop.call_soon_threadsafe(
+                            future.set_exception if isinstance(result, Exception) else future.set_result,
+                            result
+                        )
 
-        t = threading.Thread(target=collect, daemon=True)
-        t.start()
+        self._collector = threading.Thread(target=collect, daemon=True)
+        self._collector.start()
 
     def embed(self, data: str) -> Future:
         """Submit a task for embedding generation."""
         job_id = str(uuid.uuid4())  # Generate unique job ID
         future = asyncio.get_running_loop().create_future()  # Create future
         self.futures[job_id] = future  # Store future
-        self.task_queue.put((job_id, data))  # Add task to queue
+        slot = self.ring.acquire() if self.ring is not None else -1  # -1 falls back to the result queue
+        if slot >= 0:
+            self.slots[job_id] = slot
+        self.task_queue.put((job_id, slot, data))  # Add task to queue
         return future
 
+    def close(self):
+        """Stop the result collector, then release the shared memory ring it reads from."""
+        if self._collector.is_alive():
+            self.result_queue.put(_STOP)
+            self._collector.join(timeout=5)
+        if self.ring is not None:
+            if self._collector.is_alive():
+                modelcache_log.error("Embedding result collector did not stop, keeping the shared memory ring.")
+                return
+            try:
+                self.ring.close()
+            except Exception as e:
+                modelcache_log.error(e)
+            self.ring = None
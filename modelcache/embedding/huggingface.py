@@ -29,6 +29,15 @@ class Huggingface(BaseEmbedding):
         embeddings = self.model.encode(data)
         return embeddings[0] if len(data) == 1 else embeddings
 
+    def to_embeddings_batch(self, data_list, **_):
+        """Generate embeddings for a list of texts in one forward pass.
+
+        :return: text embeddings in shape of (n, dim).
+        """
+        if not data_list:
+            raise ValueError("No data provided for embedding.")
+        return self.model.encode(list(data_list))
+
     @property
     def dimension(self):
         """Embedding dimension.
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+
+class SharedMemoryRing:
+    """
+    Fixed-dimension float32 slots in a shared memory block.
+
+    The dispatcher process creates the ring and hands out slot indexes with
+    each job; worker processes attach by name and write embeddings in place,
+    so vectors never go through pickling or the result pipe.
+    """
+
+    def __init__(self, num_slots: int, dimension: int, name: Optional[str] = None):
+        if num_slots <= 0 or dimension <= 0:
+            raise ValueError("Shared memory ring needs positive slot count and dimension.")
+        self.num_slots = num_slots
+        self.dimension = dimension
+        self._owner = name is None
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=self._owner, size=num_slots * dimension * 4
+        )
+        self._array = np.ndarray((num_slots, dimension), dtype=np.float32, buffer=self._shm.buf)
+        self._free = deque(range(num_slots))
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @classmethod
+    def attach(cls, name: str, num_slots: int, dimension: int) -> "SharedMemoryRing":
+        return cls(num_slots, dimension, name=name)
+
+    def acquire(self) -> int:
+        """Reserve a free slot, or return -1 if the ring is full."""
+        with self._lock:
+            return self._free.popleft() if self._free else -1
+
+    def release(self, slot: int):
+        with self._lock:
+            self._free.append(slot)
+
+    def write(self, slot: int, vector) -> bool:
+        """Write a vector into a slot; returns False if it does not fit."""
+        vector = np.asarray(vector)
+        if vector.size != self.dimension:
+            return False
+        self._array[slot] = vector.reshape(-1)
+        return True
+
+    def read(self, slot: int) -> np.ndarray:
+        """Copy a vector out of a slot so the slot can be recycled."""
+        return self._array[slot].copy()
+
+    def close(self):
+        self._array = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from typing import Any, Dict
+
+from modelcache.manager.scalar_data.base import TOP_ROWS_ORDER_BY
+from modelcache.utils.error import ParamError
+from modelcache.utils.log import modelcache_log
+
+
+class CacheWarmer:
+    """
+    Background preload of the memory cache from the scalar store.
+
+    For every model with live rows, the rows_per_model hottest rows (by
+    hit_count or recency, see CacheStorage.get_top_rows) are loaded into the
+    memory cache in one bulk call, so a restart does not send every hit to
+    SQL. The warm-up runs in a daemon thread and never blocks serving;
+    progress() reports how far it got. Ids deleted while it runs are
+    passed to discard() so they are not brought back into the cache.
+    """
+
+    def __init__(
+        self,
+        scalar_storage,
+        memory_cache,
+        rows_per_model: int,
+        order_by: str = "hit_count",
+    ):
+        if order_by not in TOP_ROWS_ORDER_BY:
+            raise ParamError(f"Unknown warm-up order: {order_by}, should be one of {list(TOP_ROWS_ORDER_BY)}")
+        if not scalar_storage.ranks_rows:
+            raise ParamError(f"{type(scalar_storage).__name__} cannot rank rows, disable the memory cache warm-up")
+        self._scalar_storage = scalar_storage
+        self._memory_cache = memory_cache
+        self._rows_per_model = rows_per_model
+        self._order_by = order_by
+        # Held while loading rows and while recording deletes, see discard
+        self._lock = threading.Lock()
+        self._discarded = set()
+        self._discarded_models = set()
+        self._stopped = False
+        self._done = threading.Event()
+        self._start_time = time.time()
+        self._progress = {"state": "running", "models_total": 0, "models_done": 0, "rows_loaded": 0,
+                          "seconds": 0.0}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return not self._done.is_set()
+
+    def progress(self) -> Dict[str, Any]:
+        """state ("running", "done", "stopped" or "failed"), models and rows loaded so far."""
+        with self._lock:
+            progress = dict(self._progress)
+        if progress["state"] == "running":
+            progress["seconds"] = time.time() - self._start_time
+        return progress
+
+    def wait(self, timeout=None) -> bool:
+        return self._done.wait(timeout)
+
+    def discard(self, ids, model):
+        """Keep ids of model out of the cache, they were deleted."""
+        if self.running:
+            with self._lock:
+                self._discarded.update((model, _id) for _id in ids)
+
+    def discard_model(self, model):
+        """Skip model altogether, it was truncated."""
+        if self.running:
+            with self._lock:
+                self._discarded_models.add(model)
+
+    def _load(self, model, rows):
+        with self._lock:
+            loaded = 0
+            if model not in self._discarded_models:
+                rows = [(_id, row) for _id, row in rows if (model, _id) not in self._discarded]
+                loaded = self._memory_cache.warm(rows, model=model)
+            self._progress["models_done"] += 1
+            self._progress["rows_loaded"] += loaded
+            return loaded
+
+    def _run(self):
+        state = "done"
+        try:
+            models = self._scalar_storage.get_models()
+            with self._lock:
+                self._progress["models_total"] = len(models)
+            for model in models:
+                if self._stopped:
+                    state = "stopped"
+                    break
+                rows = self._scalar_storage.get_top_rows(model, self._rows_per_model, order_by=self._order_by)
+                self._load(model, rows)
+        except Exception as e:
+            state = "failed"
+            modelcache_log.error("Memory cache warm-up failed: %s", e)
+        with self._lock:
+            self._progress["state"] = state
+            self._progress["seconds"] = time.time() - self._start_time
+            progress = dict(self._progress)
+            self._discarded.clear()
+            self._discarded_models.clear()
+        self._done.set()
+        modelcache_log.info("Memory cache warm-up %s: %s rows of %s/%s models in %.2fs.", state,
+                            progress["rows_loaded"], progress["models_done"], progress["models_total"],
+                            progress["seconds"])
+
+    def close(self):
+        self._stopped = True
+        self._thread.join(timeout=1)
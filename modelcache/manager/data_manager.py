@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import logging
 import time
 import requests
@@ -10,9 +11,15 @@ from typing import List, Any, Optional
 from typing import Union, Callable
 from modelcache.manager.scalar_data.base import CacheStorage,CacheData,DataType,Answer,Question
 from modelcache.utils.error import CacheError, ParamError
-from modelcache.manager.vector_data.base import VectorStorage, VectorData
+from modelcache.manager.vector_data.base import VectorStorage, VectorData, unpack_search_results
 from modelcache.manager.object_data.base import ObjectBase
 from modelcache.manager.eviction.memory_cache import MemoryCacheEviction
+from modelcache.manager.exact_match import ExactMatchIndex
+from modelcache.manager.hit_count_writer import HitCountWriter
+from modelcache.manager.query_log_writer import QueryLogWriter
+from modelcache.manager.snapshot_scheduler import SnapshotScheduler
+from modelcache.manager.vector_rebuild import rebuild_vectors
+from modelcache.manager.cache_warmer import CacheWarmer
 from modelcache.utils.log import modelcache_log
 
 
@@ -39,13 +46,55 @@ class DataManager(metaclass=ABCMeta):
     def update_hit_count(self, primary_id, **kwargs):
         pass
 
+    @property
+    def buffers_hit_count(self) -> bool:
+        """True if update_hit_count only buffers in memory and is safe to call from the event loop."""
+        return False
+
+    @property
+    def buffers_query_log(self) -> bool:
+        """True if save_query_resp only enqueues and is safe to call from the event loop."""
+        return False
+
     def hit_cache_callback(self, res_data, **kwargs):
         pass
 
+    def exact_match_id(self, question, **kwargs):
+        """Primary id of a byte-identical question, or None. In memory only, safe to call from the event loop."""
+        return None
+
+    def exact_match_data(self, question, primary_id, **kwargs) -> Optional[CacheData]:
+        """Fetch the row an exact-match id points to, or None if it is gone."""
+        return None
+
+    def record_exact_match(self, question, primary_id, **kwargs):
+        pass
+
     @abstractmethod
     def search(self, embedding_data, **kwargs):
         pass
 
+    async def search_async(self, embedding_data, **kwargs):
+        """Awaitable search; runs search in a worker thread by default."""
+        return await asyncio.to_thread(self.search, embedding_data, **kwargs)
+
+    def search_batch(self, embedding_datas, **kwargs):
+        """Search several query vectors; returns one result list per vector."""
+        return [self.search(embedding_data, **dict(kwargs)) for embedding_data in embedding_datas]
+
+    def get_scalar_data_batch(self, ids, **kwargs):
+        """Fetch scalar data for several primary ids; returns {id: CacheData}."""
+        result = {}
+        for _id in ids:
+            cache_data = self.get_scalar_data((None, _id), **dict(kwargs))
+            if cache_data is not None:
+                result[_id] = cache_data
+        return result
+
+    def rebuild_vectors(self, model=None, batch_size: int = 10000, progress=None):
+        """Reload the vector store from the embeddings kept in scalar storage; returns the rebuild stats."""
+        raise CacheError(f"{type(self).__name__} has no vector store to rebuild")
+
     @abstractmethod
     def delete(self, id_list, **kwargs):
         pass
@@ -72,7 +121,24 @@ class DataManager(metaclass=ABCMeta):
             memory_cache_policy: str = "ARC",
             data_path: str = "data_map.txt",
             get_data_container: Callable = None,
-            normalize: bool = True
+            normalize: bool = True,
+            exact_match_size: int = 0,
+            hit_count_flush_ms: int = 0,
+            hit_count_flush_size: int = 1000,
+            query_log_queue_size: int = 0,
+            query_log_batch_size: int = 500,
+            query_log_flush_ms: int = 1000,
+            query_log_full_policy: str = "drop",
+            query_log_sample_rate: float = 1.0,
+            query_log_block_timeout_ms: int = 1000,
+            snapshot_interval_ms: int = 0,
+            snapshot_dirty_threshold: int = 0,
+            report=None,
+            warmup_rows_per_model: int = 0,
+            warmup_order_by: str = "hit_count",
+            memory_cache_shards: int = 16,
+            memory_cache_promotion_buffer: int = 0,
+            memory_cache_promotion_sample_rate: float = 1.0
     ):
         if not cache_base and not vector_base:
             return MapDataManager(data_path, max_size, get_data_container)
@@ -84,7 +150,19 @@ class DataManager(metaclass=ABCMeta):
         if isinstance(object_base, str):
             object_base = ObjectBase.get(name=object_base)
         assert cache_base and vector_base
-        return SSDataManager(cache_base, vector_base, object_base, max_size, clean_size,normalize, memory_cache_policy)
+        return SSDataManager(cache_base, vector_base, object_base, max_size, clean_size,normalize, memory_cache_policy,
+                             exact_match_size=exact_match_size, hit_count_flush_ms=hit_count_flush_ms,
+                             hit_count_flush_size=hit_count_flush_size, query_log_queue_size=query_log_queue_size,
+                             query_log_batch_size=query_log_batch_size, query_log_flush_ms=query_log_flush_ms,
+                             query_log_full_policy=query_log_full_policy,
+                             query_log_sample_rate=query_log_sample_rate,
+                             query_log_block_timeout_ms=query_log_block_timeout_ms,
+                             snapshot_interval_ms=snapshot_interval_ms,
+                             snapshot_dirty_threshold=snapshot_dirty_threshold, report=report,
+                             warmup_rows_per_model=warmup_rows_per_model, warmup_order_by=warmup_order_by,
+                             memory_cache_shards=memory_cache_shards,
+                             memory_cache_promotion_buffer=memory_cache_promotion_buffer,
+                             memory_cache_promotion_sample_rate=memory_cache_promotion_sample_rate)
 
 
 class MapDataManager(DataManager):
@@ -170,6 +248,23 @@ class SSDataManager(DataManager):
         clean_size,
         normalize: bool,
         policy="LRU",
+        exact_match_size: int = 0,
+        hit_count_flush_ms: int = 0,
+        hit_count_flush_size: int = 1000,
+        query_log_queue_size: int = 0,
+        query_log_batch_size: int = 500,
+        query_log_flush_ms: int = 1000,
+        query_log_full_policy: str = "drop",
+        query_log_sample_rate: float = 1.0,
+        query_log_block_timeout_ms: int = 1000,
+        snapshot_interval_ms: int = 0,
+        snapshot_dirty_threshold: int = 0,
+        report=None,
+        warmup_rows_per_model: int = 0,
+        warmup_order_by: str = "hit_count",
+        memory_cache_shards: int = 16,
+        memory_cache_promotion_buffer: int = 0,
+        memory_cache_promotion_sample_rate: float = 1.0,
     ):
         self.max_size = max_size
         self.clean_size = clean_size
@@ -178,11 +273,60 @@ class SSDataManager(DataManager):
         self.o = o  # Object storage (optional)
         self.normalize = normalize
 
-        # Initialize memory cache with specified eviction policy
+        # Initialize memory cache with specified eviction policy; the
+        # sharding and buffered promotion options only apply to SHARDED_ARC
+        cache_kwargs = dict()
+        if policy.upper() == "SHARDED_ARC":
+            cache_kwargs = dict(
+                shards=memory_cache_shards,
+                promotion_buffer_size=memory_cache_promotion_buffer,
+                promotion_sample_rate=memory_cache_promotion_sample_rate)
         self.eviction_base = MemoryCacheEviction(
             policy=policy,
             maxsize=max_size,
-            clean_size=clean_size)
+            clean_size=clean_size,
+            **cache_kwargs)
+
+        # Exact-match tier: pre-embedding string digest -> primary id
+        self.exact_match_base = ExactMatchIndex(maxsize=exact_match_size)
+
+        # Write-behind hit counts, coalesced per id (0 writes every hit through)
+        self.hit_count_writer = None
+        if hit_count_flush_ms > 0:
+            self.hit_count_writer = HitCountWriter(
+                self.s.update_hit_counts,
+                flush_interval_ms=hit_count_flush_ms,
+                flush_size=hit_count_flush_size)
+
+        # Batched background query log writer (0 writes every record through)
+        self.query_log_writer = None
+        if query_log_queue_size > 0:
+            self.query_log_writer = QueryLogWriter(
+                self.s.insert_query_resps,
+                max_queue_size=query_log_queue_size,
+                batch_size=query_log_batch_size,
+                flush_interval_ms=query_log_flush_ms,
+                full_policy=query_log_full_policy,
+                sample_rate=query_log_sample_rate,
+                block_timeout_ms=query_log_block_timeout_ms)
+
+        # Periodic background flush of the storages (0 only flushes on close)
+        self.snapshot_scheduler = None
+        if snapshot_interval_ms > 0 or snapshot_dirty_threshold > 0:
+            self.snapshot_scheduler = SnapshotScheduler(
+                self.flush,
+                interval_ms=snapshot_interval_ms,
+                dirty_threshold=snapshot_dirty_threshold,
+                report=report)
+
+        # Background preload of the memory cache with the hottest rows per model (0 starts cold)
+        self.cache_warmer = None
+        if warmup_rows_per_model > 0:
+            self.cache_warmer = CacheWarmer(
+                self.s,
+                self.eviction_base,
+                rows_per_model=min(warmup_rows_per_model, max_size),
+                order_by=warmup_order_by)
 
     def save(self, questions: List[any], answers: List[any], embedding_datas: List[any], **kwargs):
         """Save multiple questions, answers, and embeddings to storage."""
@@ -191,6 +335,9 @@ class SSDataManager(DataManager):
 
     def save_query_resp(self, query_resp_dict, **kwargs):
         """Save query response log to SQL storage for analytics."""
+        if self.query_log_writer is not None:
+            self.query_log_writer.put(query_resp_dict, **kwargs)
+            return
         save_query_start_time = time.time()
         self.s.insert_query_resp(query_resp_dict, **kwargs)
         save_query_delta_time = '{}s'.format(round(time.time() - save_query_start_time, 2))
@@ -244,15 +391,32 @@ class SSDataManager(DataManager):
             embedding_data = embedding_data.astype("float32")
             cache_datas.append([answer, question, embedding_data, model])
 
-        # Insert into SQL storage and get generated IDs
+        # Insert into SQL storage and get generated IDs, None where a row failed
         ids = self.s.batch_insert(cache_datas)
+        failed = sum(_id is None for _id in ids)
+        if failed:
+            modelcache_log.error("%s of %s rows failed to insert into scalar storage, skipping them.",
+                                 failed, len(ids))
 
         # Prepare vector data and populate memory cache
         datas = []
         for _id,embedding_data,cache_data in zip(ids,embedding_datas,cache_datas):
+            if _id is None:
+                continue
             datas.append(VectorData(id=_id, data=embedding_data.astype("float32")))
             self.eviction_base.put([(_id, cache_data)],model=model)
-        self.v.mul_add(datas,model)
+        if datas:
+            self.v.mul_add(datas,model)
+
+        # Register questions in the exact-match tier once they are searchable
+        for _id, question in zip(ids, questions):
+            if _id is not None and isinstance(question, str):
+                self.exact_match_base.put(question, _id, model)
+        self._mark_dirty(len(datas))
+
+    def _mark_dirty(self, count):
+        if self.snapshot_scheduler is not None:
+            self.snapshot_scheduler.mark_dirty(count)
 
     def get_scalar_data(self, res_data, **kwargs) -> Optional[CacheData]:
         """
@@ -273,9 +437,77 @@ class SSDataManager(DataManager):
         self.eviction_base.put([(_id, cache_data)], model=model)
         return cache_data
 
+    def exact_match_id(self, question, **kwargs):
+        """Look up a byte-identical question in the exact-match tier."""
+        return self.exact_match_base.get(question, kwargs.pop("model"))
+
+    def exact_match_data(self, question, primary_id, **kwargs):
+        """
+        Resolve an exact-match id through the memory cache / SQL storage so
+        the answer is served without embedding or vector search.
+        """
+        model = kwargs.pop("model")
+        cache_data = self.get_scalar_data((None, primary_id), model=model)
+        if cache_data is None:
+            # Row is gone from the scalar store, drop the stale mapping
+            self.exact_match_base.discard(question, model)
+        return cache_data
+
+    def record_exact_match(self, question, primary_id, **kwargs):
+        """Remember the primary id a question resolved to via semantic search."""
+        model = kwargs.pop("model")
+        if isinstance(question, str):
+            self.exact_match_base.put(question, primary_id, model)
+
+    def get_scalar_data_batch(self, ids, **kwargs):
+        """
+        Retrieve scalar data for several primary ids.
+
+        Serves what it can from the memory cache and fetches the rest from
+        SQL storage in a single round-trip.
+        """
+        model = kwargs.pop("model")
+        result = {}
+        missing = []
+        for _id in dict.fromkeys(ids):
+            cache_hit = self.eviction_base.get(_id, model=model)
+            if cache_hit is not None:
+                result[_id] = cache_hit
+            else:
+                missing.append(_id)
+        if missing:
+            fetched = self.s.get_data_by_ids(missing)
+            self.eviction_base.put(list(fetched.items()), model=model)
+            result.update(fetched)
+        return result
+
     def update_hit_count(self, primary_id, **kwargs):
         """Update hit count statistics in SQL storage."""
-        self.s.update_hit_count_by_id(primary_id)
+        if self.hit_count_writer is not None:
+            self.hit_count_writer.add(primary_id, model=kwargs.get("model"))
+        else:
+            self.s.update_hit_count_by_id(primary_id)
+
+    @property
+    def buffers_hit_count(self) -> bool:
+        return self.hit_count_writer is not None
+
+    @property
+    def buffers_query_log(self) -> bool:
+        # the "block" policy may wait for room in the queue, keep it off the event loop
+        return self.query_log_writer is not None and not self.query_log_writer.blocks
+
+    def query_log_backlog(self) -> int:
+        """Number of query log records waiting to be written."""
+        return self.query_log_writer.backlog if self.query_log_writer is not None else 0
+
+    def warmup_progress(self) -> Optional[dict]:
+        """Progress of the memory cache warm-up, None when it is disabled."""
+        return self.cache_warmer.progress() if self.cache_warmer is not None else None
+
+    def hit_count_backlog(self) -> int:
+        """Number of hit count increments waiting to be written."""
+        return self.hit_count_writer.backlog if self.hit_count_writer is not None else 0
 
     def hit_cache_callback(self, res_data, **kwargs):
         """Callback executed on cache hit to update memory cache."""
@@ -293,6 +525,28 @@ class SSDataManager(DataManager):
         top_k = kwargs.get("top_k", -1)
         return self.v.search(data=embedding_data, top_k=top_k, model=model)
 
+    async def search_async(self, embedding_data, **kwargs):
+        """Search without tying up a worker thread when the vector store has an async client."""
+        model = kwargs.pop("model", None)
+        if self.normalize:
+            embedding_data = normalize(embedding_data)
+        top_k = kwargs.get("top_k", -1)
+        return await self.v.asearch(embedding_data, top_k, model)
+
+    def search_batch(self, embedding_datas, **kwargs):
+        """
+        Search several query vectors of one model with a single backend call.
+
+        Returns one list of (distance, id) results per query vector.
+        """
+        model = kwargs.pop("model", None)
+        embedding_datas = np.asarray(embedding_datas, dtype="float32")
+        if self.normalize:
+            embedding_datas = embedding_datas / np.linalg.norm(embedding_datas, axis=1, keepdims=True)
+        top_k = kwargs.get("top_k", -1)
+        distances, ids = self.v.search_batch(datas=embedding_datas, top_k=top_k, model=model)
+        return unpack_search_results(distances, ids)
+
     def delete(self, id_list, **kwargs):
         """
         Delete cache entries from all storage backends.
@@ -303,8 +557,13 @@ class SSDataManager(DataManager):
         model = kwargs.pop("model")
         try:
             # Remove from memory cache
+            if self.cache_warmer is not None:
+                self.cache_warmer.discard(id_list, model)
+            if self.hit_count_writer is not None:
+                self.hit_count_writer.discard(id_list)
             for id in id_list:
                 self.eviction_base.get_cache(model).pop(id, None)
+            self.exact_match_base.delete(id_list, model)
             # Delete from vector storage
             v_delete_count = self.v.delete(ids=id_list, model=model)
         except Exception as e:
@@ -317,6 +576,7 @@ class SSDataManager(DataManager):
             return {'status': 'failed', 'milvus': 'success',
                     'mysql': 'delete mysql data failed, please check! e: {}'.format(e)}
 
+        self._mark_dirty(len(id_list))
         return {'status': 'success', 'milvus': 'delete_count: '+str(v_delete_count),
                 'mysql': 'delete_count: '+str(s_delete_count)}
 
@@ -332,7 +592,12 @@ class SSDataManager(DataManager):
         Returns detailed status of truncation operations.
         """
         # Clear memory cache data
+        if self.cache_warmer is not None:
+            self.cache_warmer.discard_model(model)
+        if self.hit_count_writer is not None:
+            self.hit_count_writer.discard_model(model)
         self.eviction_base.clear(model)
+        self.exact_match_base.clear(model)
 
         # Rebuild vector storage (drops and recreates collection)
         try:
@@ -349,15 +614,42 @@ class SSDataManager(DataManager):
         except Exception as e:
             return {'status': 'failed', 'VectorDB': 'rebuild',
                     'ScalarDB': 'truncate scalar data failed, please check! e: {}'.format(e)}
+        self._mark_dirty(1)
         return {'status': 'success', 'VectorDB': 'rebuild', 'ScalarDB': 'delete_count: ' + str(delete_count)}
 
+    def rebuild_vectors(self, model=None, batch_size: int = 10000, progress=None):
+        """
+        Rebuild the vector store from the embeddings in SQL storage.
+
+        Used to recover a lost vector index without re-embedding; see
+        modelcache.manager.vector_rebuild.rebuild_vectors.
+        """
+        stats = rebuild_vectors(self.s, self.v, model=model, batch_size=batch_size, progress=progress)
+        self._mark_dirty(stats["rows"])
+        return stats
+
     def flush(self):
-        """Flush all storage backends to ensure data persistence."""
-        self.s.flush()
-        self.v.flush()
+        """
+        Flush all storage backends to ensure data persistence.
+
+        Returns the number of bytes the backends report having written.
+        """
+        if self.hit_count_writer is not None:
+            self.hit_count_writer.flush()
+        if self.query_log_writer is not None:
+            self.query_log_writer.flush()
+        return (self.s.flush() or 0) + (self.v.flush() or 0)
 
     def close(self):
         """Close all storage connections and release resources."""
+        if self.cache_warmer is not None:
+            self.cache_warmer.close()
+        if self.snapshot_scheduler is not None:
+            self.snapshot_scheduler.close()
+        if self.hit_count_writer is not None:
+            self.hit_count_writer.close()
+        if self.query_log_writer is not None:
+            self.query_log_writer.close()
         self.s.close()
         self.v.close()
 
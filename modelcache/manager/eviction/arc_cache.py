@@ -1,5 +1,6 @@
+import random
 from cachetools import Cache
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from readerwriterlock import rwlock
 
 _sentinel = object()
@@ -10,9 +11,15 @@ class ARC(Cache):
 
     ARC maintains four lists (T1, T2, B1, B2) to adaptively balance
     between LRU and LFU eviction strategies based on access patterns.
+
+    Every hit reorders the lists, so by default reads take the write lock.
+    With promotion_buffer_size > 0, hits on cached keys are served under
+    the read lock and only recorded (a promotion_sample_rate fraction of
+    them); the recorded hits are applied in one batch under the write lock
+    once promotion_buffer_size have accumulated.
     """
 
-    def __init__(self, maxsize, getsizeof=None):
+    def __init__(self, maxsize, getsizeof=None, promotion_buffer_size=0, promotion_sample_rate=1.0):
         """Initialize ARC cache with maximum size."""
         super().__init__(maxsize, getsizeof)
         self.t1 = OrderedDict()  # Recent items
@@ -21,6 +28,9 @@ class ARC(Cache):
         self.b2 = OrderedDict()  # Ghost entries for T2
         self.p = 0               # Adaptive parameter
         self._rw_lock = rwlock.RWLockWrite()  # Thread safety
+        self._promotion_buffer_size = promotion_buffer_size
+        self._promotion_sample_rate = promotion_sample_rate
+        self._accesses = deque()  # Hits waiting to be applied
 
     def __len__(self):
         """Return total number of cached items."""
@@ -58,25 +68,74 @@ class ARC(Cache):
             self.t1.move_to_end(key)
             self._evict_internal()
 
+    def warm(self, items):
+        """
+        Bulk-load (key, value) pairs, hottest first, under one lock.
+
+        Keys already cached are kept, and loading stops once the cache is
+        full, so a warm-up never evicts live entries. Warm entries are put at
+        the LRU end of T1, hottest last, behind whatever traffic added.
+        Returns the number of entries loaded.
+        """
+        loaded = 0
+        with self._rw_lock.gen_wlock():
+            for key, value in items:
+                if len(self.t1) + len(self.t2) >= self.maxsize:
+                    break
+                if key in self.t1 or key in self.t2:
+                    continue
+                self.b1.pop(key, None)
+                self.b2.pop(key, None)
+                self.t1[key] = value
+                self.t1.move_to_end(key, last=False)
+                loaded += 1
+        return loaded
+
+    def _hit(self, key):
+        """Apply a hit on a cached key to T1/T2 and p. Call with the write lock held."""
+        if key in self.t1:
+            # Move from recent to frequent list
+            value = self.t1.pop(key)
+            self.t2[key] = value
+            self.t2.move_to_end(key)
+            self.p = max(0, self.p - 1)  # Adjust adaptive parameter
+        else:
+            # Access frequent list
+            value = self.t2.pop(key)
+            self.t2[key] = value
+            self.t2.move_to_end(key)
+            self.p = min(self.maxsize, self.p + 1)  # Adjust adaptive parameter
+        self._evict_internal()
+        return value
+
+    def _record_access(self, key):
+        if self._promotion_sample_rate < 1 and random.random() >= self._promotion_sample_rate:
+            return
+        self._accesses.append(key)
+        if len(self._accesses) >= self._promotion_buffer_size:
+            self.apply_accesses()
+
+    def apply_accesses(self):
+        """Apply the buffered hits, skipping keys evicted since."""
+        with self._rw_lock.gen_wlock():
+            while self._accesses:
+                key = self._accesses.popleft()
+                if key in self.t1 or key in self.t2:
+                    self._hit(key)
+
     def __getitem__(self, key):
         """Retrieve a cache entry and update access pattern."""
-        with self._rw_lock.gen_wlock():
-            if key in self.t1:
-                # Move from recent to frequent list
-                value = self.t1.pop(key)
-                self.t2[key] = value
-                self.t2.move_to_end(key)
-                self.p = max(0, self.p - 1)  # Adjust adaptive parameter
-                self._evict_internal()
-                return value
-            if key in self.t2:
-                # Access frequent list
-                value = self.t2.pop(key)
-                self.t2[key] = value
-                self.t2.move_to_end(key)
-                self.p = min(self.maxsize, self.p + 1)  # Adjust adaptive parameter
-                self._evict_internal()
+        if self._promotion_buffer_size > 0:
+            with self._rw_lock.gen_rlock():
+                value = self.t1.get(key, _sentinel)
+                if value is _sentinel:
+                    value = self.t2.get(key, _sentinel)
+            if value is not _sentinel:
+                self._record_access(key)
                 return value
+        with self._rw_lock.gen_wlock():
+            if key in self.t1 or key in self.t2:
+                return self._hit(key)
             if key in self.b1:
                 # Promote from ghost list B1 to frequent list T2
                 self.b1.pop(key)
@@ -119,6 +178,7 @@ class ARC(Cache):
             self.b1.clear()
             self.b2.clear()
             self.p = 0
+            self._accesses.clear()
             super().clear()
 
     def __iter__(self):
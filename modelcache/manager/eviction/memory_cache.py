@@ -4,6 +4,7 @@ import cachetools
 
 from modelcache.manager.eviction.base import EvictionBase
 from .arc_cache import ARC
+from .sharded_arc_cache import ShardedARC
 from .wtinylfu_cache import W2TinyLFU
 
 
@@ -39,6 +40,8 @@ class MemoryCacheEviction(EvictionBase):
             cache = W2TinyLFU(maxsize=self.maxsize)
         elif self._policy == "ARC":
             cache = ARC(maxsize=self.maxsize)
+        elif self._policy == "SHARDED_ARC":
+            cache = ShardedARC(maxsize=self.maxsize, **self.kwargs)
         else:
             raise ValueError(f"Unknown policy {self.policy}")
         return cache
@@ -49,6 +52,20 @@ class MemoryCacheEviction(EvictionBase):
             cache[key] = value
 
 
+    def warm(self, objs: List[Tuple[Any, Any]], model: str) -> int:
+        """Preload (key, value) pairs, hottest first, without replacing or evicting cached entries."""
+        cache = self.get_cache(model)
+        if hasattr(cache, "warm"):
+            return cache.warm(objs)
+        loaded = 0
+        for key, value in objs:
+            if len(cache) >= self.maxsize:
+                break
+            if key not in cache:
+                cache[key] = value
+                loaded += 1
+        return loaded
+
     def get(self, obj: Any, model: str):
         cache = self.get_cache(model)
         return cache.get(obj)
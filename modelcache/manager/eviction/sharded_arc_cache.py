@@ -0,0 +1,90 @@
+from itertools import chain
+from cachetools import Cache
+
+from .arc_cache import ARC, _sentinel
+
+
+class ShardedARC(Cache):
+    """
+    ARC split into independent shards to spread lock contention.
+
+    Keys are assigned to one of `shards` ARC instances by hash, each with
+    its own lock, lists and adaptive parameter p, and maxsize / shards
+    entries (the remainder going to the first shards). Threads reading different keys mostly take different locks.
+    promotion_buffer_size and promotion_sample_rate are passed to every
+    shard, see ARC.
+    """
+
+    def __init__(self, maxsize, getsizeof=None, shards=16, promotion_buffer_size=0, promotion_sample_rate=1.0):
+        """Initialize the shards, splitting maxsize between them."""
+        super().__init__(maxsize, getsizeof)
+        shards = max(1, min(shards, maxsize))
+        # Shard sizes add up to maxsize exactly
+        shard_size, remainder = divmod(maxsize, shards)
+        self._shards = [
+            ARC(shard_size + (1 if i < remainder else 0), getsizeof, promotion_buffer_size=promotion_buffer_size,
+                promotion_sample_rate=promotion_sample_rate)
+            for i in range(shards)
+        ]
+
+    def _shard(self, key) -> ARC:
+        return self._shards[hash(key) % len(self._shards)]
+
+    @property
+    def shards(self):
+        return self._shards
+
+    def __len__(self):
+        """Return total number of cached items."""
+        return sum(len(shard) for shard in self._shards)
+
+    def __contains__(self, key):
+        """Check if key exists in cache."""
+        return key in self._shard(key)
+
+    def __setitem__(self, key, value):
+        """Insert or update a cache entry."""
+        self._shard(key)[key] = value
+
+    def __getitem__(self, key):
+        """Retrieve a cache entry and update access pattern."""
+        return self._shard(key)[key]
+
+    def __delitem__(self, key):
+        self._shard(key).pop(key)
+
+    def get(self, key, default=None):
+        # One lookup, the entry may be evicted between a containment check and the read
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, default=_sentinel):
+        """Remove a cache entry."""
+        return self._shard(key).pop(key, default)
+
+    def warm(self, items):
+        """Bulk-load (key, value) pairs, hottest first, into their shards; see ARC.warm."""
+        by_shard = dict()
+        for key, value in items:
+            by_shard.setdefault(hash(key) % len(self._shards), []).append((key, value))
+        return sum(self._shards[i].warm(shard_items) for i, shard_items in by_shard.items())
+
+    def apply_accesses(self):
+        """Apply the buffered hits of every shard."""
+        for shard in self._shards:
+            shard.apply_accesses()
+
+    def clear(self):
+        """Clear all cache entries."""
+        for shard in self._shards:
+            shard.clear()
+
+    def __iter__(self):
+        """Iterate over cache keys."""
+        return chain.from_iterable(iter(shard) for shard in self._shards)
+
+    def __repr__(self):
+        """Return string representation of the cache."""
+        return (f"ShardedARC(maxsize={self.maxsize}, shards={len(self._shards)}, len={len(self)})")
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Iterable, Optional
+
+
+def text_digest(text: str) -> bytes:
+    """Stable 128-bit digest of a pre-embedding string."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class ExactMatchIndex:
+    """
+    Per-model exact-match tier keyed on a digest of the pre-embedding string.
+
+    Maps digest -> primary id so byte-identical prompts can skip embedding and
+    vector search. Each model keeps a bounded LRU plus a reverse map so entries
+    can be dropped when their primary id is deleted.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._forward = dict()  # model -> OrderedDict(digest -> id)
+        self._reverse = dict()  # model -> dict(id -> set(digest))
+        self._lock = Lock()
+
+    def _get_maps(self, model):
+        if model not in self._forward:
+            self._forward[model] = OrderedDict()
+            self._reverse[model] = dict()
+        return self._forward[model], self._reverse[model]
+
+    def _unlink(self, reverse, digest, _id):
+        digests = reverse.get(_id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                reverse.pop(_id, None)
+
+    def put(self, text: str, _id: Any, model: str):
+        if self.maxsize <= 0:
+            return
+        digest = text_digest(text)
+        with self._lock:
+            forward, reverse = self._get_maps(model)
+            old_id = forward.pop(digest, None)
+            if old_id is not None:
+                self._unlink(reverse, digest, old_id)
+            forward[digest] = _id
+            reverse.setdefault(_id, set()).add(digest)
+            while len(forward) > self.maxsize:
+                evicted_digest, evicted_id = forward.popitem(last=False)
+                self._unlink(reverse, evicted_digest, evicted_id)
+
+    def get(self, text: str, model: str) -> Optional[Any]:
+        if self.maxsize <= 0:
+            return None
+        digest = text_digest(text)
+        with self._lock:
+            forward = self._forward.get(model)
+            if forward is None or digest not in forward:
+                return None
+            forward.move_to_end(digest)
+            return forward[digest]
+
+    def discard(self, text: str, model: str):
+        digest = text_digest(text)
+        with self._lock:
+            forward = self._forward.get(model)
+            if forward is None:
+                return
+            _id = forward.pop(digest, None)
+            if _id is not None:
+                self._unlink(self._reverse[model], digest, _id)
+
+    def delete(self, ids: Iterable[Any], model: str):
+        with self._lock:
+            forward = self._forward.get(model)
+            if forward is None:
+                return
+            reverse = self._reverse[model]
+            for _id in ids:
+                for digest in reverse.pop(_id, ()):
+                    forward.pop(digest, None)
+
+    def clear(self, model: str):
+        with self._lock:
+            self._forward.pop(model, None)
+            self._reverse.pop(model, None)
+
+    def __len__(self):
+        return sum(len(forward) for forward in self._forward.values())
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from modelcache.utils.log import modelcache_log
+
+
+class HitCountWriter:
+    """
+    Write-behind aggregator for hit count updates.
+
+    Increments are coalesced per primary id in memory and written with one
+    bulk call every flush_interval_ms, or as soon as flush_size distinct ids
+    are pending. A failed write is kept for retry and the background thread
+    backs off exponentially (up to max_backoff_ms) until a write succeeds.
+    At most max_pending distinct ids are held; increments for further ids
+    are dropped and counted in dropped_count.
+    """
+
+    def __init__(
+        self,
+        write_func: Callable[[Dict[Any, int]], Any],
+        flush_interval_ms: int = 1000,
+        flush_size: int = 1000,
+        max_pending: int = 100000,
+        max_backoff_ms: int = 60000,
+    ):
+        self._write_func = write_func
+        self._flush_interval = flush_interval_ms / 1000
+        self._flush_size = flush_size
+        self._max_pending = max_pending
+        self._max_backoff = max_backoff_ms / 1000
+        self._pending: Dict[Any, int] = {}
+        # primary id -> model, for the ids added with one
+        self._models: Dict[Any, Any] = {}
+        self._backlog = 0
+        self._failures = 0
+        self._retry_at = 0.0
+        self.dropped_count = 0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def backlog(self) -> int:
+        """Number of increments not yet written to storage."""
+        return self._backlog
+
+    def _add_locked(self, primary_id, count) -> bool:
+        if primary_id not in self._pending and len(self._pending) >= self._max_pending:
+            self.dropped_count += count
+            return False
+        self._pending[primary_id] = self._pending.get(primary_id, 0) + count
+        return True
+
+    def add(self, primary_id, count: int = 1, model=None):
+        with self._cond:
+            if not self._add_locked(primary_id, count):
+                return
+            self._backlog += count
+            if model is not None:
+                self._models[primary_id] = model
+            if len(self._pending) >= self._flush_size:
+                self._cond.notify()
+
+    def _forget_locked(self, primary_ids):
+        for primary_id in primary_ids:
+            self._backlog -= self._pending.pop(primary_id, 0)
+            self._models.pop(primary_id, None)
+
+    def discard(self, primary_ids):
+        """Drop the pending increments of deleted ids."""
+        with self._cond:
+            self._forget_locked(primary_ids)
+
+    def discard_model(self, model):
+        """Drop the pending increments of a truncated model."""
+        with self._cond:
+            self._forget_locked([i for i, m in self._models.items() if m == model])
+
+    def _take(self) -> Dict[Any, int]:
+        with self._cond:
+            pending, self._pending = self._pending, {}
+            return pending
+
+    def _requeue(self, pending: Dict[Any, int], reason):
+        """Keep failed increments for a retry after an exponential backoff."""
+        with self._cond:
+            self._failures += 1
+            backoff = min(self._flush_interval * 2 ** self._failures, self._max_backoff)
+            self._retry_at = time.monotonic() + backoff
+            for primary_id, count in pending.items():
+                if not self._add_locked(primary_id, count):
+                    self._backlog -= count
+                    self._models.pop(primary_id, None)
+        modelcache_log.error("Hit count flush failed, keeping %s ids for retry in %.1fs: %s",
+                             len(pending), backoff, reason)
+
+    def _write(self, pending: Dict[Any, int]):
+        if not pending:
+            return
+        try:
+            retry = self._write_func(pending) or {}
+        except Exception as e:
+            self._requeue(pending, e)
+            return
+        with self._cond:
+            for primary_id, count in pending.items():
+                if primary_id not in retry:
+                    self._backlog -= count
+                    if primary_id not in self._pending:
+                        self._models.pop(primary_id, None)
+            if not retry:
+                self._failures = 0
+                self._retry_at = 0.0
+        if retry:
+            self._requeue(retry, "transient errors on some ids")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                backoff = self._retry_at - time.monotonic()
+                if not self._stopped and (backoff > 0 or len(self._pending) < self._flush_size):
+                    # after a failure, wait out the backoff even if flush_size is reached
+                    self._cond.wait(timeout=max(backoff, self._flush_interval))
+                if self._stopped:
+                    return
+                if time.monotonic() < self._retry_at:
+                    continue
+            self.flush()
+
+    def flush(self):
+        """Write all pending increments now."""
+        with self._write_lock:
+            self._write(self._take())
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=max(self._flush_interval, 1))
+        self.flush()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from modelcache.utils.error import ParamError
+from modelcache.utils.log import modelcache_log
+
+QueryLogRecord = Tuple[Dict[str, Any], Dict[str, Any]]  # (query_resp, kwargs)
+
+_STOP = object()  # wakes the background writer on close
+
+
+class QueryLogWriter:
+    """
+    Bounded queue of query log records drained by a background writer.
+
+    Records are written in batches of up to batch_size, waiting at most
+    flush_interval_ms to fill a batch. When the queue is full, full_policy
+    "drop" discards the record and "block" makes the caller wait up to
+    block_timeout_ms before dropping it. put() runs on the caller's thread,
+    so with "block" it must not be called from an event loop (see
+    blocks). With sample_rate < 1 only that fraction of successful
+    requests is logged; errors are always kept.
+    """
+
+    def __init__(
+        self,
+        write_func: Callable[[List[QueryLogRecord]], Any],
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval_ms: int = 1000,
+        full_policy: str = "drop",
+        sample_rate: float = 1.0,
+        block_timeout_ms: int = 1000,
+    ):
+        if full_policy not in ("drop", "block"):
+            raise ParamError(f"Unknown query log full policy: {full_policy}, should be one of ['drop', 'block']")
+        self._write_func = write_func
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval_ms / 1000
+        self._full_policy = full_policy
+        self._sample_rate = sample_rate
+        self._block_timeout = block_timeout_ms / 1000
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.dropped_count = 0
+        self.sampled_out_count = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def blocks(self) -> bool:
+        """True if put may wait for room in the queue."""
+        return self._full_policy == "block"
+
+    @property
+    def backlog(self) -> int:
+        """Number of records waiting to be written."""
+        return self._queue.qsize()
+
+    def put(self, query_resp: Dict[str, Any], **kwargs):
+        if (self._sample_rate < 1.0 and query_resp.get('errorCode') == 0
+                and random.random() >= self._sample_rate):
+            self.sampled_out_count += 1
+            return
+        record = (query_resp, kwargs)
+        try:
+            if self._full_policy == "block":
+                self._queue.put(record, timeout=self._block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_count += 1
+
+    def _write(self, batch: List[QueryLogRecord]):
+        if not batch:
+            return
+        with self._write_lock:
+            try:
+                self._write_func(batch)
+            except Exception as e:
+                modelcache_log.error("Query log write failed, %s records lost: %s", len(batch), e)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                record = self._queue.get(timeout=self._flush_interval)
+            except queue.Empty:
+                continue
+            if record is _STOP:
+                return
+            batch = [record]
+            deadline = time.monotonic() + self._flush_interval
+            while len(batch) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    self._write(batch)
+                    return
+                batch.append(record)
+            self._write(batch)
+
+    def flush(self):
+        """Write every queued record now."""
+        while True:
+            batch = []
+            try:
+                while len(batch) < self._batch_size:
+                    record = self._queue.get_nowait()
+                    if record is not _STOP:
+                        batch.append(record)
+            except queue.Empty:
+                pass
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self):
+        self._stopped.set()
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass  # the writer is busy draining and will see the stop flag
+        self._thread.join(timeout=max(self._flush_interval, 1) * 2)
+        self.flush()
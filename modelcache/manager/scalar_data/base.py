@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from abc import ABCMeta, abstractmethod
 from dataclasses import dataclass
-from typing import Union, Dict, List, Optional, Any
+from typing import Union, Dict, List, Optional, Any, Tuple
 from enum import IntEnum
 import numpy as np
 
@@ -9,6 +9,13 @@ from modelcache.utils import import_sql_client
 from modelcache.utils.error import NotFoundError
 
 
+# ORDER BY clauses of CacheStorage.get_top_rows; gmt_modified moves on every hit
+TOP_ROWS_ORDER_BY = {
+    "hit_count": "hit_count DESC, gmt_modified DESC",
+    "recency": "gmt_modified DESC",
+}
+
+
 class DataType(IntEnum):
     STR = 0
     IMAGE_BASE64 = 1
@@ -101,10 +108,57 @@ class CacheStorage(metaclass=ABCMeta):
     def insert_query_resp(self, query_resp, **kwargs):
         pass
 
+    def insert_query_resps(self, records: List[Tuple[Dict[str, Any], Dict[str, Any]]]):
+        """Insert several query log records, each a (query_resp, kwargs) pair."""
+        for query_resp, kwargs in records:
+            self.insert_query_resp(query_resp, **kwargs)
+
     @abstractmethod
     def get_data_by_id(self, key):
         pass
 
+    def get_data_by_ids(self, keys) -> Dict[Any, Any]:
+        """Fetch several rows by id; returns {id: row} for the ids that exist."""
+        result = {}
+        for key in keys:
+            row = self.get_data_by_id(key)
+            if row is not None:
+                result[key] = row
+        return result
+
+    @property
+    def stores_embeddings(self) -> bool:
+        """True if rows keep their embedding, so iter_embeddings can return them."""
+        return False
+
+    def iter_embeddings(self, model=None, batch_size: int = 10000):
+        """
+        Stream the stored embeddings of live rows, for model or for every model.
+
+        Yields (model, ids, embeddings) blocks of at most batch_size rows,
+        embeddings being an (n, d) float32 array, so the whole table never
+        has to fit in memory. Rows stored without an embedding are skipped;
+        stores without stores_embeddings yield nothing.
+        """
+        return iter(())
+
+    @property
+    def ranks_rows(self) -> bool:
+        """True if get_models and get_top_rows are supported."""
+        return False
+
+    def get_models(self) -> List[Any]:
+        """Models that have live rows; none when ranks_rows is False."""
+        return []
+
+    def get_top_rows(self, model, limit: int, order_by: str = "hit_count") -> List[Tuple[Any, Any]]:
+        """
+        The limit hottest live rows of model as (id, row) pairs, hottest first,
+        rows having the shape returned by get_data_by_id. order_by is a key of
+        TOP_ROWS_ORDER_BY. Empty when ranks_rows is False.
+        """
+        return []
+
     @abstractmethod
     def mark_deleted(self, keys):
         pass
@@ -135,12 +189,24 @@ class CacheStorage(metaclass=ABCMeta):
 
     @abstractmethod
     def batch_insert(self, all_data: List[CacheData]):
+        """Insert rows; returns their new ids in input order, None for rows that failed."""
         pass
 
     @abstractmethod
     def update_hit_count_by_id(self, primary_id):
         pass
 
+    def update_hit_counts(self, counts: Dict[Any, int]):
+        """
+        Add several hit count increments, {id: increment}, in one go.
+
+        May return the {id: increment} part that failed transiently and
+        should be retried; increments for missing rows are ignored.
+        """
+        for primary_id, count in counts.items():
+            for _ in range(count):
+                self.update_hit_count_by_id(primary_id)
+
     @staticmethod
     def get(name, **kwargs):
         if name in ["mysql", "oceanbase"]:
@@ -152,11 +218,14 @@ class CacheStorage(metaclass=ABCMeta):
             SQL_URL = {"sqlite": "./sqlite.db"}
             from modelcache.manager.scalar_data.sql_storage_sqlite import SQLStorage
             sql_url = kwargs.get("sql_url", SQL_URL[name])
-            cache_base = SQLStorage(db_type=name, url=sql_url)
+            cache_base = SQLStorage(db_type=name, url=sql_url,
+                                    journal_mode=kwargs.get("journal_mode", "WAL"),
+                                    synchronous=kwargs.get("synchronous", "NORMAL"),
+                                    embedding_storage=kwargs.get("embedding_storage", "float32"))
         elif name == 'elasticsearch':
             from modelcache.manager.scalar_data.sql_storage_es import SQLStorage
             config = kwargs.get("config")
-            cache_base = SQLStorage(db_type=name, config=config)
+            cache_base = SQLStorage(db_type=name, config=config, dimension=kwargs.get("dimension", 0))
         else:
             raise NotFoundError("cache store", name)
         return cache_base
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from typing import Optional
+import numpy as np
+
+from modelcache.utils.error import ParamError
+
+# How modelcache_llm_answer.embedding_data is stored:
+#   float32: raw float32 bytes (4 bytes per dimension)
+#   float16: raw float16 bytes (2 bytes per dimension)
+#   int8:    float32 per-row scale followed by int8 values (1 byte per dimension)
+#   none:    not stored, the column is left empty
+EMBEDDING_STORAGE_MODES = ("float32", "float16", "int8", "none")
+
+_SCALE_BYTES = 4
+
+
+def check_embedding_storage(mode: str) -> str:
+    if mode not in EMBEDDING_STORAGE_MODES:
+        raise ParamError(f"Unknown embedding storage: {mode}, should be one of {list(EMBEDDING_STORAGE_MODES)}")
+    return mode
+
+
+def encode_embedding(embedding, mode: str = "float32") -> bytes:
+    if mode == "none":
+        return b""
+    embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    if mode == "float16":
+        return embedding.astype(np.float16).tobytes()
+    if mode == "int8":
+        max_abs = float(np.abs(embedding).max()) if embedding.size else 0.0
+        scale = np.float32(max_abs / 127 if max_abs > 0 else 1.0)
+        quantized = np.clip(np.rint(embedding / scale), -127, 127).astype(np.int8)
+        return scale.tobytes() + quantized.tobytes()
+    return embedding.tobytes()
+
+
+def decode_embedding(data, mode: str = "float32") -> Optional[np.ndarray]:
+    """Inverse of encode_embedding, always float32; None when nothing was stored."""
+    if not data or mode == "none":
+        return None
+    if mode == "float16":
+        return np.frombuffer(data, dtype=np.float16).astype(np.float32)
+    if mode == "int8":
+        scale = np.frombuffer(data[:_SCALE_BYTES], dtype=np.float32)[0]
+        return np.frombuffer(data[_SCALE_BYTES:], dtype=np.int8).astype(np.float32) * scale
+    return np.frombuffer(data, dtype=np.float32)
+
+
+def decode_embeddings(datas, mode: str = "float32") -> np.ndarray:
+    """Decode stored embeddings of one dimension into a single (n, d) float32 block."""
+    block = np.frombuffer(b"".join(datas), dtype=np.uint8).reshape(len(datas), -1)
+    if mode == "float16":
+        return block.view(np.float16).astype(np.float32)
+    if mode == "int8":
+        scales = block[:, :_SCALE_BYTES].copy().view(np.float32)
+        return block[:, _SCALE_BYTES:].view(np.int8).astype(np.float32) * scales
+    return block.view(np.float32)
+
+
+def embedding_blocks(rows, mode: str = "float32"):
+    """
+    Turn (id, model, stored embedding) rows into (model, ids, embeddings)
+    blocks, one per model present in rows. Rows without an embedding are
+    skipped.
+    """
+    by_model = dict()
+    for _id, model, data in rows:
+        if data:
+            ids, datas = by_model.setdefault(model, ([], []))
+            ids.append(_id)
+            datas.append(data)
+    for model, (ids, datas) in by_model.items():
+        yield model, ids, decode_embeddings(datas, mode)
@@ -3,14 +3,20 @@ import uuid
 
 import pymysql
 import json
-import numpy as np
 from typing import List
-from modelcache.manager.scalar_data.base import CacheStorage, CacheData
+from modelcache.utils.error import ParamError
+from modelcache.manager.scalar_data.base import CacheStorage, CacheData, TOP_ROWS_ORDER_BY
+from modelcache.manager.scalar_data.embedding_codec import check_embedding_storage, encode_embedding, embedding_blocks
 from DBUtils.PooledDB import PooledDB
 
 
 class SQLStorage(CacheStorage):
 
+    # Multi-row INSERT of batch_insert: the prefix, then one ROW per row joined with commas
+    INSERT_ANSWER_SQL = ("INSERT INTO modelcache_llm_answer "
+                         "(id, question, answer, answer_type, model, embedding_data, is_deleted) VALUES ")
+    INSERT_ANSWER_ROW = "(%s, %s, %s, %s, %s, %s, %s)"
+
     def __init__(
         self,
         db_type: str = "mysql",
@@ -22,61 +28,45 @@ class SQLStorage(CacheStorage):
         self.username = config.get('mysql', 'username')
         self.password = config.get('mysql', 'password')
         self.database = config.get('mysql', 'database')
+        # Rows per multi-row INSERT in batch_insert
+        self.insert_chunk_size = int(config.get('mysql', 'insert_chunk_size', fallback=500))
+        # float32, float16, int8 (with a per-row scale) or none
+        self.embedding_storage = check_embedding_storage(
+            config.get('mysql', 'embedding_storage', fallback='float32'))
         self.pool = PooledDB(
             creator=pymysql,
+            # warm-up: connections opened at startup
+            mincached=int(config.get('mysql', 'mincached', fallback=2)),
+            maxcached=int(config.get('mysql', 'maxcached', fallback=10)),
+            maxconnections=int(config.get('mysql', 'maxconnections', fallback=20)),
+            # wait for a free connection instead of failing when the pool is exhausted
+            blocking=config.getboolean('mysql', 'blocking', fallback=True),
+            # health check: 0 = never ping, a lost connection is reopened when a statement fails on it;
+            # 1 = ping whenever a connection is taken from the pool (one more round-trip per checkout)
+            ping=int(config.get('mysql', 'ping', fallback=0)),
             host=self.host,
             user=self.username,
             password=self.password,
             port=self.port,
-            database=self.database
+            database=self.database,
+            # bytes are sent as _binary'...' literals, for every statement alike
+            binary_prefix=True
         )
 
     def create(self):
         pass
 
     def _insert(self, data: List):
-        answer = data[0]
-        question = data[1]
-        embedding_data = data[2]
-        model = data[3]
-        answer_type = 0
-        embedding_data = embedding_data.tobytes()
-        is_deleted = 0
-        _id = str(uuid.uuid4())
-
-        table_name = "modelcache_llm_answer"
-        insert_sql = f"""
-            INSERT INTO {table_name} 
-            (id, question, answer, answer_type, model, embedding_data, is_deleted)
-            VALUES (%s, %s, %s, %s, %s, _binary%s, %s)
-        """
-        conn = self.pool.connection()
-        try:
-            with conn.cursor() as cursor:
-                # 执行插入数据操作
-                values = (_id, question, answer, answer_type, model, embedding_data, is_deleted)
-                cursor.execute(insert_sql, values)
-                conn.commit()
-        finally:
-            # 关闭连接，将连接返回给连接池
-            conn.close()
-        return _id
+        return self.batch_insert([data])[0]
 
     def batch_insert(self, all_data: List[List]):
-        table_name = "modelcache_llm_answer"
-        insert_sql = f"""
-            INSERT INTO {table_name}
-            (id, question, answer, answer_type, model, embedding_data, is_deleted)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
-
         values_list = []
         ids = []
 
         for data in all_data:
             answer = data[0]
             question = data[1]
-            embedding_data = data[2].tobytes()
+            embedding_data = encode_embedding(data[2], self.embedding_storage)
             model = data[3]
             answer_type = 0
             is_deleted = 0
@@ -90,38 +80,48 @@ class SQLStorage(CacheStorage):
         conn = self.pool.connection()
         try:
             with conn.cursor() as cursor:
-                cursor.executemany(insert_sql, values_list)
+                # 分块的多行 VALUES 插入, 一次提交
+                for start in range(0, len(values_list), self.insert_chunk_size):
+                    chunk = values_list[start:start + self.insert_chunk_size]
+                    insert_sql = self.INSERT_ANSWER_SQL + ",".join([self.INSERT_ANSWER_ROW] * len(chunk))
+                    cursor.execute(insert_sql, [v for values in chunk for v in values])
                 conn.commit()
         finally:
             conn.close()
 
         return ids
 
-    def insert_query_resp(self, query_resp, **kwargs):
-        error_code = query_resp.get('errorCode')
-        error_desc = query_resp.get('errorDesc')
-        cache_hit = query_resp.get('cacheHit')
-        model = kwargs.get('model')
-        query = kwargs.get('query')
-        delta_time = kwargs.get('delta_time')
+    def _query_log_values(self, query_resp, **kwargs):
         hit_query = query_resp.get('hit_query')
-        answer = query_resp.get('answer')
-
         if isinstance(hit_query, list):
             hit_query = json.dumps(hit_query, ensure_ascii=False)
+        return (
+            query_resp.get('errorCode'),
+            query_resp.get('errorDesc'),
+            query_resp.get('cacheHit'),
+            kwargs.get('model'),
+            kwargs.get('query'),
+            kwargs.get('delta_time'),
+            hit_query,
+            query_resp.get('answer'),
+        )
+
+    def insert_query_resp(self, query_resp, **kwargs):
+        self.insert_query_resps([(query_resp, kwargs)])
 
+    def insert_query_resps(self, records):
         table_name = "modelcache_query_log"
         insert_sql = f"""
             INSERT INTO {table_name} 
             (error_code, error_desc, cache_hit, model, query, delta_time, hit_query, answer) 
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """
+        values_list = [self._query_log_values(query_resp, **kwargs) for query_resp, kwargs in records]
         conn = self.pool.connection()
         try:
             with conn.cursor() as cursor:
                 # 执行插入数据操作
-                values = (error_code, error_desc, cache_hit, model, query, delta_time, hit_query, answer)
-                cursor.execute(insert_sql, values)
+                cursor.executemany(insert_sql, values_list)
                 conn.commit()
         finally:
             # 关闭连接，将连接返回给连接池
@@ -129,8 +129,9 @@ class SQLStorage(CacheStorage):
 
     def get_data_by_id(self, key: int):
         table_name = "modelcache_llm_answer"
+        # Only project what the query path uses, embedding_data is left on disk
         query_sql = f"""
-            SELECT answer, question, embedding_data, model
+            SELECT answer, question, model
             FROM {table_name}
             WHERE id = %s
         """
@@ -144,17 +145,99 @@ class SQLStorage(CacheStorage):
             # 关闭连接，将连接返回给连接池
             conn.close()
 
-        if resp is not None and len(resp) == 4:
-            # parse the numpy array from bytes and return the data
-            return resp[0], resp[1], np.frombuffer(resp[2], dtype=np.float32), resp[3]
+        if resp is not None and len(resp) == 3:
+            return resp[0], resp[1], None, resp[2]
         else:
             return None
 
+    def get_data_by_ids(self, keys):
+        if not keys:
+            return {}
+        table_name = "modelcache_llm_answer"
+        placeholders = ",".join(["%s"] * len(keys))
+        query_sql = f"""
+            SELECT id, answer, question, model
+            FROM {table_name}
+            WHERE id IN ({placeholders})
+        """
+        conn = self.pool.connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query_sql, list(keys))
+                rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        return {
+            row[0]: (row[1], row[2], None, row[3])
+            for row in rows
+        }
+
+    @property
+    def stores_embeddings(self):
+        return self.embedding_storage != "none"
+
+    @property
+    def ranks_rows(self):
+        return True
+
+    def iter_embeddings(self, model=None, batch_size: int = 10000):
+        table_name = "modelcache_llm_answer"
+        query_sql = f"SELECT id, model, embedding_data FROM {table_name} WHERE is_deleted = 0"
+        params = ()
+        if model is not None:
+            query_sql += " AND model = %s"
+            params = (model,)
+        conn = self.pool.connection()
+        try:
+            # SSCursor streams the result set from the server instead of buffering it client side
+            with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(query_sql, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from embedding_blocks(rows, self.embedding_storage)
+        finally:
+            conn.close()
+
+    def get_models(self):
+        table_name = "modelcache_llm_answer"
+        query_sql = f"SELECT DISTINCT model FROM {table_name} WHERE is_deleted = 0"
+        conn = self.pool.connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query_sql)
+                models = [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+        return models
+
+    def get_top_rows(self, model, limit: int, order_by: str = "hit_count"):
+        if order_by not in TOP_ROWS_ORDER_BY:
+            raise ParamError(f"Unknown order: {order_by}, should be one of {list(TOP_ROWS_ORDER_BY)}")
+        table_name = "modelcache_llm_answer"
+        query_sql = f"""
+            SELECT id, answer, question, model
+            FROM {table_name}
+            WHERE model = %s AND is_deleted = 0
+            ORDER BY {TOP_ROWS_ORDER_BY[order_by]}
+            LIMIT %s
+        """
+        conn = self.pool.connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query_sql, (model, limit))
+                rows = cursor.fetchall()
+        finally:
+            conn.close()
+        return [(row[0], (row[1], row[2], None, row[3])) for row in rows]
+
     def update_hit_count_by_id(self, primary_id: int):
         table_name = "modelcache_llm_answer"
         update_sql = f"""
-            UPDATE {table_name} 
-            SET hit_count = hit_count+1 
+            UPDATE {table_name}
+            SET hit_count = hit_count+1
             WHERE id = %s
         """
         conn = self.pool.connection()
@@ -163,12 +246,32 @@ class SQLStorage(CacheStorage):
         try:
             with conn.cursor() as cursor:
                 # 执行更新数据操作
-                cursor.execute(update_sql,(primary_id,))
+                cursor.execute(update_sql, (primary_id,))
                 conn.commit()
         finally:
             # 关闭连接，将连接返回给连接池
             conn.close()
 
+    def update_hit_counts(self, counts):
+        if not counts:
+            return
+        table_name = "modelcache_llm_answer"
+        cases = " ".join(["WHEN %s THEN %s"] * len(counts))
+        placeholders = ",".join(["%s"] * len(counts))
+        update_sql = f"""
+            UPDATE {table_name}
+            SET hit_count = hit_count + CASE id {cases} ELSE 0 END
+            WHERE id IN ({placeholders})
+        """
+        values = [v for item in counts.items() for v in item] + list(counts)
+        conn = self.pool.connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(update_sql, values)
+                conn.commit()
+        finally:
+            conn.close()
+
     def get_ids(self, deleted=True):
         table_name = "modelcache_llm_answer"
         state = 1 if deleted else 0
@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
+import base64
 import json
-from typing import List
+from typing import List, Optional
+import numpy as np
 from elasticsearch import Elasticsearch, helpers
 from modelcache.manager.scalar_data.base import CacheStorage, CacheData
+from modelcache.manager.scalar_data.embedding_codec import check_embedding_storage, encode_embedding, embedding_blocks
+from modelcache.utils.error import ParamError
+from modelcache.utils.log import modelcache_log
 import time
 from snowflake import SnowflakeGenerator
 
@@ -12,7 +17,8 @@ class SQLStorage(CacheStorage):
     def __init__(
             self,
             db_type: str = "elasticsearch",
-            config=None
+            config=None,
+            dimension: int = 0
     ):
         self.host = config.get('elasticsearch', 'host')
         self.port = int(config.get('elasticsearch', 'port'))
@@ -24,6 +30,21 @@ class SQLStorage(CacheStorage):
 
         self.log_index = "modelcache_query_log"
         self.ans_index = "modelcache_llm_answer"
+        # Bulk ingestion: refresh is "wait_for", "true" or "false" (left to the refresh interval)
+        self.refresh = config.get('elasticsearch', 'refresh', fallback='wait_for')
+        self.bulk_chunk_size = int(config.get('elasticsearch', 'bulk_chunk_size', fallback=500))
+        self.bulk_threads = int(config.get('elasticsearch', 'bulk_threads', fallback=1))
+        # Embeddings are stored as base64 float32 "binary" or as "dense_vector"
+        self.embedding_format = config.get('elasticsearch', 'embedding_format', fallback='binary')
+        # float32, float16, int8 (with a per-row scale) or none; compact modes need the binary format
+        self.embedding_storage = check_embedding_storage(
+            config.get('elasticsearch', 'embedding_storage', fallback='float32'))
+        if self.embedding_format == "dense_vector" and self.embedding_storage not in ("float32", "none"):
+            raise ParamError(f"embedding_storage {self.embedding_storage} requires embedding_format = binary")
+        # dense_vector mappings need the embedding dimension
+        self.dimension = dimension
+        if self.embedding_format == "dense_vector" and self.dimension <= 0:
+            raise ParamError("embedding_format = dense_vector requires the embedding dimension")
         self.create()
         self.instance_id = 1  # 雪花算法使用的机器id 使用同一套数据库的分布式系统需要配置不同id
         # 生成雪花id
@@ -63,48 +84,79 @@ class SQLStorage(CacheStorage):
             }
         }
 
+        if self.embedding_format == "dense_vector":
+            # Only stored, similarity search is done by the vector store
+            answer_index_body["mappings"]["properties"]["embedding_data"] = {"type": "dense_vector",
+                                                                             "dims": self.dimension}
+
         if not self.client.indices.exists(index=self.ans_index):
             self.client.indices.create(index=self.ans_index, body=answer_index_body)
 
         if not self.client.indices.exists(index=self.log_index):
             self.client.indices.create(index=self.log_index, body=log_index_body)
 
-    def _insert(self, data: List) -> str or None:
+    def _encode_embedding(self, embedding):
+        if self.embedding_format == "dense_vector":
+            return np.asarray(embedding, dtype=np.float32).tolist()
+        return base64.b64encode(encode_embedding(embedding, self.embedding_storage)).decode("ascii")
+
+    @staticmethod
+    def _embedding_bytes(value):
+        """The stored embedding as encoded bytes."""
+        if value is None:
+            return b""
+        if isinstance(value, str):
+            return base64.b64decode(value)
+        # dense_vector, or float lists written by older versions, are float32
+        return np.asarray(value, dtype=np.float32).tobytes()
+
+    def _answer_doc(self, data: List):
         doc = {
             "answer": data[0],
             "question": data[1],
-            "embedding_data": data[2].tolist() if hasattr(data[2], "tolist") else data[2],
             "model": data[3],
             "answer_type": 0,
             "hit_count": 0,
             "is_deleted": 0
         }
+        if self.embedding_storage != "none":
+            doc["embedding_data"] = self._encode_embedding(data[2])
+        return doc
 
-        try:
-
-            response = self.client.index(
-                index=self.ans_index,
-                id=next(self.snowflake_id),
-                body=doc,
-            )
-            return int(response['_id'])
-        except Exception as e:
-
-            print(f"Failed to insert document: {e}")
-            return None
+    def _insert(self, data: List) -> str or None:
+        ids = self.batch_insert([data])
+        return ids[0] if ids else None
 
-    def batch_insert(self, all_data: List[List]) -> List[str]:
-        successful_ids = []
-        for data in all_data:
-            _id = self._insert(data)
-            if _id is not None:
-                successful_ids.append(_id)
-        self.client.indices.refresh(index=self.ans_index)  # 批量插入后手动刷新
+    def batch_insert(self, all_data: List[List]) -> List[Optional[str]]:
+        # 雪花id 提前生成, 一次 bulk 请求写入
+        ids = [next(self.snowflake_id) for _ in all_data]
+        actions = [
+            {
+                "_index": self.ans_index,
+                "_id": _id,
+                "_source": self._answer_doc(data)
+            }
+            for _id, data in zip(ids, all_data)
+        ]
+        if self.bulk_threads > 1:
+            results = helpers.parallel_bulk(
+                self.client, actions, thread_count=self.bulk_threads, chunk_size=self.bulk_chunk_size,
+                raise_on_error=False, raise_on_exception=False, refresh=self.refresh)
+        else:
+            results = helpers.streaming_bulk(
+                self.client, actions, chunk_size=self.bulk_chunk_size,
+                raise_on_error=False, raise_on_exception=False, refresh=self.refresh)
 
-        return successful_ids
+        failed_ids = set()
+        for ok, item in results:
+            if not ok:
+                info = next(iter(item.values()))
+                failed_ids.add(str(info.get("_id")))
+                modelcache_log.error("Failed to insert document %s: %s", info.get("_id"), info.get("error"))
+        return [None if str(_id) in failed_ids else _id for _id in ids]
 
-    def insert_query_resp(self, query_resp, **kwargs):
-        doc = {
+    def _query_log_doc(self, query_resp, **kwargs):
+        return {
             "error_code": query_resp.get('errorCode'),
             "error_desc": query_resp.get('errorDesc'),
             "cache_hit": query_resp.get('cacheHit'),
@@ -118,22 +170,110 @@ class SQLStorage(CacheStorage):
             "is_deleted": 0
 
         }
-        self.client.index(index=self.log_index, body=doc)
+
+    def insert_query_resp(self, query_resp, **kwargs):
+        self.client.index(index=self.log_index, body=self._query_log_doc(query_resp, **kwargs))
+
+    def insert_query_resps(self, records):
+        actions = [
+            {
+                "_index": self.log_index,
+                "_source": self._query_log_doc(query_resp, **kwargs)
+            }
+            for query_resp, kwargs in records
+        ]
+        helpers.bulk(self.client, actions)
 
     def get_data_by_id(self, key: int):
         try:
-            response = self.client.get(index=self.ans_index, id=key, _source=['question', 'answer', 'embedding_data', 'model'])
+            # embedding_data is not needed to answer a query, leave it out of the response
+            response = self.client.get(index=self.ans_index, id=key, _source=['question', 'answer', 'model'])
             source = response["_source"]
             result = [
                 source.get('question'),
                 source.get('answer'),
-                source.get('embedding_data'),
+                None,
                 source.get('model')
             ]
             return result
         except Exception as e:
             print(e)
 
+    def get_data_by_ids(self, keys):
+        if not keys:
+            return {}
+        key_by_id = {str(key): key for key in keys}
+        try:
+            response = self.client.mget(
+                index=self.ans_index,
+                body={"ids": list(key_by_id)},
+                _source=['question', 'answer', 'model']
+            )
+        except Exception as e:
+            print(e)
+            return {}
+        result = {}
+        for doc in response["docs"]:
+            if not doc.get("found"):
+                continue
+            source = doc["_source"]
+            result[key_by_id[doc["_id"]]] = [
+                source.get('question'),
+                source.get('answer'),
+                None,
+                source.get('model')
+            ]
+        return result
+
+    @property
+    def stores_embeddings(self):
+        return self.embedding_storage != "none"
+
+    @property
+    def ranks_rows(self):
+        return True
+
+    def iter_embeddings(self, model=None, batch_size: int = 10000):
+        query = {"bool": {"filter": [{"term": {"is_deleted": 0}}]}}
+        if model is not None:
+            query["bool"]["filter"].append({"term": {"model": model}})
+        # scroll through the index, one search context instead of deep paging
+        hits = helpers.scan(self.client, index=self.ans_index, query={"query": query}, size=batch_size,
+                            _source=["model", "embedding_data"])
+        rows = []
+        for hit in hits:
+            source = hit["_source"]
+            # documents are indexed under snowflake ids, which the vector stores hold as integers
+            rows.append((int(hit["_id"]), source.get("model"), self._embedding_bytes(source.get("embedding_data"))))
+            if len(rows) >= batch_size:
+                yield from embedding_blocks(rows, self.embedding_storage)
+                rows = []
+        if rows:
+            yield from embedding_blocks(rows, self.embedding_storage)
+
+    def get_models(self):
+        body = {"size": 0, "query": {"term": {"is_deleted": 0}},
+                "aggs": {"models": {"terms": {"field": "model", "size": 10000}}}}
+        response = self.client.search(index=self.ans_index, body=body)
+        return [bucket["key"] for bucket in response["aggregations"]["models"]["buckets"]]
+
+    def get_top_rows(self, model, limit: int, order_by: str = "hit_count"):
+        # answer documents carry no modification time, they can only be ranked by hit_count
+        if order_by != "hit_count":
+            raise ParamError(f"Elasticsearch storage only ranks rows by hit_count, not {order_by}")
+        body = {
+            "query": {"bool": {"filter": [{"term": {"model": model}}, {"term": {"is_deleted": 0}}]}},
+            "sort": [{"hit_count": "desc"}],
+            # max_result_window
+            "size": min(limit, 10000),
+        }
+        response = self.client.search(index=self.ans_index, body=body, _source=['question', 'answer', 'model'])
+        return [
+            (int(hit["_id"]), [hit["_source"].get('question'), hit["_source"].get('answer'), None,
+                               hit["_source"].get('model')])
+            for hit in response["hits"]["hits"]
+        ]
+
     def update_hit_count_by_id(self, primary_id: int):
         self.client.update(
             index=self.ans_index,
@@ -141,6 +281,39 @@ class SQLStorage(CacheStorage):
             body={"script": {"source": "ctx._source.hit_count += 1"}}
         )
 
+    def update_hit_counts(self, counts):
+        if not counts:
+            return
+        actions = [
+            {
+                "_op_type": "update",
+                "_index": self.ans_index,
+                "_id": primary_id,
+                "script": {
+                    "source": "ctx._source.hit_count += params.count",
+                    "params": {"count": count}
+                }
+            }
+            for primary_id, count in counts.items()
+        ]
+        # Per-item errors are returned instead of failing the whole batch; a
+        # connection failure still raises and the whole batch is retried
+        _, errors = helpers.bulk(self.client, actions, raise_on_error=False)
+        key_by_id = {str(primary_id): primary_id for primary_id in counts}
+        retry = {}
+        for error in errors:
+            info = next(iter(error.values()))
+            status = info.get("status")
+            if status == 404:
+                continue  # document deleted (model truncated) since the hit
+            primary_id = key_by_id.get(str(info.get("_id")))
+            if status in (429, 503) and primary_id is not None:
+                retry[primary_id] = counts[primary_id]
+            else:
+                modelcache_log.error("Dropping hit count update of %s: %s", info.get("_id"), info.get("error"))
+        # transient failures, handed back to the caller for a retry
+        return retry
+
     def get_ids(self, deleted=True):
         query = {
             "query": {
@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 import json
+import threading
 from typing import List
-from modelcache.manager.scalar_data.base import CacheStorage, CacheData
+from modelcache.manager.scalar_data.base import CacheStorage, CacheData, TOP_ROWS_ORDER_BY
+from modelcache.manager.scalar_data.embedding_codec import check_embedding_storage, encode_embedding, embedding_blocks
 import sqlite3
+from modelcache.utils.error import ParamError
 
 
 class SQLStorage(CacheStorage):
@@ -10,12 +13,33 @@ class SQLStorage(CacheStorage):
         self,
         db_type: str = "mysql",
         config=None,
-        url="./sqlite.db"
+        url="./sqlite.db",
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        embedding_storage: str = "float32"
     ):
         self._url = url
-        # self._engine = sqlite3.connect(url)
+        self._journal_mode = journal_mode
+        self._synchronous = synchronous
+        # float32, float16, int8 (with a per-row scale) or none
+        self._embedding_storage = check_embedding_storage(embedding_storage)
+        # One long-lived connection per thread, sqlite3 caches the prepared statements on it
+        self._local = threading.local()
+        self._conns = []
+        self._conns_lock = threading.Lock()
         self.create()
 
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._url, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode={}".format(self._journal_mode))
+            conn.execute("PRAGMA synchronous={}".format(self._synchronous))
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
     def create(self):
         answer_table_sql = """CREATE TABLE IF NOT EXISTS modelcache_llm_answer (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -45,123 +69,157 @@ class SQLStorage(CacheStorage):
                 );
                 """
 
-        conn = sqlite3.connect(self._url)
-        try:
-            cursor = conn.cursor()
-            cursor.execute(answer_table_sql)
-            cursor.execute(log_table_sql)
-            conn.commit()
-            cursor.close()
-            conn.close()
-        finally:
-            conn.close()
+        conn = self._conn()
+        with conn:
+            conn.execute(answer_table_sql)
+            conn.execute(log_table_sql)
 
-    def _insert(self, data: List):
+    _INSERT_SQL = "INSERT INTO modelcache_llm_answer (question, answer, answer_type, model, embedding_data) VALUES (?, ?, ?, ?, ?)"
+
+    def _answer_values(self, data: List):
         answer = data[0]
         question = data[1]
         embedding_data = data[2]
         model = data[3]
         answer_type = 0
-        embedding_data = embedding_data.tobytes()
+        return question, answer, answer_type, model, encode_embedding(embedding_data, self._embedding_storage)
 
-        table_name = "modelcache_llm_answer"
-        insert_sql = "INSERT INTO {} (question, answer, answer_type, model, embedding_data) VALUES (?, ?, ?, ?, ?)".format(table_name)
-
-        conn = sqlite3.connect(self._url)
-        try:
-            cursor = conn.cursor()
-            values = (question, answer, answer_type, model, embedding_data)
-            cursor.execute(insert_sql, values)
-            conn.commit()
-            id = cursor.lastrowid
-            cursor.close()
-            conn.close()
-        finally:
-            conn.close()
-        return id
+    def _insert(self, data: List):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(self._INSERT_SQL, self._answer_values(data))
+        return cursor.lastrowid
 
     def batch_insert(self, all_data: List[CacheData]):
-        ids = []
-        for data in all_data:
-            ids.append(self._insert(data))
-        return ids
+        if not all_data:
+            return []
+        conn = self._conn()
+        with conn:
+            # BEGIN IMMEDIATE holds the write lock for the whole batch, so the
+            # AUTOINCREMENT ids handed out by executemany are consecutive
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(self._INSERT_SQL, [self._answer_values(data) for data in all_data])
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return list(range(last_id - len(all_data) + 1, last_id + 1))
 
-    def insert_query_resp(self, query_resp, **kwargs):
-        error_code = query_resp.get('errorCode')
-        error_desc = query_resp.get('errorDesc')
-        cache_hit = query_resp.get('cacheHit')
-        model = kwargs.get('model')
-        query = kwargs.get('query')
-        delta_time = kwargs.get('delta_time')
+    def _query_log_values(self, query_resp, **kwargs):
         hit_query = query_resp.get('hit_query')
-        answer = query_resp.get('answer')
-
         if isinstance(hit_query, list):
             hit_query = json.dumps(hit_query, ensure_ascii=False)
+        return (
+            query_resp.get('errorCode'),
+            query_resp.get('errorDesc'),
+            query_resp.get('cacheHit'),
+            kwargs.get('model'),
+            kwargs.get('query'),
+            kwargs.get('delta_time'),
+            hit_query,
+            query_resp.get('answer'),
+        )
 
+    def insert_query_resp(self, query_resp, **kwargs):
+        self.insert_query_resps([(query_resp, kwargs)])
+
+    def insert_query_resps(self, records):
         table_name = "modelcache_query_log"
         insert_sql = "INSERT INTO {} (error_code, error_desc, cache_hit, model, query, delta_time, hit_query, answer) VALUES (?, ?, ?, ?, ?, ?, ?, ?)".format(table_name)
-        conn = sqlite3.connect(self._url)
-        try:
-            cursor = conn.cursor()
-            values = (error_code, error_desc, cache_hit, model, query, delta_time, hit_query, answer)
-            cursor.execute(insert_sql, values)
-            conn.commit()
-            cursor.close()
-            conn.close()
-        finally:
-            conn.close()
+        values_list = [self._query_log_values(query_resp, **kwargs) for query_resp, kwargs in records]
+        conn = self._conn()
+        with conn:
+            conn.executemany(insert_sql, values_list)
 
     def get_data_by_id(self, key: int):
         table_name = "modelcache_llm_answer"
-        query_sql = "select question, answer, embedding_data, model from {} where id={}".format(table_name, key)
-        conn = sqlite3.connect(self._url)
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query_sql)
-            resp = cursor.fetchone()
-            conn.commit()
-            cursor.close()
-            conn.close()
-        finally:
-            conn.close()
+        # embedding_data is not needed to answer a query, leave it out of the row
+        query_sql = "select question, answer, NULL, model from {} where id=?".format(table_name)
+        resp = self._conn().execute(query_sql, (key,)).fetchone()
 
         if resp is not None and len(resp) == 4:
             return resp
         else:
             return None
 
-    def update_hit_count_by_id(self, primary_id: int):
+    def get_data_by_ids(self, keys):
+        if not keys:
+            return {}
         table_name = "modelcache_llm_answer"
-        update_sql = "UPDATE {} SET hit_count = hit_count+1 WHERE id={}".format(table_name, primary_id)
+        placeholders = ",".join(["?"] * len(keys))
+        query_sql = "select id, question, answer, NULL, model from {} where id in ({})".format(
+            table_name, placeholders)
+        rows = self._conn().execute(query_sql, list(keys)).fetchall()
+
+        return {row[0]: row[1:] for row in rows}
+
+    @property
+    def stores_embeddings(self):
+        return self._embedding_storage != "none"
+
+    @property
+    def ranks_rows(self):
+        return True
 
-        conn = sqlite3.connect(self._url)
+    def iter_embeddings(self, model=None, batch_size: int = 10000):
+        table_name = "modelcache_llm_answer"
+        query_sql = "select id, model, embedding_data from {}".format(table_name)
+        params = ()
+        if model is not None:
+            query_sql += " where model=?"
+            params = (model,)
+        # A separate connection reads one consistent WAL snapshot, stepping through rows as they are fetched
+        conn = sqlite3.connect(self._url, check_same_thread=False)
         try:
-            cursor = conn.cursor()
-            cursor.execute(update_sql)
-            conn.commit()
-            cursor.close()
-            conn.close()
+            cursor = conn.execute(query_sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from embedding_blocks(rows, self._embedding_storage)
         finally:
-            # 关闭连接，将连接返回给连接池
             conn.close()
 
+    def get_models(self):
+        table_name = "modelcache_llm_answer"
+        query_sql = "select distinct model from {}".format(table_name)
+        return [row[0] for row in self._conn().execute(query_sql).fetchall()]
+
+    def get_top_rows(self, model, limit: int, order_by: str = "hit_count"):
+        if order_by not in TOP_ROWS_ORDER_BY:
+            raise ParamError(f"Unknown order: {order_by}, should be one of {list(TOP_ROWS_ORDER_BY)}")
+        table_name = "modelcache_llm_answer"
+        query_sql = "select id, question, answer, NULL, model from {} where model=? order by {}, id desc limit ?".format(
+            table_name, TOP_ROWS_ORDER_BY[order_by])
+        rows = self._conn().execute(query_sql, (model, limit)).fetchall()
+        return [(row[0], row[1:]) for row in rows]
+
+    def update_hit_count_by_id(self, primary_id: int):
+        table_name = "modelcache_llm_answer"
+        update_sql = "UPDATE {} SET hit_count = hit_count+1, gmt_modified = CURRENT_TIMESTAMP WHERE id=?".format(
+            table_name)
+
+        conn = self._conn()
+        with conn:
+            conn.execute(update_sql, (primary_id,))
+
+    def update_hit_counts(self, counts):
+        if not counts:
+            return
+        table_name = "modelcache_llm_answer"
+        update_sql = "UPDATE {} SET hit_count = hit_count + ?, gmt_modified = CURRENT_TIMESTAMP WHERE id = ?".format(
+            table_name)
+
+        conn = self._conn()
+        with conn:
+            conn.executemany(update_sql, [(count, primary_id) for primary_id, count in counts.items()])
+
     def get_ids(self, deleted=True):
         pass
 
     def mark_deleted(self, keys):
         table_name = "modelcache_llm_answer"
-        delete_sql = "Delete from {} WHERE id in ({})".format(table_name, ",".join([str(i) for i in keys]))
-        conn = sqlite3.connect(self._url)
-        try:
-            cursor = conn.cursor()
-            cursor.execute(delete_sql)
-            delete_count = cursor.rowcount
-            conn.commit()
-            cursor.close()
-            conn.close()
-        finally:
-            conn.close()
+        delete_sql = "Delete from {} WHERE id in ({})".format(table_name, ",".join(["?"] * len(keys)))
+        conn = self._conn()
+        with conn:
+            delete_count = conn.execute(delete_sql, list(keys)).rowcount
         return delete_count
 
     def model_deleted(self, model_name):
@@ -170,22 +228,15 @@ class SQLStorage(CacheStorage):
 
         table_log_name = "modelcache_query_log"
         delete_log_sql = "Delete from {} WHERE model=?".format(table_log_name)
-        conn = sqlite3.connect(self._url)
+        conn = self._conn()
         try:
-            cursor = conn.cursor()
-            cursor.execute(delete_sql, (model_name,))
-            conn.commit()
-            # get delete rows
-            deleted_rows_count = cursor.rowcount
-            
-            cursor.execute(delete_log_sql, (model_name,))
-            conn.commit()
-            cursor.close()
+            with conn:
+                # get delete rows
+                deleted_rows_count = conn.execute(delete_sql, (model_name,)).rowcount
+                conn.execute(delete_log_sql, (model_name,))
         except sqlite3.Error as e:
             print(f"SQLite error: {e}")
             deleted_rows_count = 0  # if except, return 0
-        finally:
-            conn.close()
         return deleted_rows_count
 
     def clear_deleted_data(self):
@@ -195,7 +246,11 @@ class SQLStorage(CacheStorage):
         pass
 
     def close(self):
-        pass
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
 
     def count_answers(self):
         pass
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from typing import Callable, Optional
+
+from modelcache.utils.log import modelcache_log
+
+
+class SnapshotScheduler:
+    """
+    Background thread calling a flush function periodically.
+
+    A snapshot is taken once interval_ms has passed with at least one
+    unsaved change, or as soon as dirty_threshold changes have accumulated
+    (0 disables either trigger). flush_func may return the number of bytes
+    written, which is reported together with the snapshot duration.
+    """
+
+    def __init__(
+        self,
+        flush_func: Callable[[], Optional[int]],
+        interval_ms: int = 0,
+        dirty_threshold: int = 0,
+        report=None,
+    ):
+        self._flush_func = flush_func
+        self._interval = interval_ms / 1000 if interval_ms > 0 else None
+        self._dirty_threshold = dirty_threshold
+        self._report = report
+        self._dirty = 0
+        self._last_snapshot = time.monotonic()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self.snapshot_count = 0
+        self.last_snapshot_time = 0
+        self.last_snapshot_bytes = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def dirty(self) -> int:
+        """Changes made since the last snapshot."""
+        return self._dirty
+
+    def mark_dirty(self, count: int = 1):
+        with self._cond:
+            self._dirty += count
+            if 0 < self._dirty_threshold <= self._dirty:
+                self._cond.notify()
+
+    def _due(self) -> bool:
+        if self._dirty == 0:
+            return False
+        if 0 < self._dirty_threshold <= self._dirty:
+            return True
+        return self._interval is not None and time.monotonic() - self._last_snapshot >= self._interval
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not self._due():
+                    timeout = None
+                    if self._interval is not None:
+                        timeout = max(self._interval - (time.monotonic() - self._last_snapshot), 0.01)
+                    self._cond.wait(timeout=timeout)
+                if self._stopped:
+                    return
+            try:
+                self.snapshot()
+            except Exception as e:
+                modelcache_log.error("Snapshot failed: %s", e)
+
+    def snapshot(self):
+        """Flush now, whatever the triggers say."""
+        with self._cond:
+            dirty, self._dirty = self._dirty, 0
+            self._last_snapshot = time.monotonic()
+        start_time = time.time()
+        try:
+            nbytes = self._flush_func() or 0
+        except Exception:
+            with self._cond:
+                self._dirty += dirty
+            raise
+        delta_time = time.time() - start_time
+        self.snapshot_count += 1
+        self.last_snapshot_time = delta_time
+        self.last_snapshot_bytes = nbytes
+        if self._report is not None:
+            self._report.snapshot(delta_time, nbytes)
+        modelcache_log.info("Snapshot of %s changes took %.3fs, %s bytes.", dirty, delta_time, nbytes)
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=1)
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import asyncio
 from abc import ABC, abstractmethod
 import numpy as np
 from typing import List
@@ -34,6 +35,19 @@ class VectorStorage(ABC):
     def search(self, data: np.ndarray, top_k: int, model):
         pass
 
+    def search_batch(self, datas: np.ndarray, top_k: int, model):
+        """
+        Search an (n, d) matrix of query vectors.
+
+        Returns (distances, ids), two (n, k) arrays; rows with fewer than k
+        results are padded, see pack_search_results.
+        """
+        return pack_search_results([self.search(data, top_k, model) or [] for data in datas])
+
+    async def asearch(self, data: np.ndarray, top_k: int, model):
+        """Search from the event loop; runs search in a worker thread unless the backend has an async client."""
+        return await asyncio.to_thread(self.search, data, top_k, model)
+
     @abstractmethod
     def rebuild(self, ids=None) -> bool:
         pass
@@ -74,6 +88,11 @@ class VectorStorage(ABC):
             search_params = kwargs.get("search_params", None)
             local_mode = kwargs.get("local_mode", False)
             local_data = kwargs.get("local_data", "./milvus_data")
+            model_search_params = kwargs.get("model_search_params", None)
+            use_async_client = kwargs.get("use_async_client", False)
+            insert_buffer_size = kwargs.get("insert_buffer_size", 0)
+            insert_buffer_ms = kwargs.get("insert_buffer_ms", 1000)
+            read_your_writes = kwargs.get("read_your_writes", False)
             vector_base = Milvus(
                 host=host,
                 port=port,
@@ -87,7 +106,12 @@ class VectorStorage(ABC):
                 search_params=search_params,
                 local_mode=local_mode,
                 local_data=local_data,
-                metric_type=metric_type
+                metric_type=metric_type,
+                model_search_params=model_search_params,
+                use_async_client=use_async_client,
+                insert_buffer_size=insert_buffer_size,
+                insert_buffer_ms=insert_buffer_ms,
+                read_your_writes=read_your_writes
             )
         elif name == "redis":
             from modelcache.manager.vector_data.redis import RedisVectorStore
@@ -110,6 +134,10 @@ class VectorStorage(ABC):
                 namespace=namespace,
                 top_k=top_k,
                 dimension=dimension,
+                index_params=kwargs.get("index_params", None),
+                model_params=kwargs.get("model_params", None),
+                insert_batch_size=kwargs.get("insert_batch_size", 1000),
+                max_connections=int(redis_config.get('redis', 'max_connections', fallback=50)),
             )
         elif name == "faiss":
             from modelcache.manager.vector_data.faiss import Faiss
@@ -118,7 +146,12 @@ class VectorStorage(ABC):
             index_path = kwargs.pop("index_path", FAISS_INDEX_PATH)
             check_dimension(dimension)
             vector_base = Faiss(
-                index_file_path=index_path, dimension=dimension, top_k=top_k
+                index_file_path=index_path, dimension=dimension, top_k=top_k,
+                index_factory=kwargs.get("index_factory", "IDMap,Flat"),
+                train_size=kwargs.get("train_size", 0),
+                search_params=kwargs.get("search_params", None),
+                mmap=kwargs.get("mmap", False),
+                preload=kwargs.get("preload", False)
             )
         elif name == "chromadb":
             from modelcache.manager.vector_data.chroma import Chromadb
@@ -129,6 +162,7 @@ class VectorStorage(ABC):
             vector_base = Chromadb(
                 persist_directory=persist_directory,
                 top_k=top_k,
+                insert_buffer_size=kwargs.get("insert_buffer_size", 0),
             )
         elif name == "hnswlib":
             from modelcache.manager.vector_data.hnswlib_store import Hnswlib
@@ -146,6 +180,32 @@ class VectorStorage(ABC):
         return vector_base
 
 
+def pack_search_results(rows):
+    """
+    Pack per-query lists of (distance, id) into (distances, ids) arrays.
+
+    Short rows are padded with distance inf and id -1, or None when the
+    backend uses non-integer ids.
+    """
+    width = max((len(row) for row in rows), default=0)
+    distances = np.full((len(rows), width), np.inf, dtype="float32")
+    int_ids = all(isinstance(_id, (int, np.integer)) for row in rows for _, _id in row)
+    ids = np.full((len(rows), width), -1, dtype="int64") if int_ids else np.full((len(rows), width), None, dtype=object)
+    for i, row in enumerate(rows):
+        for j, (distance, _id) in enumerate(row):
+            distances[i, j] = distance
+            ids[i, j] = _id
+    return distances, ids
+
+
+def unpack_search_results(distances: np.ndarray, ids: np.ndarray):
+    """Turn (distances, ids) arrays back into per-query lists of (distance, id), dropping padding."""
+    rows = []
+    for dist_row, id_row in zip(distances.tolist(), ids.tolist()):
+        rows.append([(d, i) for d, i in zip(dist_row, id_row) if i is not None and i != -1])
+    return rows
+
+
 def check_dimension(dimension):
     if dimension <= 0:
         raise ParamError(f"the dimension should be greater than zero, current value: {dimension}.")
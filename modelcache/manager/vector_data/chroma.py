@@ -1,4 +1,5 @@
 from typing import List
+import threading
 
 import numpy as np
 import logging
@@ -17,31 +18,80 @@ class Chromadb(VectorStorage):
             self,
             persist_directory="./chromadb",
             top_k: int = 1,
+            insert_buffer_size: int = 0,
     ):
         self.collection_name = "modelcache"
         self.top_k = top_k
 
         self._client = chromadb.PersistentClient(path=persist_directory)
-        self._collection = None
+        # model -> collection handle, dropped by rebuild_col
+        self._collections = dict()
+        # model -> number of vectors, so search can skip empty collections without count().
+        # Only a hint (duplicate ids, concurrent rebuild_col), search checks count() before giving up
+        self._counts = dict()
+        # With insert_buffer_size > 0, mul_add buffers vectors per model and
+        # adds them in one call once the buffer is full (or before a search)
+        self._insert_buffer_size = insert_buffer_size
+        self._buffers = dict()
+        self._lock = threading.Lock()
+
+    def _get_collection(self, model):
+        collection = self._collections.get(model)
+        if collection is None:
+            collection_name_model = self.collection_name + '_' + model
+            collection = self._client.get_or_create_collection(name=collection_name_model)
+            count = collection.count()
+            with self._lock:
+                self._counts[model] = count
+            self._collections[model] = collection
+        return collection
+
+    def _update_count(self, model, delta):
+        with self._lock:
+            self._counts[model] = max(0, self._counts.get(model, 0) + delta)
+
+    def _add(self, model, embeddings, ids):
+        self._get_collection(model).add(embeddings=embeddings, ids=ids)
+        self._update_count(model, len(ids))
+
+    def _flush_buffer(self, model):
+        with self._lock:
+            buffer = self._buffers.pop(model, None)
+        if buffer:
+            embeddings, ids = zip(*buffer)
+            self._add(model, np.stack(embeddings), list(ids))
 
     def mul_add(self, datas: List[VectorData], model=None):
-        collection_name_model = self.collection_name + '_' + model
-        self._collection = self._client.get_or_create_collection(name=collection_name_model)
-
-        data_array, id_array = map(list, zip(*((data.data.tolist(), str(data.id)) for data in datas)))
-        self._collection.add(embeddings=data_array, ids=id_array)
+        embeddings = np.stack([np.asarray(data.data, dtype=np.float32) for data in datas])
+        ids = [str(data.id) for data in datas]
+        if self._insert_buffer_size <= 0:
+            self._add(model, embeddings, ids)
+            return
+        with self._lock:
+            buffer = self._buffers.setdefault(model, [])
+            buffer.extend(zip(embeddings, ids))
+            full = len(buffer) >= self._insert_buffer_size
+        if full:
+            self._flush_buffer(model)
 
     def search(self, data: np.ndarray, top_k: int = -1, model=None):
-        collection_name_model = self.collection_name + '_' + model
-        self._collection = self._client.get_or_create_collection(name=collection_name_model)
-
-        if self._collection.count() == 0:
-            return []
+        # Buffered vectors must be visible to the search
+        self._flush_buffer(model)
+        collection = self._get_collection(model)
+
+        count = self._counts.get(model, 0)
+        if count <= 0:
+            # The hint may be stale, ask the collection before reporting a miss
+            count = collection.count()
+            with self._lock:
+                self._counts[model] = count
+            if count == 0:
+                return []
         if top_k == -1:
             top_k = self.top_k
-        results = self._collection.query(
-            query_embeddings=[data.tolist()],
-            n_results=top_k,
+        results = collection.query(
+            query_embeddings=np.asarray(data, dtype=np.float32).reshape(1, -1),
+            n_results=min(top_k, count),
             include=["distances"],
         )
         return list(zip(results["distances"][0], [int(x) for x in results["ids"][0]]))
@@ -51,15 +101,16 @@ class Chromadb(VectorStorage):
 
     def delete(self, ids, model=None):
         try:
-            collection_name_model = self.collection_name + '_' + model
-            self._collection = self._client.get_or_create_collection(name=collection_name_model)
+            self._flush_buffer(model)
+            collection = self._get_collection(model)
             # 查询集合中实际存在的 ID
             ids_str = [str(x) for x in ids]
-            existing_ids = set(self._collection.get(ids=ids_str).ids)
+            existing_ids = set(collection.get(ids=ids_str)["ids"])
 
             # 删除存在的 ID
             if existing_ids:
-                self._collection.delete(list(existing_ids))
+                collection.delete(list(existing_ids))
+                self._update_count(model, -len(existing_ids))
 
             # 返回实际删除的条目数量
             return len(existing_ids)
@@ -70,6 +121,10 @@ class Chromadb(VectorStorage):
 
     def rebuild_col(self, model):
         collection_name_model = self.collection_name + '_' + model
+        self._collections.pop(model, None)
+        with self._lock:
+            self._counts.pop(model, None)
+            self._buffers.pop(model, None)
 
         # 检查集合是否存在，如果存在则删除
         collections = self._client.list_collections()
@@ -85,8 +140,11 @@ class Chromadb(VectorStorage):
             raise ValueError(str(e))
 
     def flush(self):
-        # chroma无flush方法
-        pass
+        # chroma无flush方法, only the insert buffers need writing out
+        with self._lock:
+            models = list(self._buffers)
+        for model in models:
+            self._flush_buffer(model)
 
     def close(self):
-        pass
+        self.flush()
@@ -1,56 +1,358 @@
 # -*- coding: utf-8 -*-
+import glob
+import io
 import os
+import threading
+import time
 from typing import List
 import numpy as np
 from modelcache.manager.vector_data.base import VectorStorage, VectorData
+from modelcache.manager.vector_data.id_mapping import IdMapping
 from modelcache.utils import import_faiss
+from modelcache.utils.error import CacheError
+from modelcache.utils.log import modelcache_log
 import_faiss()
 import faiss  # pylint: disable=C0413
 
 
 class Faiss(VectorStorage):
-    def __init__(self, index_file_path, dimension, top_k):
+    """
+    FAISS vector store keeping one index per model.
+
+    Indexes are created lazily from the index_factory string (e.g.
+    "IDMap,Flat", "HNSW32", "IVF256,PQ16") and stored next to
+    index_file_path as <root>_<model><ext> (<root>.default<ext> without a
+    model; "%", "/" and "\\" in model names are percent-escaped so every
+    file stays in that directory). A file at index_file_path itself is the
+    shared index of older versions, which cannot be split by model: startup
+    fails until it is moved away and the indexes are rebuilt with
+    rebuild_vectors. Indexes
+    that need training (IVF, PQ) buffer their first train_size vectors in a
+    flat index that is searched meanwhile, then train on them. search_params
+    is a FAISS ParameterSpace string such as "nprobe=16" or "efSearch=64".
+
+    Non-integer ids (MySQL uuids) are stored under int64 surrogates, with
+    the translation table kept in <index file>.ids.npy. Ids deleted from
+    indexes that cannot remove vectors (HNSW) are kept in
+    <index file>.deleted.npy and excluded inside the search through an
+    IDSelectorNot, so top_k stays the number of results FAISS looks for.
+
+    With mmap=True saved indexes are memory-mapped (IO_FLAG_MMAP) instead of
+    read into RAM, so startup is fast and workers on one host share the page
+    cache; a model's index is read into memory on its first write. Flushes
+    only rewrite the models changed since the last one, each through a temp
+    file renamed over the old one. preload=True loads every saved index at
+    startup instead of on first use; load times are logged and kept in
+    load_seconds.
+    """
+
+    def __init__(self, index_file_path, dimension, top_k, index_factory="IDMap,Flat", train_size=0,
+                 search_params=None, mmap=False, preload=False):
         self._index_file_path = index_file_path
         self._dimension = dimension
-        self._index = faiss.index_factory(self._dimension, "IDMap,Flat", faiss.METRIC_L2)
         self._top_k = top_k
+        self._index_factory = index_factory
+        self._train_size = train_size
+        self._search_params = search_params
+        self._indexes = dict()
+        # model -> flat index holding vectors until the model's index is trained
+        self._pending = dict()
+        # model -> ids deleted from indexes without remove_ids support (HNSW)
+        self._deleted = dict()
+        # model -> SearchParameters excluding the model's deleted ids
+        self._deleted_params = dict()
+        # model -> IdMapping, only for models whose ids are not integers
+        self._id_maps = dict()
+        self._mmap = mmap
+        # models whose index is still memory-mapped (read-only)
+        self._mmapped = set()
+        # models changed since the last flush
+        self._dirty = set()
+        self.load_seconds = dict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
         if os.path.isfile(index_file_path):
-            self._index = faiss.read_index(index_file_path)
+            raise CacheError(
+                f"{index_file_path} is a shared faiss index from an older version, indexes are now kept per "
+                f"model. Move it away and run DataManager.rebuild_vectors() (see "
+                f"modelcache.manager.vector_rebuild) to rebuild them from the scalar store."
+            )
+        if preload:
+            start_time = time.time()
+            models = self._known_models()
+            for model in models:
+                self._get_index(model)
+            modelcache_log.info("Loaded %s faiss indexes in %.3fs.", len(models), time.time() - start_time)
+
+    @staticmethod
+    def _escape_model(model):
+        return model.replace('%', '%25').replace('/', '%2F').replace('\\', '%5C')
+
+    @staticmethod
+    def _unescape_model(name):
+        return name.replace('%5C', '\\').replace('%2F', '/').replace('%25', '%')
+
+    def _model_index_path(self, model):
+        root, ext = os.path.splitext(self._index_file_path)
+        if model is None:
+            return root + '.default' + ext
+        return root + '_' + self._escape_model(model) + ext
+
+    @staticmethod
+    def _deleted_path(index_path):
+        return index_path + ".deleted.npy"
+
+    def _create_index(self):
+        factory = self._index_factory
+        index = faiss.index_factory(self._dimension, factory, faiss.METRIC_L2)
+        if not factory.startswith("IDMap") and faiss.try_extract_index_ivf(index) is None:
+            # Only IVF indexes take external ids natively
+            index = faiss.index_factory(self._dimension, "IDMap," + factory, faiss.METRIC_L2)
+        return index
+
+    def _apply_search_params(self, index):
+        if self._search_params:
+            faiss.ParameterSpace().set_index_parameters(index, self._search_params)
+
+    def _get_index(self, model):
+        index = self._indexes.get(model)
+        if index is not None:
+            return index
+        with self._lock:
+            if model in self._indexes:
+                return self._indexes[model]
+            index_path = self._model_index_path(model)
+            if os.path.isfile(index_path):
+                start_time = time.time()
+                index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP if self._mmap else 0)
+                self.load_seconds[model] = time.time() - start_time
+                modelcache_log.info("Loaded faiss index %s (%s vectors%s) in %.3fs.", index_path, index.ntotal,
+                                    ", mmap" if self._mmap else "", self.load_seconds[model])
+                if self._mmap:
+                    self._mmapped.add(model)
+            else:
+                index = self._create_index()
+            self._apply_search_params(index)
+            if os.path.isfile(index_path + ".pending"):
+                self._pending[model] = faiss.read_index(index_path + ".pending")
+            elif not index.is_trained:
+                self._pending[model] = faiss.index_factory(self._dimension, "IDMap,Flat", faiss.METRIC_L2)
+            if IdMapping.exists(index_path):
+                self._id_maps[model] = IdMapping.load(IdMapping.path_for(index_path))
+            if os.path.isfile(self._deleted_path(index_path)):
+                self._deleted[model] = set(np.load(self._deleted_path(index_path)).tolist())
+            self._indexes[model] = index
+        return index
+
+    def _required_train_size(self, index):
+        if self._train_size > 0:
+            return self._train_size
+        ivf = faiss.try_extract_index_ivf(index)
+        # FAISS k-means wants ~39 points per centroid
+        return max(39 * ivf.nlist, 256) if ivf is not None else 256
+
+    def _train(self, model, index, pending):
+        vectors = pending.index.reconstruct_n(0, pending.ntotal)
+        ids = faiss.vector_to_array(pending.id_map)
+        modelcache_log.info("Training faiss index for model %s on %s vectors.", model, len(ids))
+        index.train(vectors)
+        index.add_with_ids(vectors, ids)
+        del self._pending[model]
+
+    def _writable_index(self, model):
+        """The model's index, read into memory first if it is memory-mapped. Call with the lock held."""
+        index = self._indexes[model]
+        if model in self._mmapped:
+            index = faiss.read_index(self._model_index_path(model))
+            self._apply_search_params(index)
+            self._indexes[model] = index
+            self._mmapped.discard(model)
+        self._dirty.add(model)
+        return index
 
     def mul_add(self, datas: List[VectorData], model=None):
         data_array, id_array = map(list, zip(*((data.data, data.id) for data in datas)))
         np_data = np.array(data_array).astype("float32")
-        ids = np.array(id_array)
-        self._index.add_with_ids(np_data, ids)
+        self._get_index(model)
+        with self._lock:
+            index = self._writable_index(model)
+            id_map = self._id_maps.get(model)
+            if id_map is None and not all(isinstance(i, (int, np.integer)) for i in id_array):
+                id_map = self._id_maps[model] = IdMapping()
+            ids = id_map.add(id_array) if id_map is not None else np.array(id_array, dtype="int64")
+            pending = self._pending.get(model)
+            if pending is None:
+                index.add_with_ids(np_data, ids)
+                return
+            pending.add_with_ids(np_data, ids)
+            if pending.ntotal >= self._required_train_size(index):
+                self._train(model, index, pending)
+
+    def _searched_index(self, model):
+        index = self._get_index(model)
+        return self._pending.get(model, index)
+
+    def _search_params_without_deleted(self, model, index):
+        """SearchParameters filtering out the model's tombstoned ids, or None when there are none."""
+        deleted = self._deleted.get(model)
+        if not deleted:
+            return None
+        cached = self._deleted_params.get(model)
+        if cached is not None:
+            return cached[0]
+        deleted_ids = np.fromiter(deleted, dtype="int64")
+        batch = faiss.IDSelectorBatch(deleted_ids.size, faiss.swig_ptr(deleted_ids))
+        selector = faiss.IDSelectorNot(batch)
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if isinstance(inner, faiss.IndexHNSW):
+            # Passing params replaces the index's own efSearch, keep it
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        # The params only point at the selectors, keep those alive with them
+        self._deleted_params[model] = (params, selector, batch)
+        return params
 
     def search(self, data: np.ndarray, top_k: int = -1, model=None):
-        if self._index.ntotal == 0:
+        index = self._searched_index(model)
+        if index.ntotal == 0:
             return None
         if top_k == -1:
             top_k = self._top_k
         np_data = np.array(data).astype("float32").reshape(1, -1)
-        dist, ids = self._index.search(np_data, top_k)
-        ids = [int(i) for i in ids[0]]
-        return list(zip(dist[0], ids))
+        dist, ids = index.search(np_data, top_k, params=self._search_params_without_deleted(model, index))
+        keep = ids[0] != -1
+        dist, ids = dist[0][keep], ids[0][keep]
+        id_map = self._id_maps.get(model)
+        if id_map is not None:
+            return [(d, i) for d, i in zip(dist.tolist(), id_map.to_external(ids).tolist()) if i is not None]
+        return list(zip(dist.tolist(), ids.tolist()))
 
-    def rebuild_col(self, ids=None):
+    def search_batch(self, datas: np.ndarray, top_k: int = -1, model=None):
+        np_data = np.ascontiguousarray(datas, dtype="float32").reshape(len(datas), -1)
+        index = self._searched_index(model)
+        if index.ntotal == 0:
+            return np.empty((len(np_data), 0), dtype="float32"), np.empty((len(np_data), 0), dtype="int64")
+        if top_k == -1:
+            top_k = self._top_k
+        # One call for the whole matrix, FAISS already pads missing results with id -1
+        dist, ids = index.search(np_data, top_k, params=self._search_params_without_deleted(model, index))
+        id_map = self._id_maps.get(model)
+        if id_map is not None:
+            ids = id_map.to_external(ids)
+        return dist, ids
+
+    def rebuild_col(self, model=None):
         try:
-            self._index.reset()
+            with self._lock:
+                self._indexes.pop(model, None)
+                self._pending.pop(model, None)
+                self._deleted.pop(model, None)
+                self._deleted_params.pop(model, None)
+                self._id_maps.pop(model, None)
+                self._mmapped.discard(model)
+                self._dirty.discard(model)
+                index_path = self._model_index_path(model)
+                for path in (index_path, index_path + ".pending", IdMapping.path_for(index_path),
+                             self._deleted_path(index_path)):
+                    if os.path.isfile(path):
+                        os.remove(path)
         except Exception as e:
             return f"An error occurred during index rebuild: {e}"
 
     def rebuild(self, ids=None):
         return True
 
-    def delete(self, ids):
-        ids_to_remove = np.array(ids)
-        self._index.remove_ids(faiss.IDSelectorBatch(ids_to_remove.size, faiss.swig_ptr(ids_to_remove)))
+    def delete(self, ids, model=None):
+        self._get_index(model)
+        with self._lock:
+            index = self._writable_index(model)
+            id_map = self._id_maps.get(model)
+            ids_to_remove = id_map.remove(ids) if id_map is not None else np.array(ids, dtype="int64")
+            pending = self._pending.get(model)
+            if pending is not None:
+                return pending.remove_ids(faiss.IDSelectorBatch(ids_to_remove.size, faiss.swig_ptr(ids_to_remove)))
+            try:
+                return index.remove_ids(faiss.IDSelectorBatch(ids_to_remove.size, faiss.swig_ptr(ids_to_remove)))
+            except RuntimeError:
+                # HNSW cannot remove vectors, hide them from results instead;
+                # the tombstones are saved with the index on flush
+                self._deleted.setdefault(model, set()).update(ids_to_remove.tolist())
+                self._deleted_params.pop(model, None)
+                return len(ids_to_remove)
+
+    def _known_models(self):
+        root, ext = os.path.splitext(self._index_file_path)
+        models = set(self._indexes)
+        for suffix in (ext, ext + ".pending"):
+            for path in glob.glob(glob.escape(root) + '_*' + glob.escape(suffix)):
+                models.add(self._unescape_model(path[len(root) + 1:len(path) - len(suffix)]))
+        if os.path.isfile(self._model_index_path(None)):
+            models.add(None)
+        return models
+
+    @staticmethod
+    def _atomic_write(data, path):
+        # Double-buffered: the previous snapshot stays in place (and valid for
+        # mmap readers) until the new one is complete on disk
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return len(data)
 
     def flush(self):
-        faiss.write_index(self._index, self._index_file_path)
+        """Snapshot the models changed since the last flush; returns the number of bytes written."""
+        with self._flush_lock:
+            start_time = time.time()
+            writes = []
+            removals = []
+            # Serialize into memory under the lock, write the files outside it
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                for model in dirty:
+                    index = self._indexes.get(model)
+                    if index is None:
+                        continue
+                    index_path = self._model_index_path(model)
+                    if model in self._id_maps:
+                        writes.append((IdMapping.path_for(index_path), self._id_maps[model].dumps()))
+                    pending = self._pending.get(model)
+                    if pending is not None:
+                        writes.append((index_path + ".pending", faiss.serialize_index(pending)))
+                        continue
+                    writes.append((index_path, faiss.serialize_index(index)))
+                    removals.append(index_path + ".pending")
+                    deleted = self._deleted.get(model)
+                    if deleted:
+                        buffer = io.BytesIO()
+                        np.save(buffer, np.fromiter(deleted, dtype="int64"))
+                        writes.append((self._deleted_path(index_path), buffer.getvalue()))
+                    else:
+                        removals.append(self._deleted_path(index_path))
+            try:
+                nbytes = sum(self._atomic_write(data, path) for path, data in writes)
+            except Exception:
+                with self._lock:
+                    self._dirty |= dirty
+                raise
+            for path in removals:
+                if os.path.isfile(path):
+                    os.remove(path)
+            if dirty:
+                modelcache_log.info("Flushed %s faiss indexes (%s bytes) in %.3fs.",
+                                    len(dirty), nbytes, time.time() - start_time)
+            return nbytes
 
     def close(self):
         self.flush()
 
-    def count(self):
-        return self._index.ntotal
+    def count(self, model=None):
+        """Number of live vectors for model, or across every model when model is None."""
+        models = [model] if model is not None else self._known_models()
+        total = 0
+        for m in models:
+            total += self._searched_index(m).ntotal - len(self._deleted.get(m, ()))
+        return total
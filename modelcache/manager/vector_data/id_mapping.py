@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+from typing import Iterable, Optional
+import numpy as np
+
+
+class IdMapping:
+    """
+    Translation table between external ids (e.g. MySQL uuid strings) and the
+    dense int64 surrogates FAISS requires.
+
+    The surrogate of an id is its slot in an array of external ids, so going
+    back from search results is a single fancy-indexing step. Deleted slots
+    are left empty and never reused.
+    """
+
+    def __init__(self, external_ids: Optional[Iterable] = None):
+        external_ids = list(external_ids) if external_ids is not None else []
+        self._size = len(external_ids)
+        self._external = np.empty(max(self._size, 16), dtype=object)
+        self._external[:self._size] = external_ids
+        self._surrogates = {e: i for i, e in enumerate(external_ids) if e is not None}
+
+    def __len__(self):
+        return len(self._surrogates)
+
+    def _grow(self, size):
+        if size <= len(self._external):
+            return
+        external = np.empty(max(size, 2 * len(self._external)), dtype=object)
+        external[:self._size] = self._external[:self._size]
+        self._external = external
+
+    def add(self, external_ids) -> np.ndarray:
+        """Return the surrogates of external_ids, allocating new ones as needed."""
+        surrogates = np.empty(len(external_ids), dtype="int64")
+        self._grow(self._size + len(external_ids))
+        for i, external_id in enumerate(external_ids):
+            surrogate = self._surrogates.get(external_id)
+            if surrogate is None:
+                surrogate = self._size
+                self._external[surrogate] = external_id
+                self._surrogates[external_id] = surrogate
+                self._size += 1
+            surrogates[i] = surrogate
+        return surrogates
+
+    def to_surrogates(self, external_ids) -> np.ndarray:
+        """Surrogates of the known ids among external_ids."""
+        return np.array([self._surrogates[e] for e in external_ids if e in self._surrogates], dtype="int64")
+
+    def to_external(self, surrogates: np.ndarray) -> np.ndarray:
+        """Map an array of surrogates back to external ids; -1 becomes None."""
+        surrogates = np.asarray(surrogates, dtype="int64")
+        missing = surrogates < 0
+        external = self._external[np.where(missing, 0, surrogates)]
+        external[missing] = None
+        return external
+
+    def remove(self, external_ids) -> np.ndarray:
+        """Forget external_ids and return the surrogates they had."""
+        surrogates = self.to_surrogates(external_ids)
+        for surrogate in surrogates:
+            del self._surrogates[self._external[surrogate]]
+            self._external[surrogate] = None
+        return surrogates
+
+    def dumps(self) -> bytes:
+        """The table in .npy format."""
+        external = ["" if e is None else str(e) for e in self._external[:self._size]]
+        buffer = io.BytesIO()
+        np.save(buffer, np.array(external, dtype=str))
+        return buffer.getvalue()
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.dumps())
+
+    @staticmethod
+    def load(path) -> "IdMapping":
+        external = np.load(path, allow_pickle=False).tolist()
+        return IdMapping([e if e != "" else None for e in external])
+
+    @staticmethod
+    def path_for(index_path) -> str:
+        return index_path + ".ids.npy"
+
+    @staticmethod
+    def exists(index_path) -> bool:
+        return os.path.isfile(IdMapping.path_for(index_path))
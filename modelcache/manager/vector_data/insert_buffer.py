@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from typing import Any, Callable, List
+
+import numpy as np
+
+from modelcache.utils.log import modelcache_log
+
+
+class InsertBuffer:
+    """
+    Per-collection write buffer for vector inserts.
+
+    Rows are accumulated per key and handed to write_func(key, ids, vectors)
+    in one call once max_rows are pending, or when the oldest pending row
+    has waited max_latency_ms. flush(key) writes a key's rows immediately
+    and returns only after they are in storage (or queued for a retry),
+    which is what searches use to read their own writes. Only that key's
+    write is waited for; other keys' slow or retried writes never block it.
+
+    A failed write is put back in front of the key's buffer and retried
+    after an exponential backoff (max_latency_ms doubled per attempt, at
+    most max_backoff_ms), up to max_retries times; the rows are then
+    dropped. failed_writes and lost_rows count both.
+    """
+
+    def __init__(
+        self,
+        write_func: Callable[[Any, List[Any], np.ndarray], Any],
+        max_rows: int = 1000,
+        max_latency_ms: int = 1000,
+        max_retries: int = 3,
+        max_backoff_ms: int = 30000,
+    ):
+        self._write_func = write_func
+        self._max_rows = max_rows
+        self._max_latency = max_latency_ms / 1000
+        self._max_retries = max_retries
+        self._max_backoff = max_backoff_ms / 1000
+        # key -> [ids, vectors, time of the oldest row, failed attempts, no retry before]
+        self._buffers = dict()
+        self.failed_writes = 0
+        self.lost_rows = 0
+        self._cond = threading.Condition()
+        # key -> lock held from taking that key's buffer until it is written, so
+        # flush(key) never returns while another thread still inserts its rows
+        self._write_locks = dict()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def pending(self, key=None) -> int:
+        """Rows waiting to be written, for key or in total."""
+        with self._cond:
+            if key is not None:
+                return len(self._buffers[key][0]) if key in self._buffers else 0
+            return sum(len(buffer[0]) for buffer in self._buffers.values())
+
+    def add(self, key, ids: List[Any], vectors: np.ndarray):
+        with self._cond:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = [[], [], time.monotonic(), 0, 0.0]
+                self._cond.notify()  # let the writer schedule this key's deadline
+            buffer[0].extend(ids)
+            buffer[1].append(vectors)
+            # A buffer backing off after a failure waits for its retry time even when full
+            full = len(buffer[0]) >= self._max_rows and buffer[4] <= time.monotonic()
+        if full:
+            self.flush(key)
+
+    def discard(self, key):
+        """Drop a key's pending rows without writing them."""
+        with self._cond:
+            self._buffers.pop(key, None)
+
+    def _write(self, key, buffer):
+        ids, vectors, oldest, attempts, _ = buffer
+        try:
+            self._write_func(key, ids, np.concatenate(vectors))
+        except Exception as e:
+            attempts += 1
+            with self._cond:
+                self.failed_writes += 1
+                if self._stopped or attempts > self._max_retries:
+                    self.lost_rows += len(ids)
+                    modelcache_log.error("Buffered insert into %s failed, %s rows lost: %s", key, len(ids), e)
+                    return
+                backoff = min(self._max_latency * 2 ** attempts, self._max_backoff)
+                # Put the rows back in front of any added since, with the same deadline
+                newer = self._buffers.pop(key, None)
+                if newer is not None:
+                    ids, vectors = ids + newer[0], vectors + newer[1]
+                self._buffers[key] = [ids, vectors, oldest, attempts, time.monotonic() + backoff]
+                self._cond.notify()
+            modelcache_log.warning("Buffered insert into %s failed (attempt %s), retrying %s rows in %.1fs: %s",
+                                   key, attempts, len(ids), backoff, e)
+
+    def flush(self, key=None):
+        """Write the pending rows of key, or of every key, now."""
+        if key is None:
+            with self._cond:
+                keys = list(self._buffers)
+            for k in keys:
+                self.flush(k)
+            return
+        # Nothing buffered and no write in flight: skip the lock entirely
+        write_lock = self._write_locks.get(key)
+        if key not in self._buffers and (write_lock is None or not write_lock.locked()):
+            return
+        with self._cond:
+            write_lock = self._write_locks.setdefault(key, threading.Lock())
+        with write_lock:
+            with self._cond:
+                buffer = self._buffers.pop(key, None)
+            if buffer is not None:
+                self._write(key, buffer)
+
+    def _deadline(self, buffer):
+        return max(buffer[2] + self._max_latency, buffer[4])
+
+    def _expired_keys(self):
+        now = time.monotonic()
+        return [key for key, buffer in self._buffers.items() if self._deadline(buffer) <= now]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                timeout = self._max_latency
+                if self._buffers:
+                    deadline = min(self._deadline(buffer) for buffer in self._buffers.values())
+                    timeout = deadline - time.monotonic()
+                if timeout > 0 and not self._stopped:
+                    self._cond.wait(timeout=timeout)
+                if self._stopped:
+                    return
+                keys = self._expired_keys()
+            for key in keys:
+                self.flush(key)
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=max(self._max_latency, 1))
+        self.flush()
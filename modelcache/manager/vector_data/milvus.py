@@ -1,17 +1,26 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import contextvars
 import logging
-from typing import List
+import time
+from contextlib import contextmanager
+from typing import List, Optional
 from uuid import uuid4
 import numpy as np
 
 from modelcache.embedding import MetricType
 from modelcache.utils import import_pymilvus
 from modelcache.utils.log import modelcache_log
-from modelcache.manager.vector_data.base import VectorStorage, VectorData
+from modelcache.manager.vector_data.base import VectorStorage, VectorData, pack_search_results
+from modelcache.manager.vector_data.insert_buffer import InsertBuffer
 
 
 import_pymilvus()
 
+# Set for the calls of a session that must see its own buffered inserts,
+# see Milvus.read_your_writes(); None falls back to the store's default.
+_READ_YOUR_WRITES = contextvars.ContextVar("milvus_read_your_writes", default=None)
+
 from pymilvus import (  # pylint: disable=C0413
     connections,
     utility,
@@ -40,6 +49,11 @@ class Milvus(VectorStorage):
         local_mode: bool = False,
         local_data: str = "./milvus_data",
         metric_type: MetricType = MetricType.COSINE,
+        model_search_params: dict = None,
+        use_async_client: bool = False,
+        insert_buffer_size: int = 0,
+        insert_buffer_ms: int = 1000,
+        read_your_writes: bool = False,
     ):
         if dimension <= 0:
             raise ValueError(
@@ -65,13 +79,49 @@ class Milvus(VectorStorage):
             "ANNOY": {"metric_type": metric_type.value, "params": {"search_k": 10}},
             "AUTOINDEX": {"metric_type": metric_type.value, "params": {}},
         }
+        # search_params overrides the params of individual index types
+        for index_type, params in (search_params or {}).items():
+            self.search_params[index_type] = {"metric_type": metric_type.value, "params": params}
+        # model -> params such as {"ef": 64} or {"nprobe": 32} for that model's searches
+        self.model_search_params = model_search_params or {}
+        # collection name -> index type the collection was built with
+        self.index_types = dict()
         self.index_params ={
             "metric_type": metric_type.value,
             "index_type": "HNSW",
             "params": {"M": 16, "efConstruction": 64},
         }
         self.collections = dict()
+        self._async_client = None
+        # The event loop the async client is used from, its channel is bound to it
+        self._async_loop = None
+        if use_async_client:
+            self._async_client = self._create_async_client(host, port, user, password, secure)
+        # Optional write buffer: rows are inserted per collection in batches of
+        # insert_buffer_size or after insert_buffer_ms, to avoid tiny segments.
+        # A search that reads its own writes (read_your_writes per call, in a
+        # read_your_writes() session, or by default) first inserts its
+        # collection's pending rows; other searches may miss rows for up to
+        # insert_buffer_ms.
+        self._insert_buffer = None
+        if insert_buffer_size > 0:
+            self._insert_buffer = InsertBuffer(self._insert, max_rows=insert_buffer_size,
+                                               max_latency_ms=insert_buffer_ms)
+        self._read_your_writes_default = read_your_writes
+        self._ingest_rows = 0
+        self._ingest_calls = 0
+        self._ingest_time = 0
 
+    @staticmethod
+    def _create_async_client(host, port, user, password, secure):
+        try:
+            from pymilvus import AsyncMilvusClient  # pylint: disable=C0415
+        except ImportError:
+            modelcache_log.warning("AsyncMilvusClient needs pymilvus>=2.5.3, searching from worker threads instead.")
+            return None
+        scheme = "https" if secure else "http"
+        token = f"{user}:{password}" if user else ""
+        return AsyncMilvusClient(uri=f"{scheme}://{host}:{port}", token=token)
 
     def _connect(self, host, port, user, password, secure):
         try:
@@ -136,6 +186,7 @@ class Milvus(VectorStorage):
                 self.index_params = i_p
         else:
             self.index_params = new_collection.indexes[0].to_dict()["index_param"]
+        self.index_types[collection_name] = self.index_params.get("index_type", "AUTOINDEX")
 
         new_collection.load()
 
@@ -145,31 +196,128 @@ class Milvus(VectorStorage):
             self._create_collection(collection_name)
         return self.collections[collection_name]
 
+    def _insert(self, collection_name_model, id_array, np_data):
+        col = self._get_collection(collection_name_model)
+        start_time = time.time()
+        col.insert([id_array, np_data])
+        self._ingest_time += time.time() - start_time
+        self._ingest_rows += len(id_array)
+        self._ingest_calls += 1
+
     def mul_add(self, datas: List[VectorData], model=None):
         collection_name_model = self.collection_name + '_' + model
-        col = self._get_collection(collection_name_model)
         data_array, id_array = map(list, zip(*((data.data, data.id) for data in datas)))
         np_data = np.array(data_array).astype("float32")
-        entities = [id_array, np_data]
-        col.insert(entities)
+        if self._insert_buffer is not None:
+            self._insert_buffer.add(collection_name_model, id_array, np_data)
+        else:
+            self._insert(collection_name_model, id_array, np_data)
+
+    @contextmanager
+    def read_your_writes(self, enabled: bool = True):
+        """Searches made inside the block (and tasks or threads started from it) see the rows buffered before them."""
+        token = _READ_YOUR_WRITES.set(enabled)
+        try:
+            yield
+        finally:
+            _READ_YOUR_WRITES.reset(token)
 
+    def _needs_sync(self, collection_name_model, read_your_writes: Optional[bool]) -> bool:
+        if self._insert_buffer is None:
+            return False
+        if read_your_writes is None:
+            read_your_writes = _READ_YOUR_WRITES.get()
+        if read_your_writes is None:
+            read_your_writes = self._read_your_writes_default
+        return read_your_writes and self._insert_buffer.pending(collection_name_model) > 0
 
-    def search(self, data: np.ndarray, top_k: int = -1, model=None):
+    def _sync_writes(self, collection_name_model, read_your_writes: Optional[bool] = None):
+        if self._needs_sync(collection_name_model, read_your_writes):
+            self._insert_buffer.flush(collection_name_model)
+
+    def ingest_stats(self, model=None) -> dict:
+        """Insert throughput and buffered write failure counters; with a model, also its collection's pending rows and segment count."""
+        stats = {
+            "rows": self._ingest_rows,
+            "insert_calls": self._ingest_calls,
+            "rows_per_insert": round(self._ingest_rows / self._ingest_calls, 2) if self._ingest_calls else 0,
+            "rows_per_second": round(self._ingest_rows / self._ingest_time, 2) if self._ingest_time else 0,
+            "pending_rows": self._insert_buffer.pending() if self._insert_buffer is not None else 0,
+            "failed_inserts": self._insert_buffer.failed_writes if self._insert_buffer is not None else 0,
+            "lost_rows": self._insert_buffer.lost_rows if self._insert_buffer is not None else 0,
+        }
+        if model is not None:
+            collection_name_model = self.collection_name + '_' + model
+            if self._insert_buffer is not None:
+                stats["pending_rows"] = self._insert_buffer.pending(collection_name_model)
+            stats["segments"] = len(utility.get_query_segment_info(collection_name_model, using=self.alias))
+        return stats
+
+    def _search_param(self, collection_name_model, model):
+        """Search params of the collection's index type, with the model's overrides applied."""
+        index_type = self.index_types.get(collection_name_model, "AUTOINDEX")
+        param = self.search_params.get(index_type, self.search_params["AUTOINDEX"])
+        overrides = self.model_search_params.get(model)
+        if overrides:
+            param = dict(param, params=dict(param["params"], **overrides))
+        return param
+
+    def search(self, data: np.ndarray, top_k: int = -1, model=None, read_your_writes: Optional[bool] = None):
         if top_k == -1:
             top_k = self.top_k
         collection_name_model = self.collection_name + '_' + model
+        self._sync_writes(collection_name_model, read_your_writes)
         col = self._get_collection(collection_name_model)
         search_result = col.search(
-            data=data.reshape(1, -1).tolist(),
+            data=np.asarray(data, dtype="float32").reshape(1, -1),
             anns_field="embedding",
-            param=self.search_params,
+            param=self._search_param(collection_name_model, model),
             limit=top_k,
         )
         return list(zip(search_result[0].distances, search_result[0].ids))
 
+    def search_batch(self, datas: np.ndarray, top_k: int = -1, model=None, read_your_writes: Optional[bool] = None):
+        if top_k == -1:
+            top_k = self.top_k
+        collection_name_model = self.collection_name + '_' + model
+        self._sync_writes(collection_name_model, read_your_writes)
+        col = self._get_collection(collection_name_model)
+        # All query vectors in one RPC
+        search_result = col.search(
+            data=np.asarray(datas, dtype="float32"),
+            anns_field="embedding",
+            param=self._search_param(collection_name_model, model),
+            limit=top_k,
+        )
+        return pack_search_results([list(zip(hits.distances, hits.ids)) for hits in search_result])
+
+    async def asearch(self, data: np.ndarray, top_k: int = -1, model=None, read_your_writes: Optional[bool] = None):
+        if self._async_client is None:
+            return await asyncio.to_thread(self.search, data, top_k, model, read_your_writes)
+        if top_k == -1:
+            top_k = self.top_k
+        self._async_loop = asyncio.get_running_loop()
+        collection_name_model = self.collection_name + '_' + model
+        if collection_name_model not in self.collections:
+            # Creating and loading the collection is a one-off blocking call
+            await asyncio.to_thread(self._get_collection, collection_name_model)
+        if self._needs_sync(collection_name_model, read_your_writes):
+            await asyncio.to_thread(self._insert_buffer.flush, collection_name_model)
+        search_result = await self._async_client.search(
+            collection_name=collection_name_model,
+            data=np.asarray(data, dtype="float32").reshape(1, -1).tolist(),
+            anns_field="embedding",
+            search_params=self._search_param(collection_name_model, model),
+            limit=top_k,
+        )
+        return [(hit["distance"], hit["id"]) for hit in search_result[0]]
+
 
     def delete(self, ids, model=None):
         collection_name_model = self.collection_name + '_' + model
+        if self._insert_buffer is not None:
+            # Pending rows must reach Milvus before they can be deleted
+            self._insert_buffer.flush(collection_name_model)
         col = self._get_collection(collection_name_model)
 
         del_ids = ",".join([f'"{x}"' for x in ids])
@@ -179,6 +327,8 @@ class Milvus(VectorStorage):
 
     def rebuild_col(self, model):
         collection_name_model = self.collection_name + '_' + model
+        if self._insert_buffer is not None:
+            self._insert_buffer.discard(collection_name_model)
 
         # if col exist, drop col
         if not utility.has_collection(collection_name_model, using=self.alias):
@@ -194,10 +344,35 @@ class Milvus(VectorStorage):
             col.compact()
 
     def flush(self):
+        if self._insert_buffer is not None:
+            self._insert_buffer.flush()
         for col in self.collections.values():
             col.flush(_async=True)
 
     def close(self):
+        if self._insert_buffer is not None:
+            self._insert_buffer.close()
         self.flush()
+        self._close_async_client()
         if self._local_mode:
             self._server.stop()
+
+    def _close_async_client(self):
+        """Close the async client on the loop it was used from; skipped once that loop has stopped."""
+        loop = self._async_loop
+        if self._async_client is None or loop is None:
+            return
+        if loop.is_closed() or not loop.is_running():
+            modelcache_log.info("Event loop of the async Milvus client has stopped, not closing it.")
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(self._async_client.close())
+        else:
+            try:
+                asyncio.run_coroutine_threadsafe(self._async_client.close(), loop).result(timeout=5)
+            except Exception as e:
+                modelcache_log.warning("Closing the async Milvus client failed: %s", e)
@@ -5,6 +5,8 @@ from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from redis.commands.search.query import Query
 from redis.commands.search.field import TagField, VectorField, NumericField
 from redis.client import Redis
+from redis.connection import BlockingConnectionPool
+from redis.exceptions import ResponseError
 
 from modelcache.manager.vector_data.base import VectorStorage, VectorData
 from modelcache.utils import import_redis
@@ -14,7 +16,28 @@ from modelcache.utils.index_util import get_index_prefix
 import_redis()
 
 
+DEFAULT_INDEX_PARAMS = {
+    "TYPE": "FLOAT32",
+    "M": 16,
+    "EF_CONSTRUCTION": 200,
+    "EF_RUNTIME": 10,
+}
+
+
 class RedisVectorStore(VectorStorage):
+    """
+    Redis (RediSearch) vector store with one HNSW index per model.
+
+    index_params sets the HNSW parameters (M, EF_CONSTRUCTION, EF_RUNTIME)
+    and the vector TYPE (FLOAT32, or FLOAT16 for half the memory);
+    model_params overrides them, and top_k, per model. Inserts are sent
+    through a pipeline in chunks of insert_batch_size.
+
+    Connections come from a pool of at most max_connections; callers wait
+    for a free connection instead of opening more. Index handles, prepared
+    queries and index existence are cached per model.
+    """
+
     def __init__(
         self,
         host: str = "localhost",
@@ -24,31 +47,77 @@ class RedisVectorStore(VectorStorage):
         dimension: int = 0,
         top_k: int = 1,
         namespace: str = "",
+        index_params: dict = None,
+        model_params: dict = None,
+        insert_batch_size: int = 1000,
+        max_connections: int = 50,
     ):
         if dimension <= 0:
             raise ValueError(
                 f"invalid `dim` param: {dimension} in the Redis vector store."
             )
-        self._client = Redis(
-            host=host, port=int(port), username=username, password=password
+        self._pool = BlockingConnectionPool(
+            host=host, port=int(port), username=username, password=password,
+            max_connections=max_connections
         )
+        self._client = Redis(connection_pool=self._pool)
         self.top_k = top_k
         self.dimension = dimension
         self.namespace = namespace
         self.doc_prefix = f"{self.namespace}doc:"
+        self.index_params = dict(DEFAULT_INDEX_PARAMS, **(index_params or {}))
+        self.model_params = model_params or {}
+        self.insert_batch_size = insert_batch_size
+        # index names known to exist
+        self._known_indexes = set()
+        # (model, top_k) -> (ft handle, prepared Query, EF_RUNTIME, vector TYPE)
+        self._searchers = dict()
+
+    def _params(self, model) -> dict:
+        """Index and search parameters for model, with the per-model overrides applied."""
+        params = dict(self.index_params, top_k=self.top_k)
+        params.update(self.model_params.get(model, {}))
+        return params
+
+    @staticmethod
+    def _to_bytes(data: np.ndarray, vector_type: str) -> bytes:
+        dtype = np.float16 if vector_type == "FLOAT16" else np.float32
+        return np.asarray(data).astype(dtype).tobytes()
 
     def _check_index_exists(self, index_name: str) -> bool:
         """Check if Redis index exists."""
+        if index_name in self._known_indexes:
+            return True
         try:
             self._client.ft(index_name).info()
-        except:
+        except ResponseError:
             modelcache_log.info("Index does not exist")
             return False
         modelcache_log.info("Index already exists")
+        self._known_indexes.add(index_name)
         return True
 
-    def create_index(self, index_name, index_prefix):
+    def _searcher(self, model, top_k):
+        key = (model, top_k)
+        searcher = self._searchers.get(key)
+        if searcher is None:
+            params = self._params(model)
+            embedding_field_name = "data_vector"
+            base_query = f'*=>[KNN {top_k} @{embedding_field_name} $vector EF_RUNTIME $ef_runtime AS distance]'
+            query = (
+                Query(base_query)
+                .sort_by("distance")
+                .return_fields("data_id", "distance")
+                .paging(0, top_k)
+                .dialect(2)
+            )
+            searcher = (self._client.ft(get_index_name(model)), query, params["EF_RUNTIME"], params["TYPE"])
+            self._searchers[key] = searcher
+        return searcher
+
+    def create_index(self, index_name, index_prefix, model=None):
         dimension = self.dimension
+        params = self._params(model)
         if self._check_index_exists(index_name):
             modelcache_log.info(
                 "The %s already exists, and it will be used directly", index_name
@@ -61,10 +130,13 @@ class RedisVectorStore(VectorStorage):
             id = NumericField(name=id_field_name)
             embedding = VectorField(embedding_field_name,
                                     "HNSW", {
-                                        "TYPE": "FLOAT32",
+                                        "TYPE": params["TYPE"],
                                         "DIM": dimension,
                                         "DISTANCE_METRIC": "L2",
                                         "INITIAL_CAP": 1000,
+                                        "M": params["M"],
+                                        "EF_CONSTRUCTION": params["EF_CONSTRUCTION"],
+                                        "EF_RUNTIME": params["EF_RUNTIME"],
                                     }
                                     )
             fields = [id, embedding]
@@ -74,37 +146,36 @@ class RedisVectorStore(VectorStorage):
             self._client.ft(index_name).create_index(
                 fields=fields, definition=definition
             )
+            self._known_indexes.add(index_name)
             return 'create_success'
 
     def mul_add(self, datas: List[VectorData], model=None):
-        # pipe = self._client.pipeline()
-        for data in datas:
+        vector_type = self._params(model)["TYPE"]
+        index_prefix = get_index_prefix(model)
+        id_field_name = "data_id"
+        embedding_field_name = "data_vector"
+        # One round-trip per chunk instead of one per vector
+        pipe = self._client.pipeline(transaction=False)
+        for i, data in enumerate(datas, 1):
             id: int = data.id
-            embedding = data.data.astype(np.float32).tobytes()
-            id_field_name = "data_id"
-            embedding_field_name = "data_vector"
+            embedding = self._to_bytes(data.data, vector_type)
             obj = {id_field_name: id, embedding_field_name: embedding}
-            index_prefix = get_index_prefix(model)
-            self._client.hset(f"{index_prefix}{id}", mapping=obj)
+            pipe.hset(f"{index_prefix}{id}", mapping=obj)
+            if i % self.insert_batch_size == 0:
+                pipe.execute()
+        pipe.execute()
 
     def search(self, data: np.ndarray, top_k: int = -1, model=None):
-        index_name = get_index_name(model)
+        if top_k == -1:
+            top_k = self._params(model)["top_k"]
         id_field_name = "data_id"
-        embedding_field_name = "data_vector"
-        base_query = f'*=>[KNN 2 @{embedding_field_name} $vector AS distance]'
-        query = (
-            Query(base_query)
-            .sort_by("distance")
-            .return_fields(id_field_name, "distance")
-            .dialect(2)
-        )
+        ft, query, ef_runtime, vector_type = self._searcher(model, top_k)
 
-        query_params = {"vector": data.astype(np.float32).tobytes()}
-        results = (
-            self._client.ft(index_name)
-            .search(query, query_params=query_params)
-            .docs
-        )
+        query_params = {
+            "vector": self._to_bytes(data, vector_type),
+            "ef_runtime": ef_runtime,
+        }
+        results = ft.search(query, query_params=query_params).docs
         return [(float(result.distance), int(getattr(result, id_field_name))) for result in results]
 
     def rebuild(self, ids=None) -> bool:
@@ -117,9 +188,12 @@ class RedisVectorStore(VectorStorage):
                 self._client.ft(index_name_model).dropindex(delete_documents=True)
             except Exception as e:
                 raise ValueError(str(e))
+            finally:
+                self._known_indexes.discard(index_name_model)
+                self._searchers = {k: v for k, v in self._searchers.items() if k[0] != model}
         try:
             index_prefix = get_index_prefix(model)
-            self.create_index(index_name_model, index_prefix)
+            self.create_index(index_name_model, index_prefix, model=model)
         except Exception as e:
             raise ValueError(str(e))
         # return 'rebuild success'
@@ -133,7 +207,13 @@ class RedisVectorStore(VectorStorage):
     def create(self, model=None):
         index_name = get_index_name(model)
         index_prefix = get_index_prefix(model)
-        return self.create_index(index_name, index_prefix)
+        return self.create_index(index_name, index_prefix, model=model)
 
     def get_index_by_name(self, index_name):
         pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self._pool.disconnect()
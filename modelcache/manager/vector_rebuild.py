@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import time
+from typing import Any, Callable, Dict, Optional
+
+from modelcache.manager.scalar_data.base import CacheStorage
+from modelcache.manager.vector_data.base import VectorStorage, VectorData
+from modelcache.utils.error import CacheError
+from modelcache.utils.log import modelcache_log
+
+
+def rebuild_vectors(
+    scalar_storage: CacheStorage,
+    vector_storage: VectorStorage,
+    model=None,
+    batch_size: int = 10000,
+    progress_interval_s: float = 10,
+    progress: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Reload a vector store from the embeddings kept in the scalar store.
+
+    Rows of model, or of every model, are streamed with
+    CacheStorage.iter_embeddings and added to vector_storage block by block,
+    so memory stays bounded by batch_size whatever the table size. Each
+    model's collection is reset with rebuild_col before its first block.
+    Every progress_interval_s the current stats are logged and passed to
+    progress; the final stats are returned. Raises CacheError when the
+    scalar store keeps no embeddings (embedding_storage = none).
+    """
+    if not scalar_storage.stores_embeddings:
+        # Nothing to rebuild from, fail before any collection is reset
+        raise CacheError(f"{type(scalar_storage).__name__} stores no embeddings, vectors cannot be rebuilt from it")
+    start_time = time.time()
+    last_progress = start_time
+    stats = {"rows": 0, "models": dict(), "seconds": 0.0, "rows_per_second": 0.0}
+
+    def update_stats():
+        stats["seconds"] = time.time() - start_time
+        stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+
+    for block_model, ids, embeddings in scalar_storage.iter_embeddings(model=model, batch_size=batch_size):
+        if block_model not in stats["models"]:
+            resp = vector_storage.rebuild_col(block_model)
+            if resp:
+                # e.g. the collection is already gone, mul_add creates it again
+                modelcache_log.warning("Resetting vectors of model %s: %s", block_model, resp)
+            stats["models"][block_model] = 0
+        vector_storage.mul_add([VectorData(id=_id, data=embedding) for _id, embedding in zip(ids, embeddings)],
+                               block_model)
+        stats["rows"] += len(ids)
+        stats["models"][block_model] += len(ids)
+
+        now = time.time()
+        if now - last_progress >= progress_interval_s:
+            last_progress = now
+            update_stats()
+            modelcache_log.info("Vector rebuild: %s rows in %.1fs (%.0f rows/s).",
+                                stats["rows"], stats["seconds"], stats["rows_per_second"])
+            if progress is not None:
+                progress(dict(stats))
+
+    vector_storage.flush()
+    update_stats()
+    modelcache_log.info("Vector rebuild done: %s rows of %s models in %.1fs (%.0f rows/s).",
+                        stats["rows"], len(stats["models"]), stats["seconds"], stats["rows_per_second"])
+    if progress is not None:
+        progress(dict(stats))
+    return stats
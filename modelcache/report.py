@@ -6,6 +6,14 @@ class Report:
         self.search_all_time = 0
         self.search_count = 0
         self.hint_cache_count = 0
+        self.embedding_batch_all_time = 0
+        self.embedding_batch_all_size = 0
+        self.embedding_batch_count = 0
+        self.embedding_cache_hit_count = 0
+        self.embedding_cache_miss_count = 0
+        self.snapshot_all_time = 0
+        self.snapshot_all_bytes = 0
+        self.snapshot_count = 0
 
     def embedding(self, delta_time):
         """Embedding counts and time.
@@ -23,6 +31,26 @@ class Report:
         self.search_all_time += delta_time
         self.search_count += 1
 
+    def embedding_batch(self, batch_size, delta_time):
+        """Embedding worker batch counts, sizes and time.
+
+        :param batch_size: number of inputs embedded in the batch.
+        :param delta_time: runtime of the batched embedding call.
+        """
+        self.embedding_batch_all_time += delta_time
+        self.embedding_batch_all_size += batch_size
+        self.embedding_batch_count += 1
+
+    def snapshot(self, delta_time, nbytes):
+        """Storage snapshot counts, time and size.
+
+        :param delta_time: runtime of the snapshot.
+        :param nbytes: bytes written by the snapshot.
+        """
+        self.snapshot_all_time += delta_time
+        self.snapshot_all_bytes += nbytes
+        self.snapshot_count += 1
+
     def average_embedding_time(self):
         """Average embedding time."""
         return round(
@@ -42,3 +70,42 @@ class Report:
 
     def hint_cache(self):
         self.hint_cache_count += 1
+
+    def embedding_cache_hit(self):
+        self.embedding_cache_hit_count += 1
+
+    def embedding_cache_miss(self):
+        self.embedding_cache_miss_count += 1
+
+    def average_embedding_batch_size(self):
+        return round(
+            self.embedding_batch_all_size / self.embedding_batch_count
+            if self.embedding_batch_count != 0
+            else 0,
+            4,
+        )
+
+    def average_embedding_batch_time(self):
+        return round(
+            self.embedding_batch_all_time / self.embedding_batch_count
+            if self.embedding_batch_count != 0
+            else 0,
+            4,
+        )
+
+
+    def average_snapshot_time(self):
+        return round(
+            self.snapshot_all_time / self.snapshot_count
+            if self.snapshot_count != 0
+            else 0,
+            4,
+        )
+
+    def average_snapshot_bytes(self):
+        return round(
+            self.snapshot_all_bytes / self.snapshot_count
+            if self.snapshot_count != 0
+            else 0,
+            4,
+        )
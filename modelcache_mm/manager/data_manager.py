@@ -17,6 +17,7 @@ from modelcache_mm.manager.scalar_data.base import (
 from modelcache_mm.utils.error import CacheError, ParamError
 from modelcache_mm.manager.vector_data.base import VectorBase, VectorData
 from modelcache_mm.manager.object_data.base import ObjectBase
+from modelcache.manager.snapshot_scheduler import SnapshotScheduler
 from modelcache_mm.utils.log import modelcache_log
 
 
@@ -146,12 +147,21 @@ class SSDataManager(DataManager):
         max_size,
         clean_size,
         policy="LRU",
+        snapshot_interval_ms: int = 0,
+        snapshot_dirty_threshold: int = 0,
     ):
         self.max_size = max_size
         self.clean_size = clean_size
         self.s = s
         self.v = v
         self.o = o
+        # Periodic background flush of the storages (0 only flushes on close)
+        self.snapshot_scheduler = None
+        if snapshot_interval_ms > 0 or snapshot_dirty_threshold > 0:
+            self.snapshot_scheduler = SnapshotScheduler(
+                self.flush,
+                interval_ms=snapshot_interval_ms,
+                dirty_threshold=snapshot_dirty_threshold)
 
     def save(self, text, image_url, image_id,  answer, embedding, **kwargs):
         model = kwargs.pop("model", None)
@@ -215,6 +225,11 @@ class SSDataManager(DataManager):
             model,
             mm_type
         )
+        self._mark_dirty(len(embeddings))
+
+    def _mark_dirty(self, count):
+        if self.snapshot_scheduler is not None:
+            self.snapshot_scheduler.mark_dirty(count)
 
     def get_scalar_data(self, res_data, **kwargs) -> Optional[CacheData]:
         cache_data = self.s.get_data_by_id(res_data[1])
@@ -258,6 +273,7 @@ class SSDataManager(DataManager):
         except Exception as e:
             return {'status': 'failed', 'milvus': 'success',
                     'mysql': 'delete mysql data failed, please check! e: {}'.format(e)}
+        self._mark_dirty(len(id_list))
 
         return {'status': 'success', 'milvus': 'delete_count: '+str(v_delete_count),
                 'mysql': 'delete_count: '+str(s_delete_count)}
@@ -280,14 +296,16 @@ class SSDataManager(DataManager):
             # return 'truncate milvus data failed, please check!'
             return {'status': 'failed', 'VectorDB': 'rebuild',
                     'ScalarDB': 'truncate scalardb data failed, please check! e: {}'.format(e)}
+        self._mark_dirty(1)
 
         return {'status': 'success', 'VectorDB': 'rebuild', 'ScalarDB': 'delete_count: ' + str(delete_count)}
 
     def flush(self):
-        self.s.flush()
-        self.v.flush()
+        return (self.s.flush() or 0) + (self.v.flush() or 0)
 
     def close(self):
+        if self.snapshot_scheduler is not None:
+            self.snapshot_scheduler.close()
         self.s.close()
         self.v.close()
 
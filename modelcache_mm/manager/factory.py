@@ -13,6 +13,8 @@ def get_data_manager(
     eviction: str = "LRU",
     data_path: str = "data_map.txt",
     get_data_container: Callable = None,
+    snapshot_interval_ms: int = 0,
+    snapshot_dirty_threshold: int = 0,
 ):
     if not cache_base and not vector_base:
         return MapDataManager(data_path, max_size, get_data_container)
@@ -23,4 +25,6 @@ def get_data_manager(
     if isinstance(object_base, str):
         object_base = ObjectBase(name=object_base)
     assert cache_base and vector_base
-    return SSDataManager(cache_base, vector_base, object_base, max_size, clean_size, eviction)
+    return SSDataManager(cache_base, vector_base, object_base, max_size, clean_size, eviction,
+                         snapshot_interval_ms=snapshot_interval_ms,
+                         snapshot_dirty_threshold=snapshot_dirty_threshold)
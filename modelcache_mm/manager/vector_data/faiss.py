@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import os
+import threading
 from typing import List
 import numpy as np
 from modelcache_mm.manager.vector_data.base import VectorBase, VectorData
@@ -18,6 +19,7 @@ class Faiss(VectorBase):
         self._index_file_path = index_file_path
         self._index = faiss.index_factory(self._dimension, "IDMap,Flat", faiss.METRIC_L2)
         self._top_k = top_k
+        self._lock = threading.Lock()
         if os.path.isfile(index_file_path):
             self._index = faiss.read_index(index_file_path)
 
@@ -25,7 +27,8 @@ class Faiss(VectorBase):
         data_array, id_array = map(list, zip(*((data.data, data.id) for data in datas)))
         np_data = np.array(data_array).astype("float32")
         ids = np.array(id_array)
-        self._index.add_with_ids(np_data, ids)
+        with self._lock:
+            self._index.add_with_ids(np_data, ids)
 
     def search(self, data: np.ndarray, top_k: int, model, mm_type='mm'):
         if self._index.ntotal == 0:
@@ -39,7 +42,8 @@ class Faiss(VectorBase):
 
     def rebuild_col(self, ids=None):
         try:
-            self._index.reset()
+            with self._lock:
+                self._index.reset()
         except Exception as e:
             return f"An error occurred during index rebuild: {e}"
 
@@ -48,7 +52,8 @@ class Faiss(VectorBase):
 
     def delete(self, ids):
         ids_to_remove = np.array(ids)
-        self._index.remove_ids(faiss.IDSelectorBatch(ids_to_remove.size, faiss.swig_ptr(ids_to_remove)))
+        with self._lock:
+            return self._index.remove_ids(faiss.IDSelectorBatch(ids_to_remove.size, faiss.swig_ptr(ids_to_remove)))
 
     def create(self, model=None, mm_type=None):
         pass
@@ -61,7 +66,17 @@ class Faiss(VectorBase):
         # return 'success'
 
     def flush(self):
-        faiss.write_index(self._index, self._index_file_path)
+        """Snapshot the index through a temp file renamed over the old one; returns the bytes written."""
+        # Serialize under the lock, so inserts only wait for the memory copy
+        with self._lock:
+            data = faiss.serialize_index(self._index).tobytes()
+        tmp_path = self._index_file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._index_file_path)
+        return len(data)
 
     def close(self):
         self.flush()
@@ -0,0 +1,153 @@
+import asyncio
+import numpy as np
+import pytest
+
+pytest.importorskip("FlagEmbedding")  # imported by adapter_query for the reranker
+
+from modelcache.adapter.adapter_batch_query import adapt_batch_query
+from modelcache.adapter.adapter_query import adapt_query
+from modelcache.embedding import MetricType
+from modelcache.report import Report
+
+THRESHOLD = 0.9
+
+# ----------- Helpers -----------
+
+class FakeDataManager:
+    """Serves fixed search results and rows, keyed by the query embedding."""
+
+    buffers_hit_count = True
+
+    def __init__(self, results, rows, exact=None):
+        # embedding key -> [(score, id), ...], id -> (answer, question)
+        self.results = results
+        self.rows = rows
+        self.exact = exact or dict()
+        self.search_calls = 0
+        self.hits = []
+
+    def exact_match_id(self, question, **kwargs):
+        return self.exact.get((kwargs.get("model"), question))
+
+    def exact_match_data(self, question, primary_id, **kwargs):
+        return self.rows.get(primary_id)
+
+    def search_batch(self, matrix, **kwargs):
+        self.search_calls += 1
+        return [self.results[int(row[0])] for row in matrix]
+
+    async def search_async(self, embedding_data, **kwargs):
+        self.search_calls += 1
+        return self.results[int(embedding_data[0])]
+
+    def get_scalar_data_batch(self, ids, **kwargs):
+        return {_id: self.rows[_id] for _id in ids if _id in self.rows}
+
+    def update_hit_count(self, primary_id, **kwargs):
+        self.hits.append(primary_id)
+
+    def record_exact_match(self, question, primary_id, **kwargs):
+        pass
+
+class FakeCache:
+    """The attributes of Cache the query adapters read."""
+
+    def __init__(self, data_manager, queries):
+        self.data_manager = data_manager
+        self.report = Report()
+        self.log_time_func = None
+        self.prompts = None
+        self.similarity_metric_type = MetricType.COSINE
+        self.similarity_threshold = THRESHOLD
+        self._queries = queries
+
+    @staticmethod
+    def query_pre_embedding_func(data, **kwargs):
+        return data["query"]
+
+    @staticmethod
+    def post_process_messages_func(messages):
+        return messages[0]
+
+    async def embedding_func(self, query):
+        return np.array([self._queries.index(query)], dtype=np.float32)
+
+def convert(answer, question):
+    return {"data": answer, "hitQuery": question}
+
+def make_cache(exact=None):
+    queries = ["hit", "miss", "edge", "below", "other"]
+    results = {
+        0: [(0.97, 1)],
+        1: [(0.42, 2)],
+        2: [(THRESHOLD, 3)],
+        3: [(THRESHOLD - 1e-6, 4)],
+        4: [(0.95, 5)],
+    }
+    rows = {i: (f"answer{i}", f"question{i}") for i in range(1, 6)}
+    return FakeCache(FakeDataManager(results, rows, exact), queries)
+
+def batch_query(cache, batch):
+    return asyncio.run(adapt_batch_query(convert, cache_obj=cache, batch=batch))
+
+def single_query(cache, model, query):
+    return asyncio.run(adapt_query(convert, cache_obj=cache, scope={"model": model}, query=query))
+
+# ----------- Tests -----------
+
+def test_mixed_hits_and_misses_keep_order():
+    """Test that a batch over several models returns hits and misses in request order."""
+    cache = make_cache()
+    results = batch_query(cache, [("a", "hit"), ("a", "miss"), ("b", "other")])
+    assert results == [{"data": "answer1", "hitQuery": "question1"}, None,
+                       {"data": "answer5", "hitQuery": "question5"}]
+    assert cache.data_manager.search_calls == 2  # one search per model
+    assert sorted(cache.data_manager.hits) == [1, 5]
+    assert cache.report.hint_cache_count == 2
+
+def test_empty_batch():
+    """Test that an empty batch returns no results and searches nothing."""
+    cache = make_cache()
+    assert batch_query(cache, []) == []
+    assert cache.data_manager.search_calls == 0
+
+def test_threshold_edge():
+    """Test that a score equal to the threshold hits and one just below misses."""
+    cache = make_cache()
+    results = batch_query(cache, [("a", "edge"), ("a", "below")])
+    assert results == [{"data": "answer3", "hitQuery": "question3"}, None]
+
+def test_exact_match_skips_search():
+    """Test that exact-match hits are answered without embedding or searching."""
+    cache = make_cache(exact={("a", "hit"): 1})
+    assert batch_query(cache, [("a", "hit")]) == [{"data": "answer1", "hitQuery": "question1"}]
+    assert cache.data_manager.search_calls == 0
+    assert cache.data_manager.hits == [1]
+    cache = make_cache(exact={("a", "hit"): 1})
+    assert single_query(cache, "a", "hit") == {"data": "answer1", "hitQuery": "question1"}
+    assert cache.data_manager.search_calls == 0
+
+def test_single_query_matches_batch():
+    """Test that adapt_query returns the same result as the batch for every query."""
+    batch = [("a", "hit"), ("a", "miss"), ("a", "edge"), ("a", "below"), ("b", "other")]
+    expected = batch_query(make_cache(), batch)
+    assert [single_query(make_cache(), model, query) for model, query in batch] == expected
+
+def test_entries_without_model_get_an_error_slot(monkeypatch):
+    """Test that entries without a model get an error result and the valid entries still run."""
+    cache_module = pytest.importorskip("modelcache.cache")
+    batches = []
+
+    async def create_batch_query(batch, cache_obj):
+        batches.append(batch)
+        return [None] * len(batch)
+
+    monkeypatch.setattr(cache_module.adapter.ChatCompletion, "create_batch_query", create_batch_query)
+    cache = cache_module.Cache.__new__(cache_module.Cache)
+    cache.save_query_info = lambda *args: None
+    query_list = [{"scope": {"model": "a-1"}, "query": "ok"}, {"scope": {}, "query": "no model"},
+                  {"scope": "a", "query": "bad scope"}, "bare"]
+    result = asyncio.run(cache.handle_batch_query(None, {"query_list": query_list}))
+    assert batches == [[("a_1", "ok")]]
+    assert [r["errorCode"] for r in result["results"]] == [0, 104, 104, 104]
+    assert result["results"][0]["cacheHit"] is False
@@ -0,0 +1,120 @@
+import threading
+import numpy as np
+import pytest
+from modelcache.manager.cache_warmer import CacheWarmer
+from modelcache.manager.eviction.arc_cache import ARC
+from modelcache.manager.eviction.memory_cache import MemoryCacheEviction
+from modelcache.manager.scalar_data.sql_storage_sqlite import SQLStorage
+from modelcache.utils.error import ParamError
+
+# ----------- Fixtures -----------
+
+@pytest.fixture
+def storage(tmp_path):
+    s = SQLStorage(db_type="sqlite", url=str(tmp_path / "cache.db"))
+    yield s
+    s.close()
+
+def insert(storage, n, model):
+    rows = [(f"answer{i}", f"question{i}", np.zeros(4, dtype=np.float32), model) for i in range(n)]
+    return storage.batch_insert(rows)
+
+def warm(storage, memory_cache, rows_per_model, **kwargs):
+    warmer = CacheWarmer(storage, memory_cache, rows_per_model, **kwargs)
+    assert warmer.wait(timeout=5)
+    return warmer
+
+# ----------- Tests -----------
+
+def test_warm_up_loads_hottest_rows_per_model(storage):
+    """Test that the top rows by hit_count of every model end up in the memory cache."""
+    ids_a = insert(storage, 10, "a")
+    ids_b = insert(storage, 3, "b")
+    storage.update_hit_counts({ids_a[7]: 5, ids_a[2]: 3, ids_a[9]: 1})
+    memory_cache = MemoryCacheEviction(policy="ARC", maxsize=100, clean_size=1)
+
+    warmer = warm(storage, memory_cache, rows_per_model=3)
+
+    assert set(memory_cache.get_cache("a")) == {ids_a[7], ids_a[2], ids_a[9]}
+    assert memory_cache.get(ids_a[7], model="a") == storage.get_data_by_id(ids_a[7])
+    assert set(memory_cache.get_cache("b")) == set(ids_b)
+    progress = warmer.progress()
+    assert (progress["state"], progress["models_done"], progress["models_total"], progress["rows_loaded"]) == \
+           ("done", 2, 2, 6)
+
+def test_warm_up_by_recency(storage):
+    """Test that rows can be ranked by last modification instead of hit_count."""
+    ids = insert(storage, 5, "a")
+    with storage._conn() as conn:
+        conn.execute("update modelcache_llm_answer set gmt_modified = '2000-01-01 00:00:00'")
+        conn.execute("update modelcache_llm_answer set gmt_modified = '2030-01-01 00:00:00' where id=?", (ids[1],))
+    memory_cache = MemoryCacheEviction(policy="LRU", maxsize=100, clean_size=1)
+    warm(storage, memory_cache, rows_per_model=1, order_by="recency")
+    assert list(memory_cache.get_cache("a")) == [ids[1]]
+
+def test_warm_up_keeps_live_entries(storage):
+    """Test that warm-up neither replaces nor evicts entries added by traffic."""
+    ids = insert(storage, 5, "a")
+    memory_cache = MemoryCacheEviction(policy="ARC", maxsize=3, clean_size=1)
+    memory_cache.put([(ids[0], "live"), ("other", "live")], model="a")
+    warmer = warm(storage, memory_cache, rows_per_model=5)
+    cache = memory_cache.get_cache("a")
+    assert len(cache) == 3
+    assert cache.get(ids[0]) == "live" and cache.get("other") == "live"
+    assert warmer.progress()["rows_loaded"] == 1
+
+class BlockedStorage:
+    """Scalar storage whose model listing waits until released."""
+
+    ranks_rows = True
+
+    def __init__(self, storage):
+        self._storage = storage
+        self.release = threading.Event()
+
+    def get_models(self):
+        self.release.wait(timeout=5)
+        return self._storage.get_models()
+
+    def get_top_rows(self, model, limit, order_by="hit_count"):
+        return self._storage.get_top_rows(model, limit, order_by=order_by)
+
+def test_deleted_ids_are_not_warmed(storage):
+    """Test that ids and models discarded during the warm-up stay out of the cache."""
+    ids = insert(storage, 3, "a")
+    insert(storage, 3, "b")
+    memory_cache = MemoryCacheEviction(policy="ARC", maxsize=100, clean_size=1)
+    blocked = BlockedStorage(storage)
+    warmer = CacheWarmer(blocked, memory_cache, 10)
+    warmer.discard([ids[0]], "a")
+    warmer.discard_model("b")
+    blocked.release.set()
+    assert warmer.wait(timeout=5)
+    assert set(memory_cache.get_cache("a")) == {ids[1], ids[2]}
+    assert len(memory_cache.get_cache("b")) == 0
+    assert warmer.progress()["rows_loaded"] == 2
+
+def test_unknown_order_rejected(storage):
+    """Test that an unknown ranking raises a ParamError."""
+    with pytest.raises(ParamError):
+        CacheWarmer(storage, MemoryCacheEviction(policy="ARC", maxsize=10, clean_size=1), 10, order_by="random")
+
+class UnrankedStorage:
+    """Scalar storage keeping the CacheStorage defaults, which cannot rank rows."""
+
+    ranks_rows = False
+
+def test_storage_without_ranking_rejected():
+    """Test that a store that cannot rank rows is refused before the warm-up starts."""
+    memory_cache = MemoryCacheEviction(policy="ARC", maxsize=10, clean_size=1)
+    with pytest.raises(ParamError, match="cannot rank rows"):
+        CacheWarmer(UnrankedStorage(), memory_cache, rows_per_model=5)
+
+def test_arc_warm_fills_lru_end():
+    """Test that ARC.warm loads hottest first and evicts warm entries before live ones."""
+    cache = ARC(maxsize=3)
+    cache["live"] = 0
+    assert cache.warm([("hot", 1), ("warm", 2), ("cold", 3)]) == 2
+    assert "cold" not in cache
+    cache["new"] = 4
+    assert "warm" not in cache and "hot" in cache and "live" in cache
@@ -0,0 +1,97 @@
+import importlib
+import importlib.machinery
+import sys
+from unittest import mock
+import numpy as np
+import pytest
+from modelcache.manager.vector_data.base import VectorData
+
+# ----------- Helpers -----------
+
+class FakeCollection:
+    """In-memory stand-in for a chroma collection, logging the calls made to it."""
+
+    def __init__(self, log):
+        self.rows = dict()
+        self.log = log
+
+    def count(self):
+        self.log.append("count")
+        return len(self.rows)
+
+    def add(self, embeddings, ids):
+        self.log.append(("add", list(ids)))
+        self.rows.update(zip(ids, embeddings))
+
+    def query(self, query_embeddings, n_results, include):
+        self.log.append(("query", n_results))
+        ids = sorted(self.rows, key=lambda i: float(np.linalg.norm(self.rows[i] - query_embeddings[0])))
+        ids = ids[:n_results]
+        return {"ids": [ids], "distances": [[0.0] * len(ids)]}
+
+    def get(self, ids):
+        return {"ids": [i for i in ids if i in self.rows]}
+
+    def delete(self, ids):
+        self.log.append(("delete", list(ids)))
+        for i in ids:
+            self.rows.pop(i, None)
+
+def fake_module(name):
+    module = mock.MagicMock()
+    module.__spec__ = importlib.machinery.ModuleSpec(name, None)  # checked by the import_* helpers
+    return module
+
+# ----------- Fixtures -----------
+
+@pytest.fixture
+def chroma_module(monkeypatch):
+    """The chroma vector store module on a mocked chromadb; chromadb and torch need not be installed."""
+    monkeypatch.setitem(sys.modules, "chromadb", fake_module("chromadb"))
+    monkeypatch.setitem(sys.modules, "torch", fake_module("torch"))
+    monkeypatch.delitem(sys.modules, "modelcache.manager.vector_data.chroma", raising=False)
+    return importlib.import_module("modelcache.manager.vector_data.chroma")
+
+def make_store(chroma_module, **kwargs):
+    store = chroma_module.Chromadb(**kwargs)
+    log = []
+    collection = FakeCollection(log)
+    store._client.get_or_create_collection.return_value = collection
+    return store, collection, log
+
+def vectors(ids):
+    return [VectorData(id=i, data=np.full(4, i, dtype=np.float32)) for i in ids]
+
+# ----------- Tests -----------
+
+def test_buffer_is_flushed_before_search(chroma_module):
+    """Test that buffered vectors are added in one call once full, and before a search."""
+    store, collection, log = make_store(chroma_module, insert_buffer_size=3)
+    store.mul_add(vectors([1, 2]), model="m")
+    assert collection.rows == {}
+    store.mul_add(vectors([3]), model="m")
+    assert ("add", ["1", "2", "3"]) in log
+    store.mul_add(vectors([4]), model="m")
+    assert store.search(np.full(4, 4), top_k=1, model="m") == [(0.0, 4)]
+    assert log.index(("add", ["4"])) < log.index(("query", 1))
+
+def test_buffer_is_flushed_before_delete(chroma_module):
+    """Test that a delete sees the rows still in the buffer."""
+    store, collection, log = make_store(chroma_module, insert_buffer_size=10)
+    store.mul_add(vectors([1, 2]), model="m")
+    assert store.delete([2], model="m") == 1
+    assert set(collection.rows) == {"1"}
+    assert store._counts["m"] == 1
+
+def test_zero_count_hint_is_checked(chroma_module):
+    """Test that a zero count hint is corrected from the collection instead of reporting a miss."""
+    store, collection, log = make_store(chroma_module)
+    store.mul_add(vectors([1]), model="m")
+    collection.rows["2"] = np.full(4, 2, dtype=np.float32)  # written by another process
+    store._counts["m"] = 0
+    assert store.search(np.full(4, 2), top_k=5, model="m") == [(0.0, 2), (0.0, 1)]
+    assert store._counts["m"] == 2
+    assert ("query", 2) in log
+    collection.rows.clear()
+    store._counts["m"] = 0
+    assert store.search(np.zeros(4), model="m") == []
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from modelcache.manager.data_manager import SSDataManager
+from modelcache.manager.scalar_data.sql_storage_sqlite import SQLStorage
+from modelcache.manager.vector_data.faiss import Faiss
+
+# ----------- Helpers -----------
+
+class PartlyFailingStorage(SQLStorage):
+    """SQLite storage that reports the rows of failed_questions as failed inserts."""
+
+    failed_questions = ()
+
+    def batch_insert(self, all_data):
+        ids = super().batch_insert(all_data)
+        return [None if data[1] in self.failed_questions else _id for _id, data in zip(ids, all_data)]
+
+class CountingStorage(SQLStorage):
+    """SQLite storage recording the ids of every get_data_by_ids call."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_reads = []
+
+    def get_data_by_ids(self, keys):
+        self.batch_reads.append(list(keys))
+        return super().get_data_by_ids(keys)
+
+def make_manager(tmp_path, storage_cls=SQLStorage):
+    storage = storage_cls(db_type="sqlite", url=str(tmp_path / "cache.db"))
+    vectors = Faiss(str(tmp_path / "faiss.index"), dimension=4, top_k=1)
+    return SSDataManager(storage, vectors, None, max_size=100, clean_size=1, normalize=False, policy="ARC",
+                         exact_match_size=100)
+
+@pytest.fixture
+def embeddings():
+    return [np.full(4, i, dtype=np.float32) for i in range(3)]
+
+# ----------- Tests -----------
+
+def test_import_data_skips_failed_rows(tmp_path, embeddings):
+    """Test that rows the scalar store failed to insert get no vector and no exact match."""
+    PartlyFailingStorage.failed_questions = ("q1",)
+    manager = make_manager(tmp_path, PartlyFailingStorage)
+    manager.import_data(["q0", "q1", "q2"], ["a0", "a1", "a2"], embeddings, "m")
+    assert manager.v.count("m") == 2
+    _, found_id = manager.search(embeddings[2], model="m")[0]
+    assert manager.get_scalar_data((None, found_id), model="m")[1] == "q2"
+    assert manager.exact_match_id("q1", model="m") is None
+    assert manager.exact_match_id("q2", model="m") == found_id
+    manager.close()
+
+def test_get_scalar_data_batch(tmp_path, embeddings):
+    """Test that cached rows skip the store, the rest come in one call and absent ids are left out."""
+    manager = make_manager(tmp_path, CountingStorage)
+    # Written straight to the store, so only the row read below is in the memory cache
+    ids = manager.s.batch_insert([(f"a{i}", f"q{i}", e, "m") for i, e in enumerate(embeddings)])
+    manager.get_scalar_data((None, ids[0]), model="m")
+    manager.s.batch_reads.clear()
+
+    rows = manager.get_scalar_data_batch([ids[0], ids[1], ids[2], 999, ids[1]], model="m")
+    assert manager.s.batch_reads == [[ids[1], ids[2], 999]]
+    assert set(rows) == set(ids)
+    assert [rows[_id][0] for _id in ids] == ["q0", "q1", "q2"]
+    # The fetched rows are now cached as well
+    manager.s.batch_reads.clear()
+    assert set(manager.get_scalar_data_batch(ids, model="m")) == set(ids)
+    assert manager.s.batch_reads == []
+    manager.close()
@@ -0,0 +1,83 @@
+import asyncio
+import numpy as np
+import pytest
+from modelcache.embedding.embedding_cache import EmbeddingCache
+from modelcache.report import Report
+
+# ----------- Fixtures -----------
+
+class CountingEmbedding:
+    """Fake embedding function returning a resolved future per call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, data):
+        self.calls.append(data)
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(np.full(4, len(data), dtype=np.float32))
+        return future
+
+@pytest.fixture()
+def embedding():
+    return CountingEmbedding()
+
+# ----------- Tests -----------
+
+def test_repeated_text_is_embedded_once(embedding):
+    """Test that a repeated text is served from the cache."""
+    report = Report()
+    cache = EmbeddingCache(embedding, namespace="m", maxsize=8, report=report)
+
+    async def run():
+        first = await cache.embed("hello")
+        second = await cache.embed("hello")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert embedding.calls == ["hello"]
+    assert np.array_equal(first, second)
+    assert report.embedding_cache_hit_count == 1
+    assert report.embedding_cache_miss_count == 1
+
+def test_concurrent_identical_texts_share_one_job(embedding):
+    """Test that in-flight duplicates share the pending embedding."""
+    cache = EmbeddingCache(embedding, namespace="m", maxsize=8)
+
+    async def run():
+        return await asyncio.gather(cache.embed("a"), cache.embed("a"), cache.embed("b"))
+
+    asyncio.run(run())
+    assert embedding.calls == ["a", "b"]
+
+def test_non_string_input_bypasses_cache(embedding):
+    """Test that non-text inputs always go to the embedding function."""
+    cache = EmbeddingCache(embedding, namespace="m", maxsize=8)
+
+    async def run():
+        await cache.embed(["x"])
+        await cache.embed(["x"])
+
+    asyncio.run(run())
+    assert len(embedding.calls) == 2
+
+def test_file_store_survives_restart(embedding, tmp_path):
+    """Test that persisted embeddings are reused by a new cache instance."""
+    path = str(tmp_path / "embedding_cache.npy")
+
+    async def run(cache):
+        return await cache.embed("persist me")
+
+    cache = EmbeddingCache(embedding, namespace="m", maxsize=8, persist_path=path, dimension=4)
+    expected = asyncio.run(run(cache))
+    cache.flush()
+
+    restarted = EmbeddingCache(embedding, namespace="m", maxsize=8, persist_path=path, dimension=4)
+    assert np.array_equal(asyncio.run(run(restarted)), expected)
+    assert embedding.calls == ["persist me"]
+
+def test_namespace_separates_models(embedding):
+    """Test that different embedding models do not share entries."""
+    cache_a = EmbeddingCache(embedding, namespace="a", maxsize=8)
+    cache_b = EmbeddingCache(embedding, namespace="b", maxsize=8)
+    assert cache_a._key("text") != cache_b._key("text")
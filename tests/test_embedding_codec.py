@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from modelcache.manager.scalar_data.embedding_codec import (check_embedding_storage, decode_embedding, decode_embeddings,
+                                                            encode_embedding)
+from modelcache.utils.error import ParamError
+
+# ----------- Helpers -----------
+
+def make_embedding(dimension=768, seed=0):
+    return np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+
+# ----------- Tests -----------
+
+def test_float32_round_trip_is_exact():
+    """Test that float32 storage keeps the raw bytes."""
+    embedding = make_embedding()
+    data = encode_embedding(embedding, "float32")
+    assert len(data) == 4 * 768
+    np.testing.assert_array_equal(decode_embedding(data, "float32"), embedding)
+
+def test_float16_halves_row_size():
+    """Test that float16 storage uses 2 bytes per dimension and stays close to the input."""
+    embedding = make_embedding()
+    data = encode_embedding(embedding, "float16")
+    assert len(data) == 2 * 768
+    decoded = decode_embedding(data, "float16")
+    assert decoded.dtype == np.float32
+    np.testing.assert_allclose(decoded, embedding, atol=1e-2)
+
+def test_int8_uses_per_row_scale():
+    """Test that int8 storage uses 1 byte per dimension plus a float32 scale."""
+    embedding = make_embedding() * 10
+    data = encode_embedding(embedding, "int8")
+    assert len(data) == 4 + 768
+    decoded = decode_embedding(data, "int8")
+    max_abs = np.abs(embedding).max()
+    np.testing.assert_allclose(decoded, embedding, atol=max_abs / 127)
+
+def test_int8_zero_vector():
+    """Test that an all-zero embedding survives int8 quantization."""
+    decoded = decode_embedding(encode_embedding(np.zeros(8, dtype=np.float32), "int8"), "int8")
+    np.testing.assert_array_equal(decoded, np.zeros(8, dtype=np.float32))
+
+def test_none_stores_nothing():
+    """Test that the none mode writes an empty value and decodes to None."""
+    assert encode_embedding(make_embedding(), "none") == b""
+    assert decode_embedding(b"", "none") is None
+    assert decode_embedding(b"", "float32") is None
+
+def test_unknown_mode_rejected():
+    """Test that an unknown storage mode raises a ParamError."""
+    assert check_embedding_storage("int8") == "int8"
+    with pytest.raises(ParamError):
+        check_embedding_storage("bfloat16")
+
+@pytest.mark.parametrize("mode", ["float32", "float16", "int8"])
+def test_block_decode_matches_row_decode(mode):
+    """Test that decoding a block of rows gives the same matrix as decoding each row."""
+    datas = [encode_embedding(make_embedding(16, seed), mode) for seed in range(5)]
+    block = decode_embeddings(datas, mode)
+    assert block.shape == (5, 16) and block.dtype == np.float32
+    np.testing.assert_array_equal(block, np.stack([decode_embedding(d, mode) for d in datas]))
@@ -0,0 +1,84 @@
+import queue
+import threading
+import time
+import numpy as np
+import pytest
+
+pytest.importorskip("psutil")  # the dispatcher raises its worker priority
+
+from modelcache.embedding.embedding_dispatcher import EmbeddingDispatcher, _embed_batch, _next_batch
+from modelcache.embedding.shm_ring import SharedMemoryRing
+
+# ----------- Helpers -----------
+
+class FakeEmbedding:
+    """Fails the batched call, and single calls on "bad" inputs."""
+
+    def __init__(self):
+        self.batch_calls = 0
+
+    def to_embeddings(self, data):
+        if data == "bad":
+            raise ValueError("bad input")
+        return np.full(2, len(data), dtype=np.float32)
+
+    def to_embeddings_batch(self, data_list):
+        self.batch_calls += 1
+        if "bad" in data_list:
+            raise ValueError("bad input in batch")
+        return [self.to_embeddings(data) for data in data_list]
+
+def filled_queue(n):
+    task_queue = queue.Queue()
+    for i in range(n):
+        task_queue.put(i)
+    return task_queue
+
+def collector_only_dispatcher(ring):
+    """A dispatcher running just its result collector, no worker processes."""
+    dispatcher = EmbeddingDispatcher.__new__(EmbeddingDispatcher)
+    dispatcher.result_queue = queue.Queue()
+    dispatcher.futures = dict()
+    dispatcher.slots = dict()
+    dispatcher.report = None
+    dispatcher.ring = ring
+    dispatcher.event_loop = None
+    dispatcher._start_result_collector_thread()
+    return dispatcher
+
+# ----------- Tests -----------
+
+def test_next_batch_stops_at_max_batch_size():
+    """Test that at most max_batch_size jobs are drained, in queue order."""
+    task_queue = filled_queue(5)
+    assert _next_batch(task_queue, 3, 0.0) == [0, 1, 2]
+    assert _next_batch(task_queue, 3, 0.0) == [3, 4]
+
+def test_next_batch_waits_at_most_max_wait():
+    """Test that a partial batch is returned once max_wait has elapsed."""
+    task_queue = filled_queue(1)
+    threading.Timer(0.01, task_queue.put, args=(1,)).start()
+    start = time.monotonic()
+    assert _next_batch(task_queue, 10, 0.2) == [0, 1]
+    assert time.monotonic() - start < 5
+
+def test_embed_batch_falls_back_per_item():
+    """Test that a failed batch is retried one by one, only the bad input failing."""
+    embedding = FakeEmbedding()
+    results = _embed_batch(embedding, ["ab", "bad", "abc"])
+    assert embedding.batch_calls == 1
+    assert results[0].tolist() == [2, 2] and results[2].tolist() == [3, 3]
+    assert isinstance(results[1], ValueError)
+
+def test_embed_batch_single_item_error():
+    """Test that a single failing job returns its exception instead of raising."""
+    results = _embed_batch(FakeEmbedding(), ["bad"])
+    assert len(results) == 1 and isinstance(results[0], ValueError)
+
+def test_close_stops_collector_before_releasing_ring():
+    """Test that close joins the result collector, then releases the ring."""
+    dispatcher = collector_only_dispatcher(SharedMemoryRing(num_slots=2, dimension=2))
+    dispatcher.close()
+    assert not dispatcher._collector.is_alive()
+    assert dispatcher.ring is None
+    dispatcher.close()  # the atexit call after an explicit close is a no-op
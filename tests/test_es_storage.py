@@ -0,0 +1,40 @@
+import configparser
+import importlib
+import sys
+from unittest import mock
+import pytest
+
+# ----------- Fixtures -----------
+
+@pytest.fixture
+def storage(monkeypatch):
+    """ES storage on a mocked client; elasticsearch and snowflake need not be installed."""
+    monkeypatch.setitem(sys.modules, "elasticsearch", mock.MagicMock())
+    monkeypatch.setitem(sys.modules, "snowflake", mock.MagicMock())
+    monkeypatch.delitem(sys.modules, "modelcache.manager.scalar_data.sql_storage_es", raising=False)
+    sql_storage_es = importlib.import_module("modelcache.manager.scalar_data.sql_storage_es")
+    config = configparser.ConfigParser()
+    config.read_dict({"elasticsearch": {"host": "localhost", "port": "9200"}})
+    return sql_storage_es.SQLStorage(config=config)
+
+# ----------- Tests -----------
+
+def test_get_data_by_ids_uses_one_mget(storage):
+    """Test that several ids are fetched in one mget and mapped back to the keys passed in."""
+    storage.client.mget.return_value = {"docs": [
+        {"_id": "7", "found": True, "_source": {"question": "q7", "answer": "a7", "model": "m"}},
+        {"_id": "8", "found": False},
+        {"_id": "9", "found": True, "_source": {"question": "q9", "answer": "a9", "model": "m"}},
+    ]}
+    rows = storage.get_data_by_ids([7, 8, 9])
+    assert rows == {7: ["q7", "a7", None, "m"], 9: ["q9", "a9", None, "m"]}
+    storage.client.mget.assert_called_once()
+    assert storage.client.mget.call_args.kwargs["body"] == {"ids": ["7", "8", "9"]}
+    assert storage.client.mget.call_args.kwargs["index"] == storage.ans_index
+
+def test_get_data_by_ids_empty_and_failing(storage):
+    """Test that no ids skip the request and a failing mget returns no rows."""
+    assert storage.get_data_by_ids([]) == {}
+    storage.client.mget.assert_not_called()
+    storage.client.mget.side_effect = ConnectionError("unavailable")
+    assert storage.get_data_by_ids([1]) == {}
@@ -0,0 +1,77 @@
+import pytest
+from modelcache.manager.exact_match import ExactMatchIndex
+
+# ----------- Fixtures -----------
+
+@pytest.fixture()
+def index():
+    # Create a small exact-match index
+    return ExactMatchIndex(maxsize=3)
+
+# ----------- Tests -----------
+
+def test_put_and_get(index):
+    """Test that an inserted question resolves to its primary id."""
+    index.put("user: hello", 1, "m")
+    assert index.get("user: hello", "m") == 1
+
+def test_get_is_exact(index):
+    """Test that only byte-identical questions match."""
+    index.put("user: hello", 1, "m")
+    assert index.get("user: hello ", "m") is None
+    assert index.get("user: Hello", "m") is None
+
+def test_models_are_isolated(index):
+    """Test that the same question in another model does not match."""
+    index.put("user: hello", 1, "m1")
+    assert index.get("user: hello", "m2") is None
+
+def test_put_overwrites_id(index):
+    """Test that re-inserting a question points it to the new id."""
+    index.put("q", 1, "m")
+    index.put("q", 2, "m")
+    assert index.get("q", "m") == 2
+    index.delete([1], "m")
+    assert index.get("q", "m") == 2
+
+def test_lru_eviction(index):
+    """Test that the least recently used question is evicted first."""
+    index.put("a", 1, "m")
+    index.put("b", 2, "m")
+    index.put("c", 3, "m")
+    index.get("a", "m")
+    index.put("d", 4, "m")
+    assert index.get("b", "m") is None
+    assert index.get("a", "m") == 1
+    assert len(index) == 3
+
+def test_delete_by_id_drops_all_questions(index):
+    """Test that deleting an id drops every question mapped to it."""
+    index.put("a", 1, "m")
+    index.put("b", 1, "m")
+    index.put("c", 2, "m")
+    index.delete([1], "m")
+    assert index.get("a", "m") is None
+    assert index.get("b", "m") is None
+    assert index.get("c", "m") == 2
+
+def test_clear_model(index):
+    """Test that clearing a model leaves other models intact."""
+    index.put("a", 1, "m1")
+    index.put("a", 1, "m2")
+    index.clear("m1")
+    assert index.get("a", "m1") is None
+    assert index.get("a", "m2") == 1
+
+def test_discard(index):
+    """Test that discard removes a single question."""
+    index.put("a", 1, "m")
+    index.discard("a", "m")
+    assert index.get("a", "m") is None
+    index.delete([1], "m")
+
+def test_disabled_when_maxsize_zero():
+    """Test that a zero-sized index never stores anything."""
+    index = ExactMatchIndex(maxsize=0)
+    index.put("a", 1, "m")
+    assert index.get("a", "m") is None
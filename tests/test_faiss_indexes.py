@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+from modelcache.manager.vector_data.base import VectorData
+from modelcache.manager.vector_data.faiss import Faiss
+from modelcache.utils.error import CacheError
+
+# ----------- Fixtures -----------
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).random((300, 8), dtype=np.float32)
+
+def add(store, vectors, model, offset=0):
+    store.mul_add([VectorData(id=offset + i, data=v) for i, v in enumerate(vectors)], model=model)
+
+# ----------- Tests -----------
+
+def test_models_are_isolated(tmp_path, vectors):
+    """Test that each model searches and counts only its own vectors."""
+    store = Faiss(str(tmp_path / "faiss.index"), dimension=8, top_k=1)
+    add(store, vectors[:10], "a")
+    add(store, vectors[:5], "b", offset=100)
+    assert store.search(vectors[3], model="a")[0][1] == 3
+    assert store.search(vectors[3], model="b")[0][1] == 103
+    assert (store.count("a"), store.count("b"), store.count()) == (10, 5, 15)
+
+def test_rebuild_col_only_drops_one_model(tmp_path, vectors):
+    """Test that rebuilding one model leaves the others alone."""
+    store = Faiss(str(tmp_path / "faiss.index"), dimension=8, top_k=1)
+    add(store, vectors[:10], "a")
+    add(store, vectors[:5], "b", offset=100)
+    store.flush()
+    assert store.rebuild_col("a") is None
+    assert store.count("a") == 0
+    assert store.count("b") == 5
+    assert not (tmp_path / "faiss_a.index").exists()
+
+def test_indexes_persist_per_model(tmp_path, vectors):
+    """Test that flushed per-model indexes are reloaded lazily."""
+    path = str(tmp_path / "faiss.index")
+    store = Faiss(path, dimension=8, top_k=1)
+    add(store, vectors[:10], "a")
+    store.flush()
+    assert (tmp_path / "faiss_a.index").exists()
+    reloaded = Faiss(path, dimension=8, top_k=1)
+    assert reloaded.count() == 10
+    assert reloaded.search(vectors[7], model="a")[0][1] == 7
+
+def test_ivf_trains_after_train_size(tmp_path, vectors):
+    """Test that an IVF index is searchable before and after training."""
+    store = Faiss(str(tmp_path / "faiss.index"), dimension=8, top_k=1,
+                  index_factory="IVF4,Flat", train_size=200, search_params="nprobe=4")
+    add(store, vectors[:100], "a")
+    assert "a" in store._pending
+    assert store.search(vectors[42], model="a")[0][1] == 42
+    add(store, vectors[100:], "a", offset=100)
+    assert "a" not in store._pending
+    assert store.count("a") == 300
+    assert store.search(vectors[250], model="a")[0][1] == 250
+
+def test_hnsw_delete_hides_ids(tmp_path, vectors):
+    """Test that deleted ids disappear from HNSW results."""
+    store = Faiss(str(tmp_path / "faiss.index"), dimension=8, top_k=1, index_factory="HNSW32")
+    add(store, vectors[:50], "a")
+    store.delete([3], model="a")
+    assert store.search(vectors[3], model="a")[0][1] != 3
+    distances, ids = store.search_batch(vectors[:4], model="a")
+    assert 3 not in ids
+    assert store.count("a") == 49
+
+def test_hnsw_tombstones_survive_reload(tmp_path, vectors):
+    """Test that ids deleted from an HNSW index stay hidden after a restart."""
+    path = str(tmp_path / "faiss.index")
+    store = Faiss(path, dimension=8, top_k=1, index_factory="HNSW32")
+    add(store, vectors[:50], "a")
+    store.delete([3], model="a")
+    store.flush()
+    reloaded = Faiss(path, dimension=8, top_k=1, index_factory="HNSW32")
+    assert reloaded.search(vectors[3], model="a")[0][1] != 3
+    assert reloaded.count("a") == 49
+
+def test_legacy_shared_index_fails_loudly(tmp_path, vectors):
+    """Test that a shared index from an older version is not silently ignored."""
+    path = tmp_path / "faiss.index"
+    path.write_bytes(b"legacy")
+    with pytest.raises(CacheError, match="rebuild_vectors"):
+        Faiss(str(path), dimension=8, top_k=1)
+
+def test_string_ids_are_mapped(tmp_path, vectors):
+    """Test that uuid style ids work through int64 surrogates and survive a reload."""
+    path = str(tmp_path / "faiss.index")
+    store = Faiss(path, dimension=8, top_k=2)
+    ids = [f"uuid-{i}" for i in range(10)]
+    store.mul_add([VectorData(id=_id, data=v) for _id, v in zip(ids, vectors)], model="a")
+    assert store.search(vectors[4], model="a")[0][1] == "uuid-4"
+    distances, result_ids = store.search_batch(vectors[:3], model="a")
+    assert result_ids[:, 0].tolist() == ["uuid-0", "uuid-1", "uuid-2"]
+
+    assert store.delete(["uuid-4"], model="a") == 1
+    assert store.search(vectors[4], model="a")[0][1] != "uuid-4"
+    store.flush()
+    assert (tmp_path / "faiss_a.index.ids.npy").exists()
+
+    reloaded = Faiss(path, dimension=8, top_k=1)
+    assert reloaded.search(vectors[7], model="a")[0][1] == "uuid-7"
+    assert reloaded.count("a") == 9
+
+def test_mmap_load_and_copy_on_write(tmp_path, vectors):
+    """Test that mmap-loaded indexes serve reads and become writable on first write."""
+    path = str(tmp_path / "faiss.index")
+    store = Faiss(path, dimension=8, top_k=1)
+    add(store, vectors[:10], "a")
+    store.flush()
+
+    mapped = Faiss(path, dimension=8, top_k=1, mmap=True, preload=True)
+    assert "a" in mapped.load_seconds
+    assert mapped.search(vectors[2], model="a")[0][1] == 2
+    add(mapped, vectors[10:12], "a", offset=10)
+    assert mapped.count("a") == 12
+    mapped.flush()
+    assert Faiss(path, dimension=8, top_k=1).count("a") == 12
+
+def test_flush_only_rewrites_changed_models(tmp_path, vectors):
+    """Test that flush skips unchanged models and leaves no temp files."""
+    store = Faiss(str(tmp_path / "faiss.index"), dimension=8, top_k=1)
+    add(store, vectors[:10], "a")
+    add(store, vectors[:10], "b")
+    store.flush()
+    mtime = (tmp_path / "faiss_b.index").stat().st_mtime_ns
+    add(store, vectors[10:12], "a", offset=10)
+    store.flush()
+    assert (tmp_path / "faiss_b.index").stat().st_mtime_ns == mtime
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_hnsw_search_with_many_tombstones(tmp_path, vectors):
+    """Test that deleting most of an HNSW index still returns top_k live ids."""
+    store = Faiss(str(tmp_path / "faiss.index"), dimension=8, top_k=3, index_factory="HNSW32",
+                  search_params="efSearch=64")
+    add(store, vectors[:200], "a")
+    store.delete(list(range(190)), model="a")
+    live = set(range(190, 200))
+    assert {i for _, i in store.search(vectors[0], model="a")} <= live
+    assert len(store.search(vectors[0], model="a")) == 3
+    distances, ids = store.search_batch(vectors[:5], model="a")
+    assert ids.shape == (5, 3)
+    assert set(ids.ravel().tolist()) <= live
+    store.delete([190], model="a")
+    assert 190 not in {i for _, i in store.search(vectors[190], model="a")}
+
+def test_model_name_cannot_escape_index_directory(tmp_path, vectors):
+    """Test that a model name with path separators stays in the index directory and reloads."""
+    index_dir = tmp_path / "indexes"
+    index_dir.mkdir()
+    path = str(index_dir / "faiss.index")
+    store = Faiss(path, dimension=8, top_k=1)
+    add(store, vectors[:5], "../evil/a")
+    store.flush()
+    assert [p.parent for p in tmp_path.rglob("*.index")] == [index_dir]
+    reloaded = Faiss(path, dimension=8, top_k=1, preload=True)
+    assert "../evil/a" in reloaded.load_seconds
+    assert reloaded.search(vectors[2], model="../evil/a")[0][1] == 2
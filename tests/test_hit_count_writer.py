@@ -0,0 +1,138 @@
+import time
+import threading
+from modelcache.manager.hit_count_writer import HitCountWriter
+
+# ----------- Helpers -----------
+
+class RecordingStorage:
+    """Collects the bulk writes issued by the writer."""
+
+    def __init__(self, fail_times=0):
+        self.writes = []
+        self.fail_times = fail_times
+        self.written = threading.Event()
+
+    def update_hit_counts(self, counts):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError("database unavailable")
+        self.writes.append(dict(counts))
+        self.written.set()
+
+# ----------- Tests -----------
+
+def test_increments_are_coalesced_per_id():
+    """Test that repeated hits on one id become a single increment."""
+    storage = RecordingStorage()
+    writer = HitCountWriter(storage.update_hit_counts, flush_interval_ms=60000)
+    for _ in range(5):
+        writer.add("a")
+    writer.add("b")
+    assert writer.backlog == 6
+    writer.flush()
+    assert storage.writes == [{"a": 5, "b": 1}]
+    assert writer.backlog == 0
+    writer.close()
+
+def test_flush_when_size_reached():
+    """Test that reaching flush_size wakes the background writer."""
+    storage = RecordingStorage()
+    writer = HitCountWriter(storage.update_hit_counts, flush_interval_ms=60000, flush_size=2)
+    writer.add(1)
+    writer.add(2)
+    assert storage.written.wait(timeout=5)
+    assert storage.writes[0] == {1: 1, 2: 1}
+    writer.close()
+
+def test_flush_on_interval():
+    """Test that pending increments are written after the interval."""
+    storage = RecordingStorage()
+    writer = HitCountWriter(storage.update_hit_counts, flush_interval_ms=20)
+    writer.add(1)
+    assert storage.written.wait(timeout=5)
+    writer.close()
+
+def test_close_flushes_pending():
+    """Test that close writes whatever is still pending."""
+    storage = RecordingStorage()
+    writer = HitCountWriter(storage.update_hit_counts, flush_interval_ms=60000)
+    writer.add("x")
+    writer.close()
+    assert storage.writes == [{"x": 1}]
+
+def test_failed_write_is_retried():
+    """Test that increments survive a failed flush."""
+    storage = RecordingStorage(fail_times=1)
+    writer = HitCountWriter(storage.update_hit_counts, flush_interval_ms=60000)
+    writer.add("x")
+    writer.flush()
+    assert writer.backlog == 1
+    writer.add("x")
+    writer.flush()
+    assert storage.writes == [{"x": 2}]
+    assert writer.backlog == 0
+    writer.close()
+
+def test_backoff_after_failure():
+    """Test that a failing store is retried after a growing delay, not in a tight loop."""
+    storage = RecordingStorage(fail_times=1000)
+    calls = []
+
+    def failing_write(counts):
+        calls.append(dict(counts))
+        storage.update_hit_counts(counts)
+
+    writer = HitCountWriter(failing_write, flush_interval_ms=20, flush_size=1)
+    writer.add("x")
+    time.sleep(0.3)
+    # 20ms interval doubling from 40ms: a handful of attempts, not thousands
+    assert 1 <= len(calls) <= 5
+    assert writer.backlog == 1
+    writer.close()
+
+def test_pending_ids_are_capped():
+    """Test that increments for ids beyond max_pending are dropped and counted."""
+    storage = RecordingStorage()
+    writer = HitCountWriter(storage.update_hit_counts, flush_interval_ms=60000, max_pending=2)
+    writer.add("a")
+    writer.add("b")
+    writer.add("a")
+    writer.add("c", count=3)
+    assert writer.dropped_count == 3
+    assert writer.backlog == 3
+    writer.flush()
+    assert storage.writes == [{"a": 2, "b": 1}]
+    writer.close()
+
+def test_partial_failure_retries_only_returned_ids():
+    """Test that only the increments handed back by the store are kept for retry."""
+    writes = []
+
+    def partial_write(counts):
+        writes.append(dict(counts))
+        return {"b": counts["b"]} if len(writes) == 1 else None
+
+    writer = HitCountWriter(partial_write, flush_interval_ms=60000)
+    writer.add("a")
+    writer.add("b", count=2)
+    writer.flush()
+    assert writer.backlog == 2
+    writer.flush()
+    assert writes == [{"a": 1, "b": 2}, {"b": 2}]
+    assert writer.backlog == 0
+    writer.close()
+
+def test_discard_drops_deleted_ids_and_models():
+    """Test that deleted ids and truncated models lose their pending increments."""
+    storage = RecordingStorage()
+    writer = HitCountWriter(storage.update_hit_counts, flush_interval_ms=60000)
+    writer.add(1, model="a")
+    writer.add(2, model="a")
+    writer.add(3, model="b")
+    writer.add(4, model="b")
+    writer.discard([1])
+    writer.discard_model("b")
+    assert writer.backlog == 1
+    writer.flush()
+    assert storage.writes == [{2: 1}]
+    writer.close()
@@ -0,0 +1,115 @@
+import threading
+import numpy as np
+from modelcache.manager.vector_data.insert_buffer import InsertBuffer
+
+# ----------- Helpers -----------
+
+class RecordingCollection:
+    """Collects the batched inserts issued by the buffer."""
+
+    def __init__(self):
+        self.inserts = []
+        self.inserted = threading.Event()
+
+    def insert(self, key, ids, vectors):
+        self.inserts.append((key, list(ids), vectors.shape))
+        self.inserted.set()
+
+def rows(n, start=0):
+    return list(range(start, start + n)), np.ones((n, 4), dtype=np.float32)
+
+# ----------- Tests -----------
+
+def test_rows_are_inserted_in_one_batch():
+    """Test that reaching max_rows writes the buffered rows in one call."""
+    collection = RecordingCollection()
+    buffer = InsertBuffer(collection.insert, max_rows=5, max_latency_ms=60000)
+    buffer.add("a", *rows(2))
+    buffer.add("a", *rows(3, start=2))
+    assert collection.inserts == [("a", [0, 1, 2, 3, 4], (5, 4))]
+    assert buffer.pending() == 0
+    buffer.close()
+
+def test_rows_are_inserted_after_max_latency():
+    """Test that a partial buffer is written once its oldest row is old enough."""
+    collection = RecordingCollection()
+    buffer = InsertBuffer(collection.insert, max_rows=100, max_latency_ms=20)
+    buffer.add("a", *rows(1))
+    assert collection.inserted.wait(timeout=5)
+    buffer.close()
+
+def test_flush_per_key():
+    """Test that flushing one key leaves the other keys buffered."""
+    collection = RecordingCollection()
+    buffer = InsertBuffer(collection.insert, max_rows=100, max_latency_ms=60000)
+    buffer.add("a", *rows(1))
+    buffer.add("b", *rows(2))
+    buffer.flush("a")
+    assert [key for key, _, _ in collection.inserts] == ["a"]
+    assert buffer.pending("b") == 2
+    buffer.discard("b")
+    buffer.close()
+    assert [key for key, _, _ in collection.inserts] == ["a"]
+
+def test_failed_insert_is_retried():
+    """Test that a failed write is put back and retried after its backoff."""
+    collection = RecordingCollection()
+    failures = [RuntimeError("unavailable")]
+
+    def insert(key, ids, vectors):
+        if failures:
+            raise failures.pop()
+        collection.insert(key, ids, vectors)
+
+    buffer = InsertBuffer(insert, max_rows=100, max_latency_ms=10)
+    buffer.add("a", *rows(2))
+    assert collection.inserted.wait(timeout=5)
+    assert collection.inserts == [("a", [0, 1], (2, 4))]
+    assert buffer.failed_writes == 1
+    assert buffer.lost_rows == 0
+    buffer.close()
+
+def test_rows_are_dropped_after_max_retries():
+    """Test that rows are counted as lost once max_retries is used up."""
+    def insert(key, ids, vectors):
+        raise RuntimeError("unavailable")
+
+    buffer = InsertBuffer(insert, max_rows=100, max_latency_ms=60000, max_retries=1)
+    buffer.add("a", *rows(3))
+    buffer.flush("a")
+    assert buffer.pending("a") == 3
+    buffer.flush("a")
+    assert buffer.pending("a") == 0
+    assert buffer.failed_writes == 2
+    assert buffer.lost_rows == 3
+    buffer.close()
+
+def test_slow_write_does_not_block_other_keys():
+    """Test that flushing one key does not wait for another key's write in flight."""
+    collection = RecordingCollection()
+    started, release = threading.Event(), threading.Event()
+
+    def insert(key, ids, vectors):
+        if key == "slow":
+            started.set()
+            release.wait(timeout=5)
+        collection.insert(key, ids, vectors)
+
+    buffer = InsertBuffer(insert, max_rows=100, max_latency_ms=60000)
+    buffer.add("slow", *rows(1))
+    buffer.add("fast", *rows(1))
+    writer = threading.Thread(target=buffer.flush, args=("slow",))
+    writer.start()
+    assert started.wait(timeout=5)
+    buffer.flush("fast")
+    assert [key for key, _, _ in collection.inserts] == ["fast"]
+    # A flush of the key being written waits until its rows are stored
+    waiter = threading.Thread(target=buffer.flush, args=("slow",))
+    waiter.start()
+    waiter.join(timeout=0.05)
+    assert waiter.is_alive()
+    release.set()
+    waiter.join(timeout=5)
+    writer.join(timeout=5)
+    assert [key for key, _, _ in collection.inserts] == ["fast", "slow"]
+    buffer.close()
@@ -0,0 +1,84 @@
+import threading
+import time
+import pytest
+from modelcache.manager.query_log_writer import QueryLogWriter
+from modelcache.utils.error import ParamError
+
+# ----------- Helpers -----------
+
+class RecordingStorage:
+    """Collects the batches issued by the writer."""
+
+    def __init__(self):
+        self.batches = []
+        self.written = threading.Event()
+
+    def insert_query_resps(self, records):
+        self.batches.append(list(records))
+        self.written.set()
+
+def ok(n=0):
+    return {"errorCode": 0, "errorDesc": "", "cacheHit": True, "answer": str(n)}
+
+# ----------- Tests -----------
+
+def test_records_are_written_in_batches():
+    """Test that flush writes queued records in batch_size chunks."""
+    storage = RecordingStorage()
+    writer = QueryLogWriter(storage.insert_query_resps, flush_interval_ms=60000, batch_size=2)
+    writer.close()  # stop the background thread so flush is deterministic
+    for i in range(5):
+        writer.put(ok(i), model="m", query="q", delta_time=0)
+    assert writer.backlog == 5
+    writer.flush()
+    assert [len(batch) for batch in storage.batches] == [2, 2, 1]
+    assert storage.batches[0][0] == (ok(0), {"model": "m", "query": "q", "delta_time": 0})
+    assert writer.backlog == 0
+
+def test_background_writer_drains_queue():
+    """Test that the background thread writes records after the interval."""
+    storage = RecordingStorage()
+    writer = QueryLogWriter(storage.insert_query_resps, flush_interval_ms=20)
+    writer.put(ok(), model="m")
+    assert storage.written.wait(timeout=5)
+    writer.close()
+
+def test_drop_policy_counts_dropped_records():
+    """Test that a full queue drops records under the drop policy."""
+    storage = RecordingStorage()
+    writer = QueryLogWriter(storage.insert_query_resps, max_queue_size=2, flush_interval_ms=60000)
+    writer.close()
+    for i in range(4):
+        writer.put(ok(i))
+    assert writer.backlog == 2
+    assert writer.dropped_count == 2
+
+def test_block_policy_drops_after_timeout():
+    """Test that the block policy waits at most block_timeout_ms, then drops."""
+    storage = RecordingStorage()
+    writer = QueryLogWriter(storage.insert_query_resps, max_queue_size=1, flush_interval_ms=60000,
+                            full_policy="block", block_timeout_ms=50)
+    writer.close()
+    assert writer.blocks
+    writer.put(ok(0))
+    start = time.time()
+    writer.put(ok(1))
+    assert 0.04 <= time.time() - start < 5
+    assert writer.backlog == 1
+    assert writer.dropped_count == 1
+
+def test_sampling_keeps_errors():
+    """Test that sampling skips successful records but never errors."""
+    storage = RecordingStorage()
+    writer = QueryLogWriter(storage.insert_query_resps, flush_interval_ms=60000, sample_rate=0.0)
+    writer.close()
+    writer.put(ok())
+    writer.put({"errorCode": 102, "errorDesc": "failed", "cacheHit": False})
+    assert writer.sampled_out_count == 1
+    writer.flush()
+    assert [record[0]["errorCode"] for record in storage.batches[0]] == [102]
+
+def test_unknown_full_policy():
+    """Test that an unknown full policy is rejected."""
+    with pytest.raises(ParamError):
+        QueryLogWriter(lambda records: None, full_policy="spill")
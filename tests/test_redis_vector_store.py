@@ -0,0 +1,94 @@
+import importlib
+import importlib.machinery
+import sys
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+import pytest
+from modelcache.manager.vector_data.base import VectorData
+
+# ----------- Helpers -----------
+
+class FakeQuery:
+    """Records the query string and the chained builder calls."""
+
+    def __init__(self, base_query):
+        self.base_query = base_query
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args):
+            self.calls.append((name, args))
+            return self
+        return call
+
+# ----------- Fixtures -----------
+
+@pytest.fixture
+def redis_module(monkeypatch):
+    """The redis vector store module on a mocked redis package; redis need not be installed."""
+    redis = mock.MagicMock()
+    redis.__spec__ = importlib.machinery.ModuleSpec("redis", None)  # checked by import_redis
+    redis.commands.search.query.Query = FakeQuery
+    redis.exceptions.ResponseError = type("ResponseError", (Exception,), {})
+    for name in ("redis", "redis.commands", "redis.commands.search", "redis.commands.search.indexDefinition",
+                 "redis.commands.search.query", "redis.commands.search.field", "redis.client",
+                 "redis.connection", "redis.exceptions"):
+        module = redis
+        for part in name.split(".")[1:]:
+            module = getattr(module, part)
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.delitem(sys.modules, "modelcache.manager.vector_data.redis", raising=False)
+    return importlib.import_module("modelcache.manager.vector_data.redis")
+
+def make_store(redis_module, **kwargs):
+    store = redis_module.RedisVectorStore(dimension=4, **kwargs)
+    client = store._client
+    client.ft.return_value.search.return_value.docs = [
+        SimpleNamespace(distance="0.5", data_id="7"), SimpleNamespace(distance="0.25", data_id="9")]
+    return store, client
+
+def vectors(n):
+    return [VectorData(id=i, data=np.full(4, i, dtype=np.float32)) for i in range(n)]
+
+# ----------- Tests -----------
+
+def test_inserts_are_pipelined_in_chunks(redis_module):
+    """Test that mul_add sends one pipeline execute per insert_batch_size rows."""
+    store, client = make_store(redis_module, insert_batch_size=2)
+    store.mul_add(vectors(5), model="m")
+    pipe = client.pipeline.return_value
+    client.pipeline.assert_called_once_with(transaction=False)
+    assert pipe.hset.call_count == 5
+    assert pipe.execute.call_count == 3  # after rows 2 and 4, then the rest
+    assert pipe.hset.call_args.kwargs["mapping"]["data_id"] == 4
+
+def test_knn_search_uses_top_k(redis_module):
+    """Test that the KNN query asks for top_k results, from the call or the per-model params."""
+    store, client = make_store(redis_module, top_k=1, model_params={"big": {"top_k": 5, "EF_RUNTIME": 50}})
+    assert store.search(np.zeros(4), top_k=3, model="m") == [(0.5, 7), (0.25, 9)]
+    query, = client.ft.return_value.search.call_args.args
+    assert query.base_query.startswith("*=>[KNN 3 @data_vector")
+    assert ("paging", (0, 3)) in query.calls
+
+    store.search(np.zeros(4), model="big")
+    query = client.ft.return_value.search.call_args.args[0]
+    assert query.base_query.startswith("*=>[KNN 5 ")
+    assert client.ft.return_value.search.call_args.kwargs["query_params"]["ef_runtime"] == 50
+
+def test_prepared_query_is_cached_per_model_and_top_k(redis_module):
+    """Test that searches reuse the prepared query per (model, top_k) and rebuild_col drops it."""
+    store, client = make_store(redis_module)
+    store.search(np.zeros(4), top_k=2, model="a")
+    first = client.ft.return_value.search.call_args.args[0]
+    store.search(np.ones(4), top_k=2, model="a")
+    assert client.ft.return_value.search.call_args.args[0] is first
+    store.search(np.zeros(4), top_k=3, model="a")
+    store.search(np.zeros(4), top_k=2, model="b")
+    assert set(store._searchers) == {("a", 2), ("a", 3), ("b", 2)}
+
+    store.rebuild_col("a")
+    client.ft.return_value.dropindex.assert_called_once_with(delete_documents=True)
+    assert set(store._searchers) == {("b", 2)}
+    store.search(np.zeros(4), top_k=2, model="a")
+    assert client.ft.return_value.search.call_args.args[0] is not first
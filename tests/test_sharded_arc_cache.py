@@ -0,0 +1,126 @@
+import threading
+import pytest
+from modelcache.manager.eviction.arc_cache import ARC
+from modelcache.manager.eviction.memory_cache import MemoryCacheEviction
+from modelcache.manager.eviction.sharded_arc_cache import ShardedARC
+
+# ----------- Fixtures -----------
+
+@pytest.fixture()
+def sharded():
+    return ShardedARC(maxsize=64, shards=4)
+
+# ----------- Sharded ARC Tests -----------
+
+def test_set_get_pop(sharded):
+    """Test the basic mapping operations across shards."""
+    for i in range(20):
+        sharded[i] = i * 10
+    assert len(sharded) == 20
+    assert sharded[7] == 70 and 7 in sharded
+    assert sharded.get(99, "missing") == "missing"
+    assert sharded.pop(7) == 70
+    assert sharded.pop(7, None) is None
+    assert sorted(sharded) == [i for i in range(20) if i != 7]
+    sharded.clear()
+    assert len(sharded) == 0
+
+def test_keys_spread_over_independent_shards(sharded):
+    """Test that each shard holds its own keys and its own slice of maxsize."""
+    for i in range(40):
+        sharded[i] = i
+    assert all(shard.maxsize == 16 for shard in sharded.shards)
+    assert sum(len(shard) for shard in sharded.shards) == 40
+    assert all(len(shard) > 0 for shard in sharded.shards)
+
+def test_shard_sizes_add_up_to_maxsize():
+    """Test that maxsize is split exactly, the remainder going to the first shards."""
+    sharded = ShardedARC(maxsize=10, shards=4)
+    assert [shard.maxsize for shard in sharded.shards] == [3, 3, 2, 2]
+    for i in range(1000):
+        sharded[i] = i
+    assert len(sharded) <= 10
+
+def test_capacity_is_bounded_per_shard(sharded):
+    """Test that the cache never holds more than maxsize entries."""
+    for i in range(1000):
+        sharded[i] = i
+    assert len(sharded) <= 64
+    assert all(len(shard) <= 16 for shard in sharded.shards)
+
+def test_warm_goes_to_the_right_shards(sharded):
+    """Test that warm-up entries are routed to their shard and readable."""
+    assert sharded.warm([(i, str(i)) for i in range(10)]) == 10
+    assert all(sharded[i] == str(i) for i in range(10))
+
+def test_concurrent_access():
+    """Test that concurrent readers and writers keep the cache consistent."""
+    cache = ShardedARC(maxsize=128, shards=8, promotion_buffer_size=16)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(2000):
+                key = (offset * 7 + i) % 300
+                cache[key] = key
+                value = cache.get(key)
+                assert value is None or value == key
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cache.apply_accesses()
+    assert not errors
+    assert len(cache) <= 128
+
+def test_memory_cache_policy():
+    """Test that MemoryCacheEviction builds a sharded ARC with the given options."""
+    memory_cache = MemoryCacheEviction(policy="sharded_arc", maxsize=32, clean_size=1, shards=4,
+                                       promotion_buffer_size=8)
+    cache = memory_cache.get_cache("m")
+    assert isinstance(cache, ShardedARC) and len(cache.shards) == 4
+    memory_cache.put([("k", "v")], model="m")
+    assert memory_cache.get("k", model="m") == "v"
+
+# ----------- Buffered Promotion Tests -----------
+
+def test_buffered_hits_are_applied_in_batches():
+    """Test that hits are only recorded until the promotion buffer is full."""
+    cache = ARC(maxsize=8, promotion_buffer_size=3)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache["a"] == 1 and cache["b"] == 2
+    # two recorded hits, nothing promoted yet
+    assert "a" in cache.t1 and "b" in cache.t1
+    assert cache["a"] == 1
+    # third hit fills the buffer, all three are applied
+    assert "a" in cache.t2 and "b" in cache.t2
+    assert not cache._accesses
+
+def test_buffered_hits_skip_evicted_keys():
+    """Test that recorded hits on keys removed meanwhile are dropped."""
+    cache = ARC(maxsize=8, promotion_buffer_size=10)
+    cache["a"] = 1
+    assert cache["a"] == 1
+    cache.pop("a")
+    cache.apply_accesses()
+    assert "a" not in cache and "a" not in cache.t2
+
+def test_buffered_miss_still_raises():
+    """Test that misses are unaffected by the promotion buffer."""
+    cache = ARC(maxsize=8, promotion_buffer_size=10)
+    with pytest.raises(KeyError):
+        cache["missing"]
+    assert cache.get("missing") is None
+
+def test_sampled_promotion_records_fraction():
+    """Test that a zero sample rate serves hits without ever reordering."""
+    cache = ARC(maxsize=8, promotion_buffer_size=1, promotion_sample_rate=0.0)
+    cache["a"] = 1
+    for _ in range(10):
+        assert cache["a"] == 1
+    assert "a" in cache.t1 and not cache._accesses
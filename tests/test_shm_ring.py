@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from modelcache.embedding.shm_ring import SharedMemoryRing
+
+# ----------- Fixtures -----------
+
+@pytest.fixture
+def ring():
+    ring = SharedMemoryRing(num_slots=3, dimension=4)
+    yield ring
+    ring.close()
+
+# ----------- Tests -----------
+
+def test_acquire_until_full(ring):
+    """Test that every slot is handed out once, then -1 when the ring is full."""
+    assert [ring.acquire() for _ in range(3)] == [0, 1, 2]
+    assert ring.acquire() == -1
+
+def test_released_slots_are_reused_in_order(ring):
+    """Test that released slots wrap around and come back in release order."""
+    for _ in range(3):
+        ring.acquire()
+    ring.release(1)
+    ring.release(0)
+    assert ring.acquire() == 1
+    assert ring.acquire() == 0
+    assert ring.acquire() == -1
+
+def test_slot_is_overwritten_after_reuse(ring):
+    """Test that a recycled slot holds the new vector, and reads are copies."""
+    slot = ring.acquire()
+    ring.write(slot, np.ones(4, dtype=np.float32))
+    first = ring.read(slot)
+    ring.release(slot)
+    assert [ring.acquire() for _ in range(3)] == [1, 2, slot]
+    ring.write(slot, np.full(4, 2, dtype=np.float32))
+    assert first.tolist() == [1, 1, 1, 1]
+    assert ring.read(slot).tolist() == [2, 2, 2, 2]
+
+def test_write_rejects_wrong_dimension(ring):
+    """Test that a vector of another dimension is not written."""
+    assert not ring.write(ring.acquire(), np.ones(5, dtype=np.float32))
+
+def test_attached_ring_shares_slots(ring):
+    """Test that a ring attached by name sees the owner's writes."""
+    attached = SharedMemoryRing.attach(ring.name, 3, 4)
+    attached.write(2, np.arange(4, dtype=np.float32))
+    assert ring.read(2).tolist() == [0, 1, 2, 3]
+    attached.close()
@@ -0,0 +1,65 @@
+import threading
+from modelcache.manager.snapshot_scheduler import SnapshotScheduler
+from modelcache.report import Report
+
+# ----------- Helpers -----------
+
+class RecordingStore:
+    """Counts flushes and reports a fixed snapshot size."""
+
+    def __init__(self, nbytes=128):
+        self.flushes = 0
+        self.nbytes = nbytes
+        self.flushed = threading.Event()
+
+    def flush(self):
+        self.flushes += 1
+        self.flushed.set()
+        return self.nbytes
+
+# ----------- Tests -----------
+
+def test_snapshot_after_dirty_threshold():
+    """Test that reaching the dirty threshold triggers a snapshot."""
+    store = RecordingStore()
+    report = Report()
+    scheduler = SnapshotScheduler(store.flush, dirty_threshold=3, report=report)
+    scheduler.mark_dirty(2)
+    assert not store.flushed.wait(timeout=0.1)
+    scheduler.mark_dirty()
+    assert store.flushed.wait(timeout=5)
+    scheduler.close()
+    assert scheduler.dirty == 0
+    assert report.snapshot_count == 1
+    assert report.average_snapshot_bytes() == 128
+
+def test_snapshot_on_interval():
+    """Test that pending changes are snapshotted after the interval."""
+    store = RecordingStore()
+    scheduler = SnapshotScheduler(store.flush, interval_ms=20)
+    scheduler.mark_dirty()
+    assert store.flushed.wait(timeout=5)
+    scheduler.close()
+    assert scheduler.last_snapshot_bytes == 128
+
+def test_no_snapshot_without_changes():
+    """Test that a clean store is never flushed."""
+    store = RecordingStore()
+    scheduler = SnapshotScheduler(store.flush, interval_ms=10)
+    assert not store.flushed.wait(timeout=0.1)
+    scheduler.close()
+    assert store.flushes == 0
+
+def test_failed_snapshot_keeps_changes_dirty():
+    """Test that a failing flush leaves the changes to the next snapshot."""
+    def failing_flush():
+        raise RuntimeError("disk full")
+
+    scheduler = SnapshotScheduler(failing_flush)
+    scheduler.mark_dirty(5)
+    try:
+        scheduler.snapshot()
+    except RuntimeError:
+        pass
+    assert scheduler.dirty == 5
+    scheduler.close()
@@ -0,0 +1,86 @@
+import threading
+import numpy as np
+import pytest
+from modelcache.manager.scalar_data.sql_storage_sqlite import SQLStorage
+
+# ----------- Fixtures -----------
+
+@pytest.fixture
+def storage(tmp_path):
+    s = SQLStorage(db_type="sqlite", url=str(tmp_path / "cache.db"))
+    yield s
+    s.close()
+
+def make_rows(n, model="m"):
+    return [(f"answer{i}", f"question{i}", np.full(4, i, dtype=np.float32), model) for i in range(n)]
+
+# ----------- Tests -----------
+
+def test_wal_mode_enabled(storage):
+    """Test that the connection is opened in WAL mode with synchronous=NORMAL."""
+    conn = storage._conn()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+def test_connection_is_reused(storage):
+    """Test that one thread keeps using the same connection."""
+    assert storage._conn() is storage._conn()
+
+def test_batch_insert_returns_row_ids(storage):
+    """Test that batch_insert returns the id of every inserted row, in order."""
+    storage.batch_insert(make_rows(2))
+    ids = storage.batch_insert(make_rows(3))
+    assert ids == [3, 4, 5]
+    for i, primary_id in enumerate(ids):
+        question, answer, _, model = storage.get_data_by_id(primary_id)
+        assert (question, answer, model) == (f"question{i}", f"answer{i}", "m")
+
+def test_other_threads_get_their_own_connection(storage):
+    """Test that reads from another thread work on a separate connection."""
+    ids = storage.batch_insert(make_rows(1))
+    result = {}
+
+    def read():
+        result["row"] = storage.get_data_by_id(ids[0])
+        result["conn"] = storage._conn()
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+    assert result["row"][0] == "question0"
+    assert result["conn"] is not storage._conn()
+
+def test_hit_counts_and_delete(storage):
+    """Test hit count updates and deletes through the shared connection."""
+    ids = storage.batch_insert(make_rows(2))
+    storage.update_hit_count_by_id(ids[0])
+    storage.update_hit_counts({ids[0]: 2})
+    hit_count = storage._conn().execute(
+        "select hit_count from modelcache_llm_answer where id=?", (ids[0],)).fetchone()[0]
+    assert hit_count == 3
+    assert storage.mark_deleted(ids) == 2
+    assert storage.get_data_by_id(ids[0]) is None
+
+@pytest.mark.parametrize("mode, row_bytes", [("float32", 16), ("float16", 8), ("int8", 8), ("none", 0)])
+def test_embedding_storage_modes(tmp_path, mode, row_bytes):
+    """Test that embeddings are stored in the configured format and not read back by lookups."""
+    storage = SQLStorage(db_type="sqlite", url=str(tmp_path / "cache.db"), embedding_storage=mode)
+    try:
+        ids = storage.batch_insert(make_rows(2))
+        stored = storage._conn().execute(
+            "select length(embedding_data) from modelcache_llm_answer where id=?", (ids[1],)).fetchone()[0]
+        assert stored == row_bytes
+        assert storage.get_data_by_id(ids[1]) == ("question1", "answer1", None, "m")
+        assert storage.get_data_by_ids(ids)[ids[0]] == ("question0", "answer0", None, "m")
+    finally:
+        storage.close()
+
+def test_get_data_by_ids(storage):
+    """Test that get_data_by_ids returns the rows it finds keyed by id and skips the others."""
+    ids = storage.batch_insert(make_rows(3))
+    rows = storage.get_data_by_ids([ids[2], ids[0], 999])
+    assert set(rows) == {ids[0], ids[2]}
+    assert rows[ids[2]] == storage.get_data_by_id(ids[2])
+    storage.mark_deleted([ids[0]])
+    assert list(storage.get_data_by_ids(ids)) == [ids[1], ids[2]]
+    assert storage.get_data_by_ids([]) == {}
@@ -0,0 +1,85 @@
+import os
+import numpy as np
+import pytest
+from modelcache.manager.scalar_data.sql_storage_sqlite import SQLStorage
+from modelcache.manager.vector_data.base import VectorData
+from modelcache.manager.vector_data.faiss import Faiss
+from modelcache.manager.vector_rebuild import rebuild_vectors
+from modelcache.utils.error import CacheError
+
+# ----------- Fixtures -----------
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).random((50, 8), dtype=np.float32)
+
+def make_storage(tmp_path, embedding_storage="float32"):
+    return SQLStorage(db_type="sqlite", url=str(tmp_path / "cache.db"), embedding_storage=embedding_storage)
+
+def insert(storage, vectors, model):
+    return storage.batch_insert([(f"answer{i}", f"question{i}", v, model) for i, v in enumerate(vectors)])
+
+# ----------- Tests -----------
+
+def test_iter_embeddings_streams_bounded_blocks(tmp_path, vectors):
+    """Test that embeddings come back per model in blocks of at most batch_size rows."""
+    storage = make_storage(tmp_path)
+    ids_a = insert(storage, vectors[:30], "a")
+    insert(storage, vectors[30:], "b")
+    blocks = list(storage.iter_embeddings(model="a", batch_size=7))
+    assert all(model == "a" and len(ids) <= 7 for model, ids, _ in blocks)
+    assert [i for _, ids, _ in blocks for i in ids] == ids_a
+    np.testing.assert_array_equal(np.concatenate([e for _, _, e in blocks]), vectors[:30])
+    assert sum(len(ids) for _, ids, _ in storage.iter_embeddings(batch_size=7)) == 50
+    storage.close()
+
+def test_rebuild_restores_lost_faiss_index(tmp_path, vectors):
+    """Test that a deleted FAISS index is rebuilt from SQLite, model by model."""
+    storage = make_storage(tmp_path)
+    ids_a = insert(storage, vectors[:30], "a")
+    ids_b = insert(storage, vectors[30:], "b")
+    index_path = str(tmp_path / "faiss.index")
+    store = Faiss(index_path, dimension=8, top_k=1)
+    progress = []
+
+    stats = rebuild_vectors(storage, store, batch_size=8, progress=progress.append)
+
+    assert stats["rows"] == 50 and stats["models"] == {"a": 30, "b": 20}
+    assert progress[-1]["rows"] == 50
+    assert store.search(vectors[5], model="a")[0][1] == ids_a[5]
+    assert store.search(vectors[35], model="b")[0][1] == ids_b[5]
+    # flushed to disk, a fresh store sees the rebuilt indexes
+    assert os.path.isfile(store._model_index_path("a"))
+    assert Faiss(index_path, dimension=8, top_k=1).count() == 50
+    storage.close()
+
+def test_rebuild_replaces_existing_vectors(tmp_path, vectors):
+    """Test that a rebuild resets the model first instead of adding duplicates."""
+    storage = make_storage(tmp_path)
+    insert(storage, vectors[:10], "a")
+    store = Faiss(str(tmp_path / "faiss.index"), dimension=8, top_k=1)
+    rebuild_vectors(storage, store)
+    rebuild_vectors(storage, store, model="a")
+    assert store.count("a") == 10
+    storage.close()
+
+def test_rebuild_from_int8_storage(tmp_path, vectors):
+    """Test that quantized embeddings are decoded back close enough to find the same rows."""
+    storage = make_storage(tmp_path, embedding_storage="int8")
+    ids = insert(storage, vectors, "a")
+    store = Faiss(str(tmp_path / "faiss.index"), dimension=8, top_k=1)
+    rebuild_vectors(storage, store, batch_size=16)
+    found = [store.search(v, model="a")[0][1] for v in vectors]
+    assert np.mean(np.array(found) == np.array(ids)) > 0.9
+    storage.close()
+
+def test_rebuild_needs_stored_embeddings(tmp_path, vectors):
+    """Test that a store keeping no embeddings is refused before any index is reset."""
+    storage = make_storage(tmp_path, embedding_storage="none")
+    insert(storage, vectors[:10], "a")
+    store = Faiss(str(tmp_path / "faiss.index"), dimension=8, top_k=1)
+    store.mul_add([VectorData(id=0, data=vectors[0])], model="a")
+    with pytest.raises(CacheError, match="stores no embeddings"):
+        rebuild_vectors(storage, store)
+    assert store.count("a") == 1
+    storage.close()
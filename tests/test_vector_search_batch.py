@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from modelcache.manager.vector_data.base import VectorData, pack_search_results, unpack_search_results
+from modelcache.manager.vector_data.faiss import Faiss
+
+# ----------- Fixtures -----------
+
+@pytest.fixture
+def faiss_store(tmp_path):
+    store = Faiss(index_file_path=str(tmp_path / "faiss.index"), dimension=4, top_k=2)
+    store.mul_add([VectorData(id=i, data=np.full(4, i, dtype=np.float32)) for i in range(3)])
+    return store
+
+# ----------- Tests -----------
+
+def test_faiss_search_batch_returns_arrays(faiss_store):
+    """Test that one batched search returns (n, k) distance and id arrays."""
+    queries = np.array([[0, 0, 0, 0], [2, 2, 2, 2]], dtype=np.float32)
+    distances, ids = faiss_store.search_batch(queries)
+    assert isinstance(distances, np.ndarray) and isinstance(ids, np.ndarray)
+    assert distances.shape == ids.shape == (2, 2)
+    assert ids[:, 0].tolist() == [0, 2]
+
+def test_faiss_search_batch_matches_search(faiss_store):
+    """Test that every row of the batched search matches a single search."""
+    queries = np.random.default_rng(0).random((5, 4), dtype=np.float32) * 3
+    distances, ids = faiss_store.search_batch(queries, top_k=3)
+    for query, row in zip(queries, unpack_search_results(distances, ids)):
+        assert row == faiss_store.search(query, top_k=3)
+
+def test_faiss_search_batch_empty_index(tmp_path):
+    """Test that an empty index returns empty rows."""
+    store = Faiss(index_file_path=str(tmp_path / "faiss.index"), dimension=4, top_k=2)
+    distances, ids = store.search_batch(np.zeros((3, 4), dtype=np.float32))
+    assert ids.shape == (3, 0)
+    assert unpack_search_results(distances, ids) == [[], [], []]
+
+def test_pack_unpack_round_trip():
+    """Test that padded rows survive packing, for integer and string ids."""
+    rows = [[(0.5, 7), (0.875, 3)], []]
+    distances, ids = pack_search_results(rows)
+    assert ids.tolist() == [[7, 3], [-1, -1]]
+    assert unpack_search_results(distances, ids) == rows
+
+    rows = [[(0.25, "a")], [(0.5, "b"), (0.75, "c")]]
+    assert unpack_search_results(*pack_search_results(rows)) == rows